@@ -3,9 +3,10 @@ from argparse import ArgumentParser
 from benedict import benedict
 from boto3.dynamodb.conditions import Attr
 from botocore.config import Config
-from json import loads
+from json import dumps, loads
 from os import chdir, environ, walk
 from pathlib import Path
+from secrets import token_hex, token_urlsafe
 from shutil import which
 from subprocess import PIPE, STDOUT, Popen, TimeoutExpired
 from time import sleep
@@ -25,6 +26,9 @@ infrastructure_error_options = ["destroy", "retain", "rollback"]
 s3_bucket_ready_timeout = 60 * 60
 s3_bucket_ready_retry_wait = 15
 
+# Keys kept after the current no increment token key, so links signed before the last rotations keep working
+no_increment_token_previous_keys = 2
+
 
 def create_cdk(
     aws_profile: str = "",
@@ -34,6 +38,7 @@ def create_cdk(
     wait_for_s3_bucket_ready: bool = True,
     save_view_counter_path: str = None,
     set_view_counter: int = None,
+    rotate_no_increment_token_key: bool = False,
 ):
     if infrastructure_error_action not in infrastructure_error_options:
         raise ValueError(f"infrastructure_error_action must be one of {', '.join(infrastructure_error_options)}")
@@ -66,6 +71,9 @@ def create_cdk(
         raise RuntimeError(f'Variable "static_variables.deploy_region" could not be found in {config_file}')
 
     deploy_region = cdk_config.static_variables.deploy_region
+
+    view_counter_shard_ids = _get_view_counter_shard_ids()
+
     if deploy_infrastructure:
         args = [
             "cdk deploy --require-approval never --all --rollback "
@@ -236,6 +244,13 @@ def create_cdk(
             else:
                 print("Initial user already in admin groups")
 
+    ssm_client = boto3.client("ssm", config=deploy_region_config)
+    _put_no_increment_token_keys(
+        ssm_client,
+        placeholders["[SSM_NO_INCREMENT_TOKEN_KEYS_PARAMETER_PLACEHOLDER]"],
+        rotate=rotate_no_increment_token_key,
+    )
+
     if wait_for_s3_bucket_ready:
         for bucket_friendly_name, bucket in {
             "Webpage Bucket": s3_bucket_webpage,
@@ -274,11 +289,20 @@ def create_cdk(
                 sleep(s3_bucket_ready_retry_wait)
 
     if save_view_counter_path:
-        {"id": "all_resumes", "view_count": 0}
-        item = dynamodb_table.get_item(Key={"id": "all_resumes"}, ProjectionExpression="id,view_count")
-        if "Item" in item.keys():
-            view_count = int(item["Item"]["view_count"])
-        else:
+        view_count = None
+        request_items = {
+            resume_views_table: {
+                "Keys": [{"id": shard_id} for shard_id in view_counter_shard_ids],
+                "ProjectionExpression": "id,view_count",
+            }
+        }
+        while request_items:
+            response = dynamodb_resource.batch_get_item(RequestItems=request_items)
+            for item in response["Responses"].get(resume_views_table, []):
+                view_count = (view_count if view_count else 0) + int(item["view_count"])
+            request_items = response["UnprocessedKeys"] if response.get("UnprocessedKeys") else None
+
+        if view_count is None:
             raise RuntimeError("Unable to find view_count to save")
 
         with open(view_counter_path.as_posix(), "w") as f:
@@ -286,11 +310,54 @@ def create_cdk(
         print(f"Save view count of {view_count} to {save_view_counter_path}")
 
     if not set_view_counter is None:
-        item = {"id": "all_resumes", "view_count": set_view_counter}
-        dynamodb_table.put_item(Item=item)
+        # The full count goes on the first shard and the remaining shards are reset so the sum matches
+        with dynamodb_table.batch_writer() as batch:
+            for i, shard_id in enumerate(view_counter_shard_ids):
+                batch.put_item(Item={"id": shard_id, "view_count": set_view_counter if i == 0 else 0})
     print("Done!")
 
 
+def _put_no_increment_token_keys(ssm_client, parameter_name: str, rotate: bool = False) -> None:
+    """
+    Creates the no increment token signing keys parameter if it does not exist. When rotating, a new key becomes the
+    current signing key and the no_increment_token_previous_keys most recent keys are kept, so links signed with them
+    keep working after the rotation, even by managers still signing with a cached key.
+    """
+    try:
+        parameter = ssm_client.get_parameter(Name=parameter_name, WithDecryption=True)
+        keys = loads(parameter["Parameter"]["Value"])
+    except ssm_client.exceptions.ParameterNotFound:
+        keys = None
+
+    if keys and not rotate:
+        print("No increment token keys already created")
+        return
+
+    new_key_id = token_hex(4)
+    new_keys = {"current_key_id": new_key_id, "keys": {new_key_id: token_urlsafe(32)}}
+    if keys:
+        # Keys are stored newest first, with the current key first
+        previous_key_ids = [keys["current_key_id"]] + [
+            key_id for key_id in keys["keys"].keys() if key_id != keys["current_key_id"]
+        ]
+        for key_id in previous_key_ids[:no_increment_token_previous_keys]:
+            new_keys["keys"][key_id] = keys["keys"][key_id]
+
+    _ = ssm_client.put_parameter(Name=parameter_name, Value=dumps(new_keys), Type="SecureString", Overwrite=True)
+    print(f"{'Rotated' if keys else 'Created'} no increment token keys. Current key ID: {new_key_id}")
+
+
+def _get_view_counter_shard_ids() -> list:
+    config_file = f"{Path(__file__).parent.resolve()}/src/backend/configuration/config/dynamodb.json"
+    dynamodb_config = benedict(config_file, format="json", keyattr_dynamic=True)
+    view_counter_shards = (
+        dynamodb_config["resume-views"].view_count_shards
+        if "view_count_shards" in dynamodb_config["resume-views"].keys()
+        else 1
+    )
+    return ["all_resumes"] + [f"all_resumes#{shard}" for shard in range(1, max(int(view_counter_shards), 1))]
+
+
 def _replace_placeholders_in_string(source_string: str, placeholders: Dict[str, str]) -> str:
     placeholders_in_string = _placeholder_regex.findall(source_string)
     replacement_string = source_string
@@ -313,6 +380,7 @@ if __name__ == "__main__":
     view_counter_group = parser.add_mutually_exclusive_group()
     view_counter_group.add_argument("--save-view-counter-path", action="store", default=None)
     view_counter_group.add_argument("--set-view-counter", action="store", default=None, type=int)
+    parser.add_argument("--rotate-no-increment-token-key", action="store_true")
 
     parser_args = parser.parse_args()
     args = vars(parser_args)
@@ -324,4 +392,5 @@ if __name__ == "__main__":
         wait_for_s3_bucket_ready=not args["skip_bucket_ready_wait"],
         save_view_counter_path=args["save_view_counter_path"],
         set_view_counter=args["set_view_counter"],
+        rotate_no_increment_token_key=args["rotate_no_increment_token_key"],
     )
@@ -1,15 +1,18 @@
 from ast import literal_eval
-from base64 import urlsafe_b64encode
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from boto3.dynamodb.conditions import Key
 from boto3.dynamodb.conditions import Attr
 from botocore.config import Config
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 from hashlib import sha256
 from json import loads, dumps
 from random import randrange
 from traceback import format_exc
-from time import sleep
+from typing import Iterator
+from time import monotonic, sleep, time
 import boto3
+import hmac
 import os
 import re
 
@@ -18,7 +21,13 @@ with open("./config.json", "r") as f:
 
 dynamodb_resource = None
 resumes_table = None
+views_table = None
+stats_table = None
+reconciliation_table = None
 s3 = None
+no_increment_token_keys = {}
+no_increment_token_key_id = None
+no_increment_token_keys_loaded_at = None
 
 s3_config = Config(signature_version="v4", region_name=config["s3_region"])
 
@@ -28,10 +37,15 @@ error_loading = False
 ret_headers = {
     "Access-Control-Allow-Credentials": config["Access_Control_Allow_Credentials"],
     "Access-Control-Allow-Origin": config["Access_Control_Allow_Origin"],
+    "Access-Control-Expose-Headers": "ETag",
     "Content-Type": "application/json",
 }
 
 ret_bad_request_message = {"statusCode": 500, "body": dumps("Internal Server Error")}
+# The cache version item also holds the change sequence, which every mutating route bumps
+views_table_cache_version_id = "resume_cache_version"
+# IDs reserved by generate_resume_presigned_url are held by an item in this state until add_resume replaces it
+resume_pending_state = "pending"
 # Based on HTML4's allowed URL character listing
 invalid_id_characters_regex = re.compile(r"[^a-zA-Z0-9_-]")
 
@@ -41,21 +55,43 @@ def handler(event, context) -> dict:
 
     ret_status_code = 500
     ret_body = None
+    etag = None
 
     try:
         resource = event["resource"].split("/")[-1]
         body = loads(event["body"])
 
+        request_headers = {key.lower(): value for key, value in (event.get("headers") or {}).items()}
+        if_none_match = request_headers.get("if-none-match")
+
         resume_id = body["id"] if "id" in body.keys() else None
         company = body["company"] if "company" in body.keys() else None
         job_title = body["job_title"] if "job_title" in body.keys() else None
         job_posting = body["job_posting"] if "job_posting" in body.keys() else None
+        version = body["version"] if "version" in body.keys() else None
+        full_scan = body["full_scan"] if "full_scan" in body.keys() else True
 
         print(f"Job type: {resource}")
 
-        resume_id_invalid_characters = []
-        if resume_id:
-            resume_id_invalid_characters = set(invalid_id_characters_regex.findall(resume_id))
+        if resource == "list-all-resumes":
+            # Computed before the listing is read, so a change made while reading produces a new ETag next time
+            etag = get_resumes_list_etag(body)
+
+        batch_resume_ids = []
+        batch_versions = {}
+        if "ids" in body.keys():
+            batch_resume_ids = body["ids"]
+        elif "resumes" in body.keys():
+            batch_resume_ids = [resume["id"] for resume in body["resumes"]]
+            batch_versions = {
+                resume["id"]: resume["version"]
+                for resume in body["resumes"]
+                if "version" in resume.keys() and resume["version"] is not None
+            }
+
+        resume_id_invalid_characters = set()
+        for checked_resume_id in ([resume_id] if resume_id else []) + batch_resume_ids:
+            resume_id_invalid_characters.update(invalid_id_characters_regex.findall(checked_resume_id))
 
         if resume_id_invalid_characters:
             message = (
@@ -65,6 +101,14 @@ def handler(event, context) -> dict:
             ret_status_code = 400
             ret_body = dumps(message)
 
+        elif len(batch_resume_ids) > int(config["resume_batch_max_ids"]) or len(set(batch_resume_ids)) != len(
+            batch_resume_ids
+        ):
+            message = f"ERROR: Up to {config['resume_batch_max_ids']} unique resume IDs may be provided"
+            print(message)
+            ret_status_code = 400
+            ret_body = dumps(message)
+
         elif resource == "generate-presigned-url":
             print(f"Attempting to generate presigned url with resume id of {resume_id}")
             item = generate_resume_presigned_url(resume_id=resume_id)
@@ -89,15 +133,40 @@ def handler(event, context) -> dict:
                 print(
                     f'Attempting to update resume - ID: "{resume_id}", company: "{company}", job title: "{job_title}", job posting: "{job_posting}"'
                 )
-                item = update_resume(resume_id=resume_id, company=company, job_title=job_title, job_posting=job_posting)
+                item = update_resume(
+                    resume_id=resume_id, company=company, job_title=job_title, job_posting=job_posting, version=version
+                )
                 ret_status_code = item["statusCode"]
                 if item["statusCode"] == 404:
                     ret_body = f"Resume ID {resume_id} either not found or has been deleted"
+                elif item["statusCode"] == 409:
+                    ret_body = f"Resume ID {resume_id} has changed since version {version}"
                 elif item["statusCode"] == 500:
                     ret_body = f"There was an internal server error. Please try again later."
                 else:
                     ret_body = item["attributes"]
 
+        elif resource == "list-all-resumes" and etag == if_none_match:
+            print("Resumes have not changed since the provided ETag")
+            ret_status_code = 304
+
+        elif resource == "list-all-resumes" and "page_size" in body.keys():
+            try:
+                ret_body = list_resumes_page(
+                    deleted=("deleted" in body.keys()),
+                    page_size=body["page_size"],
+                    cursor=body["cursor"] if "cursor" in body.keys() else None,
+                    sort_by=body["sort_by"] if "sort_by" in body.keys() else "id",
+                    descending=body["descending"] if "descending" in body.keys() else False,
+                    company=company,
+                    job_title=job_title,
+                )
+                ret_status_code = 200
+            except ValueError as e:
+                print(f"ERROR: {e}")
+                ret_status_code = 400
+                ret_body = str(e)
+
         elif resource == "list-all-resumes":
             ret_body = list_resumes(deleted=("deleted" in body.keys()))
             ret_status_code = 200
@@ -106,33 +175,60 @@ def handler(event, context) -> dict:
             print(f"Attempting to get resume with id of {resume_id}")
             item = get_item_from_table(
                 resume_id=resume_id,
-                projection_expression="id,company,job_title,job_posting,resume_url,date_created,view_count,resume_state,no_increment_id",
+                projection_expression="id,company,job_title,job_posting,resume_url,date_created,view_count,version,resume_state,no_increment_id",
             )
             ret_body = {}
             if "resume_state" in item.keys():
                 resume_state = "deleted" if "deleted" in body.keys() else "normal"
                 if item["resume_state"] == resume_state:
                     print("Found item: ", end=" - ")
-                    ret_body = {key: value for (key, value) in item.items() if key != "resume_state"}
+                    ret_body = add_no_increment_token(
+                        {key: value for (key, value) in item.items() if key != "resume_state"}
+                    )
                     print(", ".join([f'{key}: "{value}"' for (key, value) in ret_body.items()]))
 
             ret_status_code = 200
+            etag = get_etag(ret_body)
+            if etag == if_none_match:
+                print("Resume has not changed since the provided ETag")
+                ret_status_code = 304
+                ret_body = None
+
+        elif resource == "get-resume-stats":
+            granularity = body["granularity"] if "granularity" in body.keys() else "day"
+            print(f"Attempting to get {granularity} stats of resume with id of {resume_id}")
+            try:
+                ret_body = get_resume_stats(
+                    resume_id=resume_id,
+                    granularity=granularity,
+                    start=body["start"] if "start" in body.keys() else None,
+                    end=body["end"] if "end" in body.keys() else None,
+                )
+                ret_status_code = 200
+            except ValueError as e:
+                print(f"ERROR: {e}")
+                ret_status_code = 400
+                ret_body = str(e)
 
         elif resource == "delete-resume":
             print(f"Attempting to delete resume with id of {resume_id}")
-            item = delete_resume(resume_id=resume_id)
+            item = delete_resume(resume_id=resume_id, version=version)
             ret_status_code = item["statusCode"]
             if item["statusCode"] == 404:
                 ret_body = f"Resume ID {resume_id} either not found or has already been deleted"
+            elif item["statusCode"] == 409:
+                ret_body = f"Resume ID {resume_id} has changed since version {version}"
             else:
                 ret_body = item["attributes"]
 
         elif resource == "undelete-resume":
             print(f"Attempting to undelete resume with id of {resume_id}")
-            item = undelete_resume(resume_id=resume_id)
+            item = undelete_resume(resume_id=resume_id, version=version)
             ret_status_code = item["statusCode"]
             if item["statusCode"] == 404:
                 ret_body = f"Resume ID {resume_id} either not found or has not been deleted"
+            elif item["statusCode"] == 409:
+                ret_body = f"Resume ID {resume_id} has changed since version {version}"
             else:
                 ret_body = item["attributes"]
 
@@ -140,10 +236,30 @@ def handler(event, context) -> dict:
             print(f"Attempting to permanently delete resume with id of {resume_id}")
             ret_status_code = permanently_delete_resume(resume_id=resume_id)
 
+        elif resource == "batch-update-resumes":
+            print(f"Attempting to update {len(body['resumes'])} resumes")
+            ret_body = batch_update_resumes(resumes=body["resumes"])
+            ret_status_code = 200
+
+        elif resource == "batch-delete-resumes":
+            print(f"Attempting to delete {len(batch_resume_ids)} resumes")
+            ret_body = batch_delete_resumes(resume_ids=batch_resume_ids, versions=batch_versions)
+            ret_status_code = 200
+
+        elif resource == "batch-undelete-resumes":
+            print(f"Attempting to undelete {len(batch_resume_ids)} resumes")
+            ret_body = batch_undelete_resumes(resume_ids=batch_resume_ids, versions=batch_versions)
+            ret_status_code = 200
+
+        elif resource == "batch-permanently-delete-resumes":
+            print(f"Attempting to permanently delete {len(batch_resume_ids)} resumes")
+            ret_body = batch_permanently_delete_resumes(resume_ids=batch_resume_ids)
+            ret_status_code = 200
+
         elif resource == "get-dangling-resumes":
             print(f"Attempting to get all DynamoDB items and S3 objects that do not have valid associations")
             ret_status_code = 200
-            dangling_resumes = get_dangling_resumes()
+            dangling_resumes = get_dangling_resumes(full_scan=full_scan)
             if len(dangling_resumes["items"]) > 0:
                 dangling_items = "\n  ".join(dangling_resumes["items"])
                 print(f"Found the following dangling DynamoDB item IDs:\n  {dangling_items}")
@@ -187,12 +303,13 @@ def handler(event, context) -> dict:
 
         elif resource == "delete-dangling-resumes":
             ret_status_code = 200
-            dangling_resumes = delete_dangling_resumes()
+            dangling_resumes = delete_dangling_resumes(full_scan=full_scan)
             ret_body = {
                 "items": len(dangling_resumes["items"]),
                 "objects": len(dangling_resumes["html_objects"])
                 + len(dangling_resumes["unparsed_document_objects"])
                 + len(dangling_resumes["parsed_document_objects"]),
+                "batches": dangling_resumes["batches"],
             }
 
     except Exception:
@@ -201,20 +318,27 @@ def handler(event, context) -> dict:
         ret_body = ret_bad_request_message["body"]
 
     ret = {"statusCode": ret_status_code, "headers": ret_headers}
+    if etag and ret_status_code in [200, 304]:
+        ret["headers"] = {**ret_headers, "ETag": etag}
     if ret_body == None:
         ret_body = ""
 
-    try:
-        ret["body"] = dumps(ret_body)
-    except:
-        ret["body"] = '""'
+    if ret_status_code == 304:
+        # A 304 response carries no body
+        ret["body"] = ""
+    else:
+        try:
+            ret["body"] = dumps(ret_body)
+        except:
+            ret["body"] = '""'
     print(f"Returning with code {ret_status_code}")
     return ret
 
 
 def load_table_and_s3() -> None:
     """
-    Loads the S3 and DynamoDB objects into global variables
+    Loads the S3 and DynamoDB objects into global variables, and reloads the no increment token signing keys once they
+    have been cached for no_increment_token_keys_cache_seconds
     """
     if not clients_loaded:
         try:
@@ -228,6 +352,9 @@ def load_table_and_s3() -> None:
         try:
             globals()["dynamodb_resource"] = boto3.resource("dynamodb", region_name=config["dynamodb_table_region"])
             globals()["resumes_table"] = dynamodb_resource.Table(config["dynamodb_table"])
+            globals()["views_table"] = dynamodb_resource.Table(config["dynamodb_views_table"])
+            globals()["stats_table"] = dynamodb_resource.Table(config["dynamodb_stats_table"])
+            globals()["reconciliation_table"] = dynamodb_resource.Table(config["dynamodb_reconciliation_table"])
             _ = get_item_from_table(resume_id="no_item")
         except Exception as e:
             print(f"Could not open DynamoDB table. Error {e}")
@@ -237,6 +364,28 @@ def load_table_and_s3() -> None:
 
         globals()["clients_loaded"] = True
 
+    if no_increment_token_keys_loaded_at is None or monotonic() - no_increment_token_keys_loaded_at >= int(
+        config["no_increment_token_keys_cache_seconds"]
+    ):
+        load_no_increment_token_keys()
+
+
+def load_no_increment_token_keys() -> None:
+    """
+    Loads the no increment token signing keys from SSM into global variables. If they cannot be loaded, the keys that
+    were loaded before are kept.
+    """
+    globals()["no_increment_token_keys_loaded_at"] = monotonic()
+    try:
+        ssm = boto3.client("ssm", region_name=config["ssm_region"])
+        parameter = ssm.get_parameter(Name=config["ssm_no_increment_token_keys_parameter"], WithDecryption=True)
+        parameter_value = loads(parameter["Parameter"]["Value"])
+        globals()["no_increment_token_keys"] = parameter_value["keys"]
+        globals()["no_increment_token_key_id"] = parameter_value["current_key_id"]
+    except Exception:
+        # Without signing keys, resumes fall back to a random no_increment_id stored within DynamoDB
+        print(f"Could not load no increment token keys. Error {format_exc()}")
+
 
 def generate_resume_presigned_url(*, resume_id: str = None) -> str:
     """
@@ -280,16 +429,8 @@ def generate_resume_presigned_url(*, resume_id: str = None) -> str:
         if existing_item and "invalidate_cache" in existing_item.keys():
             return {"statusCode": 409, "ret_body": {}}
     else:
-        existing_objects = list_item_names_from_s3(
-            bucket=config["s3_bucket_webpage"],
-            prefix=config["s3_bucket_webpage_resumes_location"],
-            file_extension=".html",
-        )
-        existing_objects = [".".join(key.split(".")[0:-1]) for key in existing_objects]
-
-        while not object_key or object_key in existing_objects:
-            random_string = generate_random_string(config["id_length"])
-            object_key = f"{random_string}"
+        resume_id = reserve_resume_id()
+        object_key = f"{resume_id}"
 
     object_key = f"{config['s3_bucket_documents_upload_location']}/{object_key}"
     object_key += ".docx"
@@ -300,12 +441,54 @@ def generate_resume_presigned_url(*, resume_id: str = None) -> str:
         HttpMethod="PUT",
     )
 
-    return {"statusCode": 200, "body": {"url": url, "headers": {"Content-Type": content_type}}}
+    return {"statusCode": 200, "body": {"id": resume_id, "url": url, "headers": {"Content-Type": content_type}}}
+
+
+def reserve_resume_id() -> str:
+    """
+    Reserves a random, unused resume ID with a conditional write of a pending item to the DynamoDB table
+
+    The pending item expires through the table's TTL unless add_resume replaces it first. As TTL deletes can lag, a
+    pending item whose expires_at has passed may be reserved again. Collisions with existing IDs are retried with a new
+    random ID up to resume_id_reservation_max_attempts times.
+
+    Raises
+    ------
+    RuntimeError
+        If no unused ID could be reserved
+
+    Returns
+    ------
+    str
+        The reserved resume ID
+    """
+    ConditionalCheckFailedException = dynamodb_resource.meta.client.exceptions.ConditionalCheckFailedException
+
+    now = int(datetime.now(timezone.utc).timestamp())
+    expires_at = now + int(config["resume_id_reservation_ttl_seconds"])
+    for _ in range(int(config["resume_id_reservation_max_attempts"])):
+        resume_id = generate_random_string(config["id_length"])
+        try:
+            _ = resumes_table.put_item(
+                Item={"id": resume_id, "resume_state": resume_pending_state, "expires_at": expires_at},
+                ConditionExpression=Attr("id").not_exists()
+                | (Attr("resume_state").eq(resume_pending_state) & Attr("expires_at").lte(now)),
+            )
+        except ConditionalCheckFailedException:
+            print(f"- Resume ID {resume_id} is taken. Retrying")
+            continue
+        print(f"Reserved resume ID {resume_id}")
+        return resume_id
+
+    raise RuntimeError("Could not reserve an unused resume ID")
 
 
 def add_resume(*, resume_id: str, company: str, job_title: str, job_posting: str) -> dict:
     """
-    Updates the DynamoDB item with the provided arguments
+    Creates the DynamoDB item of a new resume, or completes the pending item of a reserved resume ID
+
+    The item is written with a conditional update rather than a put, so the resume_url the converter may already have
+    set on a reserved ID is kept, and the reservation's expires_at is removed.
 
     Parameters
     ----------
@@ -341,31 +524,48 @@ def add_resume(*, resume_id: str, company: str, job_title: str, job_posting: str
     today = current_datetime.strftime("%Y-%m-%d")
     current_time = current_datetime.strftime("%H:%M")
 
-    no_increment_id = generate_random_string(64)
-
-    item = {
-        "id": resume_id,
-        "company": company,
-        "job_title": job_title,
-        "job_posting": job_posting,
-        "view_count": 0,
-        "resume_state": "normal",
-        "resume_url": initial_resume_url,
-        "date_created": f"{today} - {current_time}",
-        "no_increment_id": no_increment_id,
+    attribute_values = {
+        ":company": company,
+        ":job_title": job_title,
+        ":job_posting": job_posting,
+        ":view_count": 0,
+        ":version": 0,
+        ":resume_state": "normal",
+        ":date_created": f"{today} - {current_time}",
     }
 
+    # Signed no increment tokens are generated on read, so a random no_increment_id is only stored without keys
+    if not no_increment_token_keys:
+        attribute_values[":no_increment_id"] = generate_random_string(64)
+
+    # A reserved ID may already have its resume_url set by the converter, so only a missing resume_url is initialized
     try:
-        _ = resumes_table.put_item(Item=item, ConditionExpression=Attr("id").not_exists())
+        item = resumes_table.update_item(
+            Key={"id": resume_id},
+            UpdateExpression="SET "
+            + ", ".join(f"{key[1:]} = {key}" for key in attribute_values.keys())
+            + ", resume_url = if_not_exists(resume_url, :resume_url) REMOVE expires_at",
+            ConditionExpression="attribute_not_exists(id) OR resume_state = :pending",
+            ExpressionAttributeValues={
+                **attribute_values,
+                ":resume_url": initial_resume_url,
+                ":pending": resume_pending_state,
+            },
+            ReturnValues="ALL_NEW",
+        )
     except ConditionalCheckFailedException:
         return {"statusCode": 409}
 
-    return {"statusCode": 200, "attributes": {key: value for (key, value) in item.items() if key != "resume_state"}}
+    bump_resume_cache_version()
 
+    return {"statusCode": 200, "attributes": get_return_attributes(item["Attributes"])}
 
-def update_resume(*, resume_id: str, company: str = None, job_title: str = None, job_posting: str = None) -> dict:
+
+def update_resume(
+    *, resume_id: str, company: str = None, job_title: str = None, job_posting: str = None, version: int = None
+) -> dict:
     """
-    Updates the DynamoDB item with the provided arguments
+    Updates the DynamoDB item with the provided arguments using a single conditional update
 
     Parameters
     ----------
@@ -377,12 +577,15 @@ def update_resume(*, resume_id: str, company: str = None, job_title: str = None,
         The position's title
     job_posting : str
         The url of the job's posting
+    version : int
+        If provided, the item is only updated if its version attribute still matches
 
     Returns
     ------
     dict {statusCode, attributes}
         statusCode : int
             500 - Internal server error - Something wrong with DynamoDB or the call to it
+            409 - The item's version did not match the provided version
             404 - The item could not be found in the table
             400 - At least one of the params company, job_title, or job_posting were not provided
             200 - Success
@@ -394,44 +597,39 @@ def update_resume(*, resume_id: str, company: str = None, job_title: str = None,
             resume_url : str
             date_created : str
             view_count : int
+            version : int
             no_increment_id : str
     """
     ret_attributes = {}
-    existing_item = get_item_from_table(resume_id=resume_id, projection_expression="id,company,job_title,job_posting")
-    if not existing_item:
-        return {"statusCode": 404, "attributes": ret_attributes}
-
     if not (company or job_title or job_posting):
         return {"statusCode": 400, "attributes": ret_attributes}
 
-    update_expression = "SET "
-    expression_attribute_values = {}
-    if company:
-        update_expression += "company = :newcompany"
-        expression_attribute_values[":newcompany"] = company
-        if "company" in existing_item.keys():
-            print(f'company from {existing_item["company"]} to {company}')
-    if job_title:
-        if update_expression != "SET ":
-            update_expression += ", "
-        update_expression += "job_title = :newjob_title"
-        expression_attribute_values[":newjob_title"] = job_title
-        if "job_title" in existing_item.keys():
-            print(f'job_title from {existing_item["job_title"]} to {job_title}')
-    if job_posting:
-        if update_expression != "SET ":
-            update_expression += ", "
-        update_expression += "job_posting = :newjob_posting"
-        expression_attribute_values[":newjob_posting"] = job_posting
-        if "job_posting" in existing_item.keys():
-            print(f'job_posting from {existing_item["job_posting"]} to {job_posting}')
-
-    item = resumes_table.update_item(
-        Key={"id": resume_id},
-        UpdateExpression=update_expression,
-        ExpressionAttributeValues=expression_attribute_values,
-        ReturnValues="ALL_NEW",
-    )
+    set_expressions = []
+    expression_attribute_values = {":increment": 1, ":pending": resume_pending_state}
+    for attribute, value in (("company", company), ("job_title", job_title), ("job_posting", job_posting)):
+        if value:
+            set_expressions.append(f"{attribute} = :new{attribute}")
+            expression_attribute_values[f":new{attribute}"] = value
+            print(f"Setting {attribute} to {value}")
+
+    version_condition, version_values = get_version_condition(version=version)
+    expression_attribute_values.update(version_values)
+    try:
+        item = resumes_table.update_item(
+            Key={"id": resume_id},
+            UpdateExpression=f"SET {', '.join(set_expressions)} ADD version :increment",
+            ConditionExpression=f"attribute_exists(id) AND resume_state <> :pending{version_condition}",
+            ExpressionAttributeValues=expression_attribute_values,
+            ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+    except dynamodb_resource.meta.client.exceptions.ConditionalCheckFailedException as e:
+        return {
+            "statusCode": get_condition_failure_status_code(e, resume_states=["normal", "deleted"]),
+            "attributes": ret_attributes,
+        }
+
+    bump_resume_change_sequence()
     required_attributes = [
         "id",
         "company",
@@ -440,7 +638,6 @@ def update_resume(*, resume_id: str, company: str = None, job_title: str = None,
         "resume_url",
         "date_created",
         "view_count",
-        "no_increment_id",
     ]
     if "Attributes" in item.keys() and (
         len(set(item["Attributes"].keys()).intersection(required_attributes)) == len(required_attributes)
@@ -454,27 +651,37 @@ def update_resume(*, resume_id: str, company: str = None, job_title: str = None,
             "resume_url": item["Attributes"]["resume_url"],
             "date_created": item["Attributes"]["date_created"],
             "view_count": int(item["Attributes"]["view_count"]),
-            "no_increment_id": item["Attributes"]["no_increment_id"],
+            "version": int(item["Attributes"]["version"]),
         }
+        if "no_increment_id" in item["Attributes"].keys():
+            ret_attributes["no_increment_id"] = item["Attributes"]["no_increment_id"]
+        add_no_increment_token(ret_attributes)
     else:
         ret_status = 500
 
     return {"statusCode": ret_status, "attributes": ret_attributes}
 
 
-def delete_resume(*, resume_id) -> dict:
+def delete_resume(*, resume_id, version: int = None) -> dict:
     """
     Creates a DeleteMarker version in S3 and changes the delete_marker_version and resume_state attributes in DynamoDB
 
+    The item is changed with a single conditional update on its resume_state. If the condition fails, the DeleteMarker
+    that was just created is removed again. Once the item is changed, the content hashed html of the resume is deleted
+    as well.
+
     Parameters
     ----------
     resume_id : str
         The ID of the resume within DynamoDB
+    version : int
+        If provided, the item is only deleted if its version attribute still matches
 
     Returns
     ------
     dict {statusCode, attributes}
         statusCode : int
+            409 - The item's version did not match the provided version
             404 - The item could not be found in the table
             200 - Success
         attributes : dict
@@ -485,61 +692,70 @@ def delete_resume(*, resume_id) -> dict:
             resume_url : str
             date_created : str
             view_count : int
+            version : int
             no_increment_id : str
     """
-    item = get_item_from_table(
-        resume_id=resume_id,
-        projection_expression="id,company,job_title,job_posting,resume_url,date_created,view_count,resume_state,no_increment_id,invalidate_cache",
-    )
-    if item and "resume_state" in item.keys() and item["resume_state"] == "normal":
-        s3_object = f'{config["s3_bucket_webpage_resumes_location"]}/{resume_id}.html'
-        s3_response = s3.delete_object(Bucket=config["s3_bucket_webpage"], Key=s3_object)
-        print(f"Deleted S3 object {s3_object}")
-
-        delete_marker_id = s3_response["VersionId"]
-
-        update_expression = "SET resume_state = :newresume_state, delete_marker_id = :delete_marker_id"
-        expression_attribute_values = {
-            ":newresume_state": "deleted",
-            ":delete_marker_id": delete_marker_id,
-        }
-        invalidate_cache_message = ""
-        if "invalidate_cache" not in item.keys():
-            update_expression = f"{update_expression}, invalidate_cache = :invalidate_cache"
-            expression_attribute_values[":invalidate_cache"] = 1
-            invalidate_cache_message = ", invalidate_cache = 1"
+    s3_object = f'{config["s3_bucket_webpage_resumes_location"]}/{resume_id}.html'
+    s3_response = s3.delete_object(Bucket=config["s3_bucket_webpage"], Key=s3_object)
+    delete_marker_id = s3_response["VersionId"]
 
-        _ = resumes_table.update_item(
+    version_condition, version_values = get_version_condition(version=version)
+    try:
+        item = resumes_table.update_item(
             Key={"id": resume_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_attribute_values,
-        )
-        print(
-            f"Set DynamoDB item ID {resume_id} attributes: resume_state = deleted, delete_marker_id = {delete_marker_id}{invalidate_cache_message}"
+            UpdateExpression="SET resume_state = :newresume_state, delete_marker_id = :delete_marker_id, "
+            "invalidate_cache = if_not_exists(invalidate_cache, :invalidate_cache), "
+            "invalidate_cache_at = if_not_exists(invalidate_cache_at, :invalidate_cache_at) ADD version :increment",
+            ConditionExpression=f"resume_state = :resume_state{version_condition}",
+            ExpressionAttributeValues={
+                ":newresume_state": "deleted",
+                ":delete_marker_id": delete_marker_id,
+                ":invalidate_cache": 1,
+                ":invalidate_cache_at": int(time()),
+                ":increment": 1,
+                ":resume_state": "normal",
+                **version_values,
+            },
+            ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
         )
-        return_attributes = {
-            key: value for (key, value) in item.items() if key not in ["resume_state", "invalidate_cache"]
-        }
-        if "view_count" in return_attributes.keys():
-            return_attributes["view_count"] = int(return_attributes["view_count"])
-        return {"statusCode": 200, "attributes": return_attributes}
-    else:
-        return {"statusCode": 404, "attributes": {}}
+    except dynamodb_resource.meta.client.exceptions.ConditionalCheckFailedException as e:
+        _ = s3.delete_object(Bucket=config["s3_bucket_webpage"], Key=s3_object, VersionId=delete_marker_id)
+        print(f"Removed delete marker {delete_marker_id} of S3 object {s3_object} as the item could not be updated")
+        return {"statusCode": get_condition_failure_status_code(e, resume_states=["normal"]), "attributes": {}}
+
+    print(f"Deleted S3 object {s3_object}")
+    print(f"Set DynamoDB item ID {resume_id} attributes: resume_state = deleted, delete_marker_id = {delete_marker_id}")
+    if config["publishing_mode"] == "content_hashed":
+        try:
+            num_delete_markers = delete_content_hashed_resumes(resume_ids=[resume_id])
+            print(f"Created {num_delete_markers} delete markers of content hashed S3 objects of resume {resume_id}")
+        except Exception:
+            print(f"Error deleting content hashed S3 objects of resume {resume_id}. Error: {format_exc()}")
+    bump_resume_cache_version()
+    return {"statusCode": 200, "attributes": get_return_attributes(item["Attributes"])}
 
 
-def undelete_resume(*, resume_id) -> int:
+def undelete_resume(*, resume_id, version: int = None) -> int:
     """
     Deletes the DeleteMarker from S3 and updates the DynamoDB table's delete_marker_id and resume_state attributes.
 
+    The item is changed first with a single conditional update returning its old attributes, which hold the ID of the
+    DeleteMarker to remove. If the DeleteMarker cannot be removed, the item is set back to deleted. The content hashed
+    html of the resume is restored by removing its latest DeleteMarker as well.
+
     Parameters
     ----------
     resume_id : str
         The ID of the resume within DynamoDB
+    version : int
+        If provided, the item is only undeleted if its version attribute still matches
 
     Returns
     ------
     dict {statusCode, attributes}
         statusCode : int
+            409 - The item's version did not match the provided version
             404 - The item could not be found within the DynamoDB table or did not have the attribute "delete_marker_id"
             200 - Success
         attributes : dict
@@ -550,38 +766,60 @@ def undelete_resume(*, resume_id) -> int:
             resume_url : str
             date_created : str
             view_count : int
+            version : int
             no_increment_id : str
     """
-    item = get_item_from_table(
-        resume_id=resume_id,
-        projection_expression="id,company,job_title,job_posting,resume_url,date_created,view_count,resume_state,delete_marker_id,no_increment_id,invalidate_cache",
-    )
-    if (
-        item
-        and "resume_state" in item.keys()
-        and item["resume_state"] == "deleted"
-        and "delete_marker_id" in item.keys()
-    ):
-        object_name = f'{config["s3_bucket_webpage_resumes_location"]}/{resume_id}.html'
-        _ = s3.delete_object(Bucket=config["s3_bucket_webpage"], Key=object_name, VersionId=item["delete_marker_id"])
-        print(f"Deleted delete marker for S3 object {object_name}")
+    version_condition, version_values = get_version_condition(version=version)
+    try:
+        item = resumes_table.update_item(
+            Key={"id": resume_id},
+            UpdateExpression="REMOVE delete_marker_id SET resume_state = :newresume_state ADD version :increment",
+            ConditionExpression="resume_state = :resume_state AND attribute_exists(delete_marker_id)"
+            + version_condition,
+            ExpressionAttributeValues={
+                ":newresume_state": "normal",
+                ":increment": 1,
+                ":resume_state": "deleted",
+                **version_values,
+            },
+            ReturnValues="ALL_OLD",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+    except dynamodb_resource.meta.client.exceptions.ConditionalCheckFailedException as e:
+        return {"statusCode": get_condition_failure_status_code(e, resume_states=["deleted"]), "attributes": {}}
 
+    old_item = item["Attributes"]
+    object_name = f'{config["s3_bucket_webpage_resumes_location"]}/{resume_id}.html'
+    try:
+        _ = s3.delete_object(
+            Bucket=config["s3_bucket_webpage"], Key=object_name, VersionId=old_item["delete_marker_id"]
+        )
+    except Exception:
+        print(f"Error deleting delete marker for S3 object {object_name}. Error: {format_exc()}")
         _ = resumes_table.update_item(
             Key={"id": resume_id},
-            UpdateExpression="REMOVE delete_marker_id SET resume_state = :newresume_state",
-            ExpressionAttributeValues={":newresume_state": "normal"},
+            UpdateExpression="SET resume_state = :resume_state, delete_marker_id = :delete_marker_id "
+            "ADD version :increment",
+            ExpressionAttributeValues={
+                ":resume_state": "deleted",
+                ":delete_marker_id": old_item["delete_marker_id"],
+                ":increment": 1,
+            },
         )
-        print(f"Removed attribute delete_marker_id with value of {item['delete_marker_id']}")
-        return_attributes = {
-            key: value
-            for (key, value) in item.items()
-            if key not in ["resume_state", "delete_marker_id", "invalidate_cache"]
-        }
-        if "view_count" in return_attributes.keys():
-            return_attributes["view_count"] = int(return_attributes["view_count"])
-        return {"statusCode": 200, "attributes": return_attributes}
-    else:
-        return {"statusCode": 404, "attributes": {}}
+        raise
+    print(f"Deleted delete marker for S3 object {object_name}")
+    print(f"Removed attribute delete_marker_id with value of {old_item['delete_marker_id']}")
+    if config["publishing_mode"] == "content_hashed":
+        try:
+            num_delete_markers = undelete_content_hashed_resumes(resume_ids=[resume_id])
+            print(f"Removed {num_delete_markers} delete markers of content hashed S3 objects of resume {resume_id}")
+        except Exception:
+            print(f"Error undeleting content hashed S3 objects of resume {resume_id}. Error: {format_exc()}")
+
+    bump_resume_cache_version()
+    return_attributes = get_return_attributes(old_item)
+    return_attributes["version"] = int(old_item.get("version", 0)) + 1
+    return {"statusCode": 200, "attributes": return_attributes}
 
 
 def permanently_delete_resume(*, resume_id) -> int:
@@ -635,6 +873,16 @@ def permanently_delete_resume(*, resume_id) -> int:
     else:
         print(f"Could not find S3 object in bucket {config['s3_bucket_webpage']} with key {s3_resume_html_object_name}")
 
+    # Content hashed publishing keeps the html of each version under a prefix named after the resume ID
+    s3_resume_hashed_html_prefix = f'{config["s3_bucket_webpage_resumes_location"]}/{resume_id}/'
+    num_deleted_versions = delete_all_s3_object_versions(
+        bucket=config["s3_bucket_webpage"], object_name=s3_resume_hashed_html_prefix
+    )
+    if num_deleted_versions:
+        print(
+            f"Deleted {num_deleted_versions} versions of S3 objects in bucket {config['s3_bucket_webpage']} under {s3_resume_hashed_html_prefix}"
+        )
+
     if s3_resume_document_object_exists:
         num_deleted_versions = delete_all_s3_object_versions(
             bucket=config["s3_bucket_documents"], object_name=s3_resume_document_object_name
@@ -665,6 +913,7 @@ def permanently_delete_resume(*, resume_id) -> int:
             print(f"Unable to delete item with id {resume_id} from DynamoDB table")
             return 500
         print(f"Deleted item with id {resume_id} from DynamoDB table")
+        bump_resume_cache_version()
     else:
         print(f"Could not find DynamoDB item with id of {resume_id}")
 
@@ -679,253 +928,1229 @@ def permanently_delete_resume(*, resume_id) -> int:
     return 200
 
 
-def list_resumes(deleted: bool = False) -> tuple:
+def batch_update_resumes(*, resumes: list) -> dict:
     """
-    Returns all items within DynamoDB with the provided value of deleted
+    Updates multiple DynamoDB items with the provided arguments using TransactWriteItems
 
     Parameters
     ----------
-    deleted : bool
-        Whether deleted or normal items should be returned
+    resumes : list
+        Dicts of the ID of each resume, at least one of company, job_title, or job_posting, and optionally the version
+        the item is only updated at
 
     Returns
     ------
-    tuple
-        A Tuple of dicts containing all items with the desired state
-        Each dict will contain up to the following: id, company, job_title, job_posting, resume_url, date_created, view_count, and no_increment_id
+    dict
+        A dict of resume IDs to a dict of their result in the following format:
+        {
+            "statusCode": int - 200 on success, 404 if the item could not be found, 409 if its version did not match,
+                          400 if nothing was provided to update, 500 if the update did not succeed
+            "attributes": dict - The same attributes returned by update_resume on success
+        }
     """
-    items = []
-    resume_state = "deleted" if deleted else "normal"
-    projection_expression = "id,company,job_title,job_posting,resume_url,date_created,view_count,no_increment_id"
-    item = resumes_table.query(
-        IndexName=config["dynamodb_status_index"],
-        ProjectionExpression=projection_expression,
-        KeyConditionExpression=Key("resume_state").eq(resume_state),
-    )
-    has_more_items = item["Count"] > 0
+    results = {}
+    updates = []
+    for resume in resumes:
+        attribute_values = {
+            f":new{attribute}": resume[attribute]
+            for attribute in ["company", "job_title", "job_posting"]
+            if attribute in resume.keys() and resume[attribute]
+        }
+        if not attribute_values:
+            results[resume["id"]] = {"statusCode": 400, "attributes": {}}
+            continue
+        version_condition, version_values = get_version_condition(version=resume.get("version"))
+        updates.append(
+            {
+                "id": resume["id"],
+                "update": {
+                    "UpdateExpression": "SET "
+                    + ", ".join(f"{key[len(':new'):]} = {key}" for key in attribute_values.keys())
+                    + " ADD version :increment",
+                    "ConditionExpression": f"attribute_exists(id) AND resume_state <> :pending{version_condition}",
+                    "ExpressionAttributeValues": {
+                        **attribute_values,
+                        **version_values,
+                        ":increment": 1,
+                        ":pending": resume_pending_state,
+                    },
+                },
+                "resume_states": ["normal", "deleted"],
+            }
+        )
 
-    # Pagination
-    while has_more_items:
-        items += item["Items"]
-        if "LastEvaluatedKey" in item.keys():
-            item = resumes_table.query(
-                IndexName=config["dynamodb_status_index"],
-                ProjectionExpression=projection_expression,
-                KeyConditionExpression=Key("resume_state").eq(resume_state),
-                ExclusiveStartKey=item["LastEvaluatedKey"],
-            )
+    update_results = transact_update_items(updates=updates)
+    updated_ids = [resume_id for resume_id, status_code in update_results.items() if status_code == 200]
+    if updated_ids:
+        bump_resume_change_sequence()
+    # Read consistently so the returned attributes include the updates that were just applied
+    items = get_items_from_table(
+        resume_ids=updated_ids,
+        projection_expression="id,company,job_title,job_posting,resume_url,date_created,view_count,version,no_increment_id",
+        consistent_read=True,
+    )
+    for resume_id, status_code in update_results.items():
+        if status_code == 200:
+            results[resume_id] = {"statusCode": 200, "attributes": add_no_increment_token(items.get(resume_id, {}))}
         else:
-            has_more_items = False
-    print(f'Found {len(items)} DynamoDB items with the {"deleted" if deleted else "normal"} state')
-
-    for i in range(0, len(items)):
-        if "view_count" in items[i].keys():
-            items[i]["view_count"] = int(items[i]["view_count"])
+            results[resume_id] = {"statusCode": status_code, "attributes": {}}
 
-    return tuple(items)
+    return results
 
 
-def delete_dangling_resumes() -> dict:
+def batch_delete_resumes(*, resume_ids: list, versions: dict = None) -> dict:
     """
-    Deletes all dangling resumes
+    Creates a DeleteMarker version in S3 for each resume and changes their delete_marker_id and resume_state attributes
+    in DynamoDB
+
+    Items are read with BatchGetItem, the delete markers are created with delete_objects, and the items are updated
+    with TransactWriteItems. Delete markers of items whose update fails are removed again, and the content hashed html
+    of the deleted resumes is deleted as well.
+
+    Parameters
+    ----------
+    resume_ids : list
+        The IDs of the resumes within DynamoDB
+    versions : dict
+        Resume IDs to the version each item is only deleted at. Items without an entry are deleted at any version.
 
     Returns
     ------
     dict
-        A dict containing items and objects that were deleted in the following format:
+        A dict of resume IDs to a dict of their result in the following format:
         {
-            items: (id1, id2, ...),
-            html_objects: ({version1Dict}, {version2Dict}, ...),
-            unparsed_document_objects: ({version1Dict}, {version2Dict}, ...),
-            parsed_document_objects: ({version1Dict}, {version2Dict}, ...)
-        }
-        Each version dict will have the following format:
-        {
-            "Key": "KeyName",
-            "VersionId": "string"
+            "statusCode": int - 200 on success, 404 if the item could not be found or was already deleted, 409 if its
+                          version did not match, 500 if the delete did not succeed
+            "attributes": dict - The same attributes returned by delete_resume on success
         }
     """
-    dangling_resumes = get_dangling_resumes()
-    ret_dict = {"items": [], "html_objects": [], "unparsed_document_objects": [], "parsed_document_objects": []}
-    for item in dangling_resumes["items"]:
-        deleted_item = resumes_table.delete_item(Key={"id": item}, ReturnValues="ALL_OLD")
-        ret_dict["items"].append(deleted_item["Attributes"]["id"])
-
-    if len(dangling_resumes["html_objects"]) > 0:
-        dangling_html_objects = [
-            {key: value for key, value in html_object.items() if key in ["Key", "VersionId"]}
-            for html_object in dangling_resumes["html_objects"]
-        ]
-        deleted_html_objects = s3.delete_objects(
-            Bucket=config["s3_bucket_webpage"], Delete={"Objects": dangling_html_objects}
-        )
-        if "Errors" in deleted_html_objects.keys():
-            raise Exception(
-                f"There was an error deleting the following objects from bucket {config['s3_bucket_webpage']}: {dumps(deleted_html_objects['Errors'])}"
-            )
-        print(deleted_html_objects)
-        ret_dict["html_objects"] += [
-            {"Key": deleted_object["Key"], "VersionId": deleted_object["VersionId"]}
-            for deleted_object in deleted_html_objects["Deleted"]
-        ]
-
-    if len(dangling_resumes["unparsed_document_objects"]) > 0:
-        dangling_unparsed_documents_objects = [
-            {key: value for key, value in html_object.items() if key in ["Key", "VersionId"]}
-            for html_object in dangling_resumes["unparsed_document_objects"]
-        ]
-        deleted_unparsed_document_objects = s3.delete_objects(
-            Bucket=config["s3_bucket_documents"], Delete={"Objects": dangling_unparsed_documents_objects}
-        )
-        if "Errors" in deleted_unparsed_document_objects.keys():
-            raise Exception(
-                f"There was an error deleting the following objects from bucket {config['s3_bucket_documents']}: {dumps(deleted_unparsed_document_objects['Errors'])}"
-            )
-        ret_dict["unparsed_document_objects"] += [
-            {"Key": deleted_object["Key"], "VersionId": deleted_object["VersionId"]}
-            for deleted_object in deleted_unparsed_document_objects["Deleted"]
-        ]
+    items = get_items_from_table(
+        resume_ids=resume_ids,
+        projection_expression="id,company,job_title,job_posting,resume_url,date_created,view_count,resume_state,no_increment_id,invalidate_cache,version",
+    )
+    versions = versions or {}
+    results = {resume_id: {"statusCode": 404, "attributes": {}} for resume_id in resume_ids}
+    normal_ids = []
+    for resume_id, item in items.items():
+        if item.get("resume_state") != "normal":
+            continue
+        # Checked before any delete marker is created, the condition of the update still enforces it
+        if resume_id in versions.keys() and int(item.get("version", 0)) != int(versions[resume_id]):
+            results[resume_id]["statusCode"] = 409
+            continue
+        normal_ids.append(resume_id)
+    object_keys = {
+        f'{config["s3_bucket_webpage_resumes_location"]}/{resume_id}.html': resume_id for resume_id in normal_ids
+    }
 
-    if len(dangling_resumes["parsed_document_objects"]) > 0:
-        dangling_parsed_document_objects = [
-            {key: value for key, value in html_object.items() if key in ["Key", "VersionId"]}
-            for html_object in dangling_resumes["parsed_document_objects"]
-        ]
-        deleted_parsed_document_objects = s3.delete_objects(
-            Bucket=config["s3_bucket_documents"], Delete={"Objects": dangling_parsed_document_objects}
-        )
-        if "Errors" in deleted_parsed_document_objects.keys():
-            raise Exception(
-                f"There was an error deleting the following objects from bucket {config['s3_bucket_documents']}: {dumps(deleted_parsed_document_objects['Errors'])}"
-            )
-        ret_dict["parsed_document_objects"] += [
-            {"Key": deleted_object["Key"], "VersionId": deleted_object["VersionId"]}
-            for deleted_object in deleted_parsed_document_objects["Deleted"]
+    delete_markers = create_s3_delete_markers(bucket=config["s3_bucket_webpage"], keys=list(object_keys.keys()))
+    for key in object_keys.keys():
+        if key not in delete_markers.keys():
+            results[object_keys[key]]["statusCode"] = 500
+    print(f"Created {len(delete_markers)} delete markers in bucket {config['s3_bucket_webpage']}")
+
+    update_results = transact_update_items(
+        updates=[
+            {
+                "id": object_keys[key],
+                "update": {
+                    "UpdateExpression": "SET resume_state = :newresume_state, delete_marker_id = :delete_marker_id, "
+                    "invalidate_cache = if_not_exists(invalidate_cache, :invalidate_cache), "
+                    "invalidate_cache_at = if_not_exists(invalidate_cache_at, :invalidate_cache_at) "
+                    "ADD version :increment",
+                    "ConditionExpression": "resume_state = :resume_state"
+                    + get_version_condition(version=versions.get(object_keys[key]))[0],
+                    "ExpressionAttributeValues": {
+                        ":newresume_state": "deleted",
+                        ":delete_marker_id": delete_marker_id,
+                        ":invalidate_cache": 1,
+                        ":invalidate_cache_at": int(time()),
+                        ":increment": 1,
+                        ":resume_state": "normal",
+                        **get_version_condition(version=versions.get(object_keys[key]))[1],
+                    },
+                },
+                "resume_states": ["normal"],
+            }
+            for key, delete_marker_id in delete_markers.items()
         ]
+    )
 
-    return ret_dict
-
-
-def get_dangling_resumes() -> dict:
+    failed_delete_markers = []
+    for key, delete_marker_id in delete_markers.items():
+        resume_id = object_keys[key]
+        if update_results.get(resume_id) == 200:
+            return_attributes = {
+                attribute: value
+                for (attribute, value) in items[resume_id].items()
+                if attribute not in ["resume_state", "invalidate_cache", "invalidate_cache_at"]
+            }
+            return_attributes["version"] = int(items[resume_id].get("version", 0)) + 1
+            results[resume_id] = {"statusCode": 200, "attributes": add_no_increment_token(return_attributes)}
+        else:
+            results[resume_id]["statusCode"] = update_results.get(resume_id, 500)
+            failed_delete_markers.append({"Key": key, "VersionId": delete_marker_id})
+
+    if failed_delete_markers:
+        print(f"Removing {len(failed_delete_markers)} delete markers of resumes that could not be updated")
+        _ = batch_delete_s3_object_versions(bucket=config["s3_bucket_webpage"], versions=failed_delete_markers)
+    if len(failed_delete_markers) < len(delete_markers):
+        deleted_ids = [resume_id for resume_id, result in results.items() if result["statusCode"] == 200]
+        if config["publishing_mode"] == "content_hashed":
+            try:
+                num_delete_markers = delete_content_hashed_resumes(resume_ids=deleted_ids)
+                print(f"Created {num_delete_markers} delete markers of content hashed S3 objects")
+            except Exception:
+                print(f"Error deleting content hashed S3 objects. Error: {format_exc()}")
+        bump_resume_cache_version()
+
+    return results
+
+
+def batch_undelete_resumes(*, resume_ids: list, versions: dict = None) -> dict:
     """
-    Gets all DynamoDB items and S3 objects that do not have a respective associated object or item
+    Deletes the DeleteMarker from S3 for each resume and updates their delete_marker_id and resume_state attributes in
+    DynamoDB
 
-    For a DynamoDB item to have an associated object, there must be an object in the resumes folder of the website
-    bucket, the object must have at least one non-delete-marker version, and if a delete marker is the first version,
-    a non-delete marker version must follow it. All of its attributes must also be filled in.
-
-    For a website S3 object to have an associated item, the S3 object must have at least one non-delete-marker version,
-    if a delete marker is the first version, a non-delete marker version must follow it, and there must be an item
-    within the DynamoDB database with an ID matching the base object name.
-
-    For an unparsed document S3 object, it must not have existed for more than 30 seconds, otherwise its parse is
-    considered failed and dangling.
+    Items are read with BatchGetItem and updated with TransactWriteItems, then the delete markers are removed with
+    delete_objects. Items whose delete marker could not be removed are set back to deleted. The content hashed html of
+    the undeleted resumes is restored as well.
 
-    For a parsed document S3 object to have an associated item, the S3 object must have at least one non-delete-marker
-    version and it must have an associated dynamodb item.
+    Parameters
+    ----------
+    resume_ids : list
+        The IDs of the resumes within DynamoDB
+    versions : dict
+        Resume IDs to the version each item is only undeleted at. Items without an entry are undeleted at any version.
 
     Returns
     ------
     dict
-        A dict containing items and objects in the following format:
-        {
-            items: (id1, id2, ...),
-            html_objects: ({version1Dict}, {version2Dict}, ...),
-            unparsed_document_objects: ({version1Dict}, {version2Dict}, ...),
-            parsed_document_objects: ({version1Dict}, {version2Dict}, ...)
-        }
-        Each version dict will have the following format:
+        A dict of resume IDs to a dict of their result in the following format:
         {
-            "Key": "KeyName",
-            "VersionId": "string",
-            "is_delete_marker": boolean,
-            "LastModifiedTime": datetime
+            "statusCode": int - 200 on success, 404 if the item could not be found or was not deleted, 409 if its
+                          version did not match, 500 if the undelete did not succeed
+            "attributes": dict - The same attributes returned by undelete_resume on success
         }
     """
-    required_attributes = [
-        "id",
-        "company",
-        "job_title",
-        "job_posting",
-        "view_count",
-        "resume_state",
-        "resume_url",
-        "date_created",
-    ]
-
-    all_resume_ids = get_all_ids_from_table()
-    all_html_objects = list_all_s3_object_versions(
-        bucket=config["s3_bucket_webpage"], prefix=config["s3_bucket_webpage_resumes_location"], file_extension=".html"
-    )
-    all_unparsed_document_objects = list_all_s3_object_versions(
-        bucket=config["s3_bucket_documents"],
-        prefix=config["s3_bucket_documents_upload_location"],
-        file_extension=".docx",
-    )
-    all_parsed_document_objects = list_all_s3_object_versions(
-        bucket=config["s3_bucket_documents"],
-        prefix=config["s3_bucket_documents_parsed_location"],
-        file_extension=".docx",
+    items = get_items_from_table(
+        resume_ids=resume_ids,
+        projection_expression="id,company,job_title,job_posting,resume_url,date_created,view_count,resume_state,delete_marker_id,no_increment_id,invalidate_cache,version",
     )
+    versions = versions or {}
+    results = {resume_id: {"statusCode": 404, "attributes": {}} for resume_id in resume_ids}
+    deleted_items = {
+        resume_id: item
+        for resume_id, item in items.items()
+        if item.get("resume_state") == "deleted" and "delete_marker_id" in item.keys()
+    }
 
-    html_ids_to_objects = {".".join(key.split("/")[-1].split(".")[0:-1]): key for key in all_html_objects.keys()}
-    parsed_document_ids_to_objects = {
-        ".".join(key.split("/")[-1].split(".")[0:-1]): key for key in all_parsed_document_objects.keys()
+    update_results = transact_update_items(
+        updates=[
+            {
+                "id": resume_id,
+                "update": {
+                    "UpdateExpression": "REMOVE delete_marker_id SET resume_state = :newresume_state "
+                    "ADD version :increment",
+                    "ConditionExpression": "resume_state = :resume_state AND delete_marker_id = :delete_marker_id"
+                    + get_version_condition(version=versions.get(resume_id))[0],
+                    "ExpressionAttributeValues": {
+                        ":newresume_state": "normal",
+                        ":increment": 1,
+                        ":resume_state": "deleted",
+                        ":delete_marker_id": item["delete_marker_id"],
+                        **get_version_condition(version=versions.get(resume_id))[1],
+                    },
+                },
+                "resume_states": ["deleted"],
+            }
+            for resume_id, item in deleted_items.items()
+        ]
+    )
+    updated_ids = [resume_id for resume_id, status_code in update_results.items() if status_code == 200]
+    for resume_id, status_code in update_results.items():
+        if status_code != 200:
+            results[resume_id]["statusCode"] = status_code
+
+    delete_markers = {
+        f'{config["s3_bucket_webpage_resumes_location"]}/{resume_id}.html': deleted_items[resume_id]["delete_marker_id"]
+        for resume_id in updated_ids
     }
+    try:
+        # Errors are not raised, so the delete markers that were removed are known even if some could not be
+        deleted_versions = batch_delete_s3_object_versions(
+            bucket=config["s3_bucket_webpage"],
+            versions=[{"Key": key, "VersionId": version_id} for key, version_id in delete_markers.items()],
+            raise_errors=False,
+        )["deleted"]
+    except Exception:
+        print(f"Error deleting delete markers. Error: {format_exc()}")
+        deleted_versions = []
+    deleted_keys = set(version["Key"] for version in deleted_versions)
+
+    failed_ids = []
+    for resume_id in updated_ids:
+        if f'{config["s3_bucket_webpage_resumes_location"]}/{resume_id}.html' in deleted_keys:
+            return_attributes = {
+                key: value
+                for (key, value) in deleted_items[resume_id].items()
+                if key not in ["resume_state", "delete_marker_id", "invalidate_cache", "invalidate_cache_at"]
+            }
+            return_attributes["version"] = int(deleted_items[resume_id].get("version", 0)) + 1
+            results[resume_id] = {"statusCode": 200, "attributes": add_no_increment_token(return_attributes)}
+        else:
+            results[resume_id]["statusCode"] = 500
+            failed_ids.append(resume_id)
+
+    if failed_ids:
+        print(f"Setting {len(failed_ids)} resumes whose delete marker could not be removed back to deleted")
+        _ = transact_update_items(
+            updates=[
+                {
+                    "id": resume_id,
+                    "update": {
+                        "UpdateExpression": "SET resume_state = :resume_state, delete_marker_id = :delete_marker_id "
+                        "ADD version :increment",
+                        "ExpressionAttributeValues": {
+                            ":resume_state": "deleted",
+                            ":increment": 1,
+                            ":delete_marker_id": deleted_items[resume_id]["delete_marker_id"],
+                        },
+                    },
+                }
+                for resume_id in failed_ids
+            ]
+        )
+    if len(failed_ids) < len(updated_ids):
+        undeleted_ids = [resume_id for resume_id in updated_ids if resume_id not in failed_ids]
+        if config["publishing_mode"] == "content_hashed":
+            try:
+                num_delete_markers = undelete_content_hashed_resumes(resume_ids=undeleted_ids)
+                print(f"Removed {num_delete_markers} delete markers of content hashed S3 objects")
+            except Exception:
+                print(f"Error undeleting content hashed S3 objects. Error: {format_exc()}")
+        bump_resume_cache_version()
 
-    dangling_items = list()
-    dangling_html_objects = list()
-    dangling_parsed_document_objects = list()
-    dangling_unparsed_document_objects = list()
+    return results
 
-    for resume_id in all_resume_ids:
-        if resume_id in html_ids_to_objects.keys():
-            item = get_item_from_table(resume_id=resume_id)
-            intersection = set(item.keys()).intersection(required_attributes)
-            if len(intersection) < len(required_attributes):
-                dangling_items.append(resume_id)
-                dangling_html_objects + s3_object_versions
-                continue
-            s3_object_versions = all_html_objects[html_ids_to_objects[resume_id]]
-            num_versions = len([True for version in s3_object_versions if not version["is_delete_marker"]])
-            is_delete_marker_first_version = s3_object_versions[0]["is_delete_marker"]
-            is_delete_marker_second_version = (
-                True if len(s3_object_versions) > 1 and s3_object_versions[1]["is_delete_marker"] else False
-            )
-            if num_versions == 0 or (is_delete_marker_first_version and is_delete_marker_second_version):
-                dangling_items.append(resume_id)
-                dangling_html_objects += [s3_object_versions[html_ids_to_objects[resume_id]]]
-        else:
-            dangling_items.append(resume_id)
 
-    html_objects_to_ids = {value: key for key, value in html_ids_to_objects.items()}
-    parsed_document_objects_to_ids = {value: key for key, value in parsed_document_ids_to_objects.items()}
+def batch_permanently_delete_resumes(*, resume_ids: list) -> dict:
+    """
+    Permanently deletes the S3 objects and DynamoDB items of multiple resumes
+
+    The object versions of every resume are listed concurrently, then deleted in bulk with delete_objects, delete
+    markers first, and the items are deleted with BatchWriteItem.
 
-    for key, versions in all_html_objects.items():
-        if not html_objects_to_ids[key] in all_resume_ids:
-            dangling_html_objects += versions
+    Parameters
+    ----------
+    resume_ids : list
+        The IDs of the resumes within DynamoDB
 
-    for key, versions in all_unparsed_document_objects.items():
-        now = datetime.now().replace(tzinfo=None)
-        dangling_unparsed_document_objects += [
-            version for version in versions if (now - version["LastModifiedTime"].replace(tzinfo=None)).seconds >= 30
+    Returns
+    ------
+    dict
+        A dict of resume IDs to a dict of their result in the following format:
+        {
+            "statusCode": int - 200 on success, 404 if neither an item nor an object could be found
+        }
+    """
+    items = get_items_from_table(resume_ids=resume_ids, projection_expression="id")
+    object_keys = (
+        [
+            (config["s3_bucket_webpage"], f'{config["s3_bucket_webpage_resumes_location"]}/{resume_id}.html', resume_id)
+            for resume_id in resume_ids
         ]
+        + [
+            # The content hashed html of each version, when resumes are published with content hashed keys
+            (config["s3_bucket_webpage"], f'{config["s3_bucket_webpage_resumes_location"]}/{resume_id}/', resume_id)
+            for resume_id in resume_ids
+        ]
+        + [
+            (config["s3_bucket_documents"], f"{config[location]}/{resume_id}.docx", resume_id)
+            for location in ["s3_bucket_documents_upload_location", "s3_bucket_documents_parsed_location"]
+            for resume_id in resume_ids
+        ]
+    )
 
-    for key, versions in all_parsed_document_objects.items():
-        num_versions = len([True for version in versions if not version["is_delete_marker"]])
-        if parsed_document_objects_to_ids[key] not in all_resume_ids or num_versions == 0:
-            dangling_parsed_document_objects += versions
+    def list_object_versions(object_key: tuple) -> list:
+        bucket, key, _ = object_key
+        if key.endswith("/"):
+            return [
+                version
+                for _, versions in iterate_s3_object_versions(bucket=bucket, prefix=key, recursive=True)
+                for version in versions
+            ]
+        for versions_key, versions in iterate_s3_object_versions(bucket=bucket, prefix=key, recursive=True):
+            if versions_key == key:
+                return versions
+        return []
+
+    with ThreadPoolExecutor(max_workers=int(config["s3_delete_objects_max_workers"])) as executor:
+        object_versions = list(executor.map(list_object_versions, object_keys))
+
+    found_ids = set(items.keys())
+    bucket_versions = {}
+    for (bucket, _, resume_id), versions in zip(object_keys, object_versions):
+        if versions:
+            found_ids.add(resume_id)
+        bucket_versions.setdefault(bucket, []).extend(versions)
+
+    for bucket, versions in bucket_versions.items():
+        # Delete the delete markers first to allow those s3 event notifications to go through
+        for is_delete_marker in (True, False):
+            deleted = batch_delete_s3_object_versions(
+                bucket=bucket,
+                versions=[
+                    {"Key": version["Key"], "VersionId": version["VersionId"]}
+                    for version in versions
+                    if version["is_delete_marker"] is is_delete_marker
+                ],
+            )
+            print(f"Deleted {len(deleted['deleted'])} object versions from bucket {bucket}")
 
-    ret_dict = dict()
-    ret_dict["items"] = tuple(dangling_items)
-    ret_dict["html_objects"] = tuple(dangling_html_objects)
-    ret_dict["unparsed_document_objects"] = tuple(dangling_unparsed_document_objects)
-    ret_dict["parsed_document_objects"] = tuple(dangling_parsed_document_objects)
+    if items:
+        _ = batch_delete_items_from_table(resume_ids=list(items.keys()))
+        print(f"Deleted {len(items)} items from DynamoDB table")
+        bump_resume_cache_version()
 
-    return ret_dict
+    return {resume_id: {"statusCode": 200 if resume_id in found_ids else 404} for resume_id in resume_ids}
 
 
-def get_all_ids_from_table() -> tuple:
+def create_s3_delete_markers(*, bucket: str, keys: list) -> dict:
+    """
+    Creates a DeleteMarker version for each of the provided keys using delete_objects, 1000 keys per request
+
+    Parameters
+    ----------
+    bucket : str
+        The bucket containing the objects
+    keys : list
+        The object keys
+
+    Returns
+    ------
+    dict
+        A dict of object keys to the version ID of their new delete marker. Keys that returned an error are omitted.
+    """
+    delete_markers = {}
+    for i in range(0, len(keys), 1000):
+        response = s3.delete_objects(
+            Bucket=bucket, Delete={"Objects": [{"Key": key} for key in keys[i : i + 1000]], "Quiet": False}
+        )
+        for deleted_object in response.get("Deleted", []):
+            delete_markers[deleted_object["Key"]] = deleted_object["DeleteMarkerVersionId"]
+        if response.get("Errors"):
+            print(f"Error creating some delete markers. Errors:\n{dumps(response['Errors'])}")
+
+    return delete_markers
+
+
+def list_content_hashed_resume_versions(*, resume_ids: list) -> dict:
+    """
+    Lists the versions of the content hashed html of each resume, kept under a prefix named after the resume's ID when
+    resumes are published with content hashed keys. The prefixes are listed concurrently.
+
+    Parameters
+    ----------
+    resume_ids : list
+        The IDs of the resumes
+
+    Returns
+    ------
+    dict
+        A dictionary of the keys under the prefixes in the same format as list_all_s3_object_versions
+    """
+
+    def list_resume_versions(resume_id: str) -> list:
+        return list(
+            iterate_s3_object_versions(
+                bucket=config["s3_bucket_webpage"],
+                prefix=f'{config["s3_bucket_webpage_resumes_location"]}/{resume_id}/',
+                recursive=True,
+            )
+        )
+
+    with ThreadPoolExecutor(max_workers=int(config["s3_list_object_versions_max_workers"])) as executor:
+        return dict(
+            key_versions
+            for resume_versions in executor.map(list_resume_versions, resume_ids)
+            for key_versions in resume_versions
+        )
+
+
+def delete_content_hashed_resumes(*, resume_ids: list) -> int:
+    """
+    Creates a DeleteMarker version for the content hashed html of each resume, so it is no longer served while the
+    resume is deleted
+
+    Parameters
+    ----------
+    resume_ids : list
+        The IDs of the deleted resumes
+
+    Returns
+    ------
+    int
+        The number of delete markers created
+    """
+    keys = [
+        key
+        for key, versions in list_content_hashed_resume_versions(resume_ids=resume_ids).items()
+        if not versions[0]["is_delete_marker"]
+    ]
+    return len(create_s3_delete_markers(bucket=config["s3_bucket_webpage"], keys=keys))
+
+
+def undelete_content_hashed_resumes(*, resume_ids: list) -> int:
+    """
+    Removes the DeleteMarker that is the latest version of the content hashed html of each resume, restoring the html
+    delete_content_hashed_resumes hid
+
+    Parameters
+    ----------
+    resume_ids : list
+        The IDs of the undeleted resumes
+
+    Returns
+    ------
+    int
+        The number of delete markers removed
+    """
+    delete_markers = [
+        {"Key": key, "VersionId": versions[0]["VersionId"]}
+        for key, versions in list_content_hashed_resume_versions(resume_ids=resume_ids).items()
+        if versions[0]["is_delete_marker"]
+    ]
+    return len(batch_delete_s3_object_versions(bucket=config["s3_bucket_webpage"], versions=delete_markers)["deleted"])
+
+
+def transact_update_items(*, updates: list) -> dict:
+    """
+    Applies conditional updates to items of the DynamoDB table using TransactWriteItems, 100 items per transaction
+
+    A transaction is cancelled as a whole when any of its conditions fail, so the remaining updates are resubmitted
+    without the failed ones, with exponential backoff up to dynamodb_transact_write_max_retries times.
+
+    Parameters
+    ----------
+    updates : list
+        Dicts of each resume ID, the Update parameters of its transaction item without TableName and Key, and the
+        resume_state values the update expects, as passed to get_condition_failure_status_code:
+        [{"id": "id1", "update": {"UpdateExpression": "string", ...}, "resume_states": ["normal"]}, ...]
+
+    Returns
+    ------
+    dict
+        A dict of resume IDs to a status code: 200 if the item was updated, 409 if its condition failed on its
+        version, 404 if it failed otherwise, and 500 if it could not be updated within the retries
+    """
+    client = dynamodb_resource.meta.client
+    results = {}
+    for i in range(0, len(updates), 100):
+        pending = updates[i : i + 100]
+        for retry in range(int(config["dynamodb_transact_write_max_retries"]) + 1):
+            if retry:
+                sleep(min(0.05 * 2**retry, 1))
+            try:
+                _ = client.transact_write_items(
+                    TransactItems=[
+                        {
+                            "Update": {
+                                "TableName": config["dynamodb_table"],
+                                "Key": {"id": update["id"]},
+                                "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+                                **update["update"],
+                            }
+                        }
+                        for update in pending
+                    ]
+                )
+            except client.exceptions.TransactionCanceledException as e:
+                reasons = e.response.get("CancellationReasons", [])
+                retry_pending = []
+                for update, reason in zip(pending, reasons):
+                    if reason.get("Code") == "ConditionalCheckFailed":
+                        results[update["id"]] = get_condition_failure_status_code(
+                            reason, resume_states=update.get("resume_states", [])
+                        )
+                    else:
+                        retry_pending.append(update)
+                pending = retry_pending
+                if pending:
+                    continue
+            for update in pending:
+                results[update["id"]] = 200
+            pending = []
+            break
+
+        for update in pending:
+            print(f"Could not update item with id {update['id']} within the retries")
+            results[update["id"]] = 500
+
+    return results
+
+
+def list_resumes(deleted: bool = False) -> tuple:
+    """
+    Returns all items within DynamoDB with the provided value of deleted
+
+    Parameters
+    ----------
+    deleted : bool
+        Whether deleted or normal items should be returned
+
+    Returns
+    ------
+    tuple
+        A Tuple of dicts containing all items with the desired state
+        Each dict will contain up to the following: id, company, job_title, job_posting, resume_url, date_created, view_count, and no_increment_id
+    """
+    items = []
+    resume_state = "deleted" if deleted else "normal"
+    projection_expression = "id,company,job_title,job_posting,resume_url,date_created,view_count,no_increment_id"
+    item = resumes_table.query(
+        IndexName=config["dynamodb_status_index"],
+        ProjectionExpression=projection_expression,
+        KeyConditionExpression=Key("resume_state").eq(resume_state),
+    )
+    has_more_items = item["Count"] > 0
+
+    # Pagination
+    while has_more_items:
+        items += item["Items"]
+        if "LastEvaluatedKey" in item.keys():
+            item = resumes_table.query(
+                IndexName=config["dynamodb_status_index"],
+                ProjectionExpression=projection_expression,
+                KeyConditionExpression=Key("resume_state").eq(resume_state),
+                ExclusiveStartKey=item["LastEvaluatedKey"],
+            )
+        else:
+            has_more_items = False
+    print(f'Found {len(items)} DynamoDB items with the {"deleted" if deleted else "normal"} state')
+
+    for i in range(0, len(items)):
+        if "view_count" in items[i].keys():
+            items[i]["view_count"] = int(items[i]["view_count"])
+        add_no_increment_token(items[i])
+
+    return tuple(items)
+
+
+def parse_integer(value, *, name: str) -> int:
+    """
+    Parses an integer request value, accepting integers and strings of digits
+
+    Parameters
+    ----------
+    value : int or str
+        The value from the request body
+    name : str
+        The name of the value, used within the error message
+
+    Raises
+    ------
+    ValueError
+        If the value is not an integer
+
+    Returns
+    ------
+    int
+        The parsed integer
+    """
+    # bool is a subclass of int, but true and false are not page sizes
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"{name} must be an integer")
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+
+def list_resumes_page(
+    *,
+    deleted: bool = False,
+    page_size: int,
+    cursor: str = None,
+    sort_by: str = "id",
+    descending: bool = False,
+    company: str = None,
+    job_title: str = None,
+) -> dict:
+    """
+    Returns a single page of the items within DynamoDB with the provided value of deleted
+
+    Items are read in order from the resume_state index sorted on sort_by, and the optional filters are applied on the
+    server. Each call queries at most list_resumes_max_queries_per_page times, so a page may hold fewer than page_size
+    items even when a cursor is returned.
+
+    Parameters
+    ----------
+    deleted : bool
+        Whether deleted or normal items should be returned
+    page_size : int
+        The maximum number of items to return. Clamped to between 1 and list_resumes_max_page_size
+    cursor : str
+        The cursor returned with the previous page
+    sort_by : str
+        Either id or date_created
+    descending : bool
+        Whether the items should be sorted in descending order
+    company : str
+        If provided, only items whose company contains this string are returned
+    job_title : str
+        If provided, only items whose job title contains this string are returned
+
+    Raises
+    ------
+    ValueError
+        If page_size is not an integer, or sort_by or the cursor is invalid
+
+    Returns
+    ------
+    dict
+        A dict in the following format:
+        {
+            "items": ({item1}, {item2}, ...),
+            "cursor": "string" or None if there are no more items
+        }
+        Each item will contain up to the following: id, company, job_title, job_posting, resume_url, date_created,
+        view_count, and no_increment_id
+    """
+    page_size = parse_integer(page_size, name="page_size")
+    page_size = min(max(page_size, 1), int(config["list_resumes_max_page_size"]))
+
+    sort_by_indexes = {
+        "id": config["dynamodb_status_index"],
+        "date_created": config["dynamodb_status_date_created_index"],
+    }
+    if sort_by not in sort_by_indexes.keys():
+        raise ValueError(f"Cannot sort by {sort_by}")
+
+    resume_state = "deleted" if deleted else "normal"
+    query_kwargs = {
+        "IndexName": sort_by_indexes[sort_by],
+        "ProjectionExpression": "id,company,job_title,job_posting,resume_url,date_created,view_count,no_increment_id",
+        "KeyConditionExpression": Key("resume_state").eq(resume_state),
+        "ScanIndexForward": not descending,
+    }
+    filter_conditions = [
+        Attr(attribute).contains(value)
+        for attribute, value in (("company", company), ("job_title", job_title))
+        if value
+    ]
+    if filter_conditions:
+        query_kwargs["FilterExpression"] = filter_conditions[0]
+        for filter_condition in filter_conditions[1:]:
+            query_kwargs["FilterExpression"] &= filter_condition
+
+    last_evaluated_key = None
+    if cursor:
+        try:
+            last_evaluated_key = loads(urlsafe_b64decode(cursor.encode("utf-8")))
+        except Exception:
+            raise ValueError("Cursor is invalid")
+        # The keys of an index's LastEvaluatedKey are its own key attributes and the table's, so a cursor of the id
+        # index is told apart from one of the date_created index
+        if (
+            not isinstance(last_evaluated_key, dict)
+            or last_evaluated_key.get("resume_state") != resume_state
+            or set(last_evaluated_key.keys()) != set(["id", "resume_state", sort_by])
+        ):
+            raise ValueError("Cursor does not belong to this listing")
+
+    items = []
+    for _ in range(int(config["list_resumes_max_queries_per_page"])):
+        # Limit bounds the items read before filtering, so a page never overshoots its size
+        response = resumes_table.query(
+            Limit=page_size - len(items),
+            **query_kwargs,
+            **({"ExclusiveStartKey": last_evaluated_key} if last_evaluated_key else {}),
+        )
+        items += response["Items"]
+        last_evaluated_key = response["LastEvaluatedKey"] if "LastEvaluatedKey" in response.keys() else None
+        if not last_evaluated_key or len(items) >= page_size:
+            break
+    print(
+        f"Found {len(items)} DynamoDB items with the {resume_state} state. More remaining: {bool(last_evaluated_key)}"
+    )
+
+    for i in range(0, len(items)):
+        if "view_count" in items[i].keys():
+            items[i]["view_count"] = int(items[i]["view_count"])
+        add_no_increment_token(items[i])
+
+    next_cursor = None
+    if last_evaluated_key:
+        next_cursor = urlsafe_b64encode(dumps(last_evaluated_key).encode("utf-8")).decode("utf-8")
+
+    return {"items": tuple(items), "cursor": next_cursor}
+
+
+def get_resume_stats(*, resume_id: str, granularity: str = "day", start: str = None, end: str = None) -> dict:
+    """
+    Returns the precomputed view counts and unique viewer counts of a resume from the stats table
+
+    Parameters
+    ----------
+    resume_id : str
+        The ID of the resume within DynamoDB
+    granularity : str
+        Either hour or day
+    start : str
+        The first day to return, formatted as YYYY-MM-DD. Defaults to 30 days before end
+    end : str
+        The last day to return, formatted as YYYY-MM-DD. Defaults to today
+
+    Raises
+    ------
+    ValueError
+        If granularity is not hour or day, start or end are not dates, or start is after end or more than
+        resume_stats_max_days before it
+
+    Returns
+    ------
+    dict
+        A dict containing the id, granularity, start, end, and stats of the resume
+        Each item of stats will contain: period, view_count, and unique_viewers
+    """
+    if granularity not in ["hour", "day"]:
+        raise ValueError("granularity must be either hour or day")
+    try:
+        end_date = date.fromisoformat(end) if end else datetime.now(timezone.utc).date()
+        start_date = date.fromisoformat(start) if start else end_date - timedelta(days=30)
+    except (TypeError, ValueError):
+        raise ValueError("start and end must be dates formatted as YYYY-MM-DD")
+    if start_date > end_date:
+        raise ValueError("start must not be after end")
+    if (end_date - start_date).days > int(config["resume_stats_max_days"]):
+        raise ValueError(f"start must be within {config['resume_stats_max_days']} days of end")
+    start, end = start_date.isoformat(), end_date.isoformat()
+
+    stats = []
+    query_kwargs = {
+        "KeyConditionExpression": Key("resume_id").eq(resume_id)
+        # ~ sorts after every character used in a period, so every hour of the end day is included
+        & Key("period").between(f"{granularity}#{start}", f"{granularity}#{end}~"),
+        "ProjectionExpression": "#period,view_count,unique_viewers",
+        "ExpressionAttributeNames": {"#period": "period"},
+    }
+    while True:
+        response = stats_table.query(**query_kwargs)
+        for item in response["Items"]:
+            stats.append(
+                {
+                    "period": item["period"].split("#", 1)[1],
+                    "view_count": int(item["view_count"]) if "view_count" in item.keys() else 0,
+                    "unique_viewers": int(item["unique_viewers"]) if "unique_viewers" in item.keys() else 0,
+                }
+            )
+        if "LastEvaluatedKey" not in response.keys():
+            break
+        query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    print(f"Found {len(stats)} {granularity} stats items for resume {resume_id}")
+
+    return {"id": resume_id, "granularity": granularity, "start": start, "end": end, "stats": stats}
+
+
+def delete_dangling_resumes(*, full_scan: bool = True) -> dict:
+    """
+    Deletes all dangling resumes
+
+    Parameters
+    ----------
+    full_scan : bool
+        Whether to check every resume instead of only those flagged by the reconciliation index. Defaults to True.
+
+    Returns
+    ------
+    dict
+        A dict containing items and objects that were deleted in the following format:
+        {
+            items: (id1, id2, ...),
+            html_objects: ({version1Dict}, {version2Dict}, ...),
+            unparsed_document_objects: ({version1Dict}, {version2Dict}, ...),
+            parsed_document_objects: ({version1Dict}, {version2Dict}, ...),
+            batches: ({"target": "table or bucket name", "requested": int, "deleted": int, "retries": int}, ...)
+        }
+        Each version dict will have the following format:
+        {
+            "Key": "KeyName",
+            "VersionId": "string"
+        }
+    """
+    dangling_resumes = get_dangling_resumes(full_scan=full_scan)
+    ret_dict = {"batches": []}
+
+    deleted_items = batch_delete_items_from_table(resume_ids=list(dangling_resumes["items"]))
+    ret_dict["items"] = deleted_items["deleted"]
+    ret_dict["batches"] += deleted_items["batches"]
+    if deleted_items["deleted"]:
+        bump_resume_cache_version()
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = {
+            object_type: executor.submit(
+                batch_delete_s3_object_versions,
+                bucket=bucket,
+                versions=[
+                    {key: value for key, value in version.items() if key in ["Key", "VersionId"]}
+                    for version in dangling_resumes[object_type]
+                ],
+            )
+            for object_type, bucket in (
+                ("html_objects", config["s3_bucket_webpage"]),
+                ("unparsed_document_objects", config["s3_bucket_documents"]),
+                ("parsed_document_objects", config["s3_bucket_documents"]),
+            )
+        }
+        for object_type, future in futures.items():
+            deleted_objects = future.result()
+            ret_dict[object_type] = deleted_objects["deleted"]
+            ret_dict["batches"] += deleted_objects["batches"]
+
+    return ret_dict
+
+
+def batch_delete_items_from_table(*, resume_ids: list) -> dict:
+    """
+    Deletes the items with the provided IDs from the DynamoDB table using BatchWriteItem, 25 items per request
+
+    Unprocessed items are retried with exponential backoff up to dynamodb_batch_write_max_retries times before an error
+    is raised.
+
+    Parameters
+    ----------
+    resume_ids : list
+        The IDs of the resumes within DynamoDB
+
+    Returns
+    ------
+    dict
+        A dict in the following format:
+        {
+            "deleted": [id1, id2, ...],
+            "batches": [{"target": "table name", "requested": int, "deleted": int, "retries": int}, ...]
+        }
+    """
+    table_name = config["dynamodb_table"]
+    ret = {"deleted": [], "batches": []}
+    for i in range(0, len(resume_ids), 25):
+        chunk = resume_ids[i : i + 25]
+        request_items = {table_name: [{"DeleteRequest": {"Key": {"id": resume_id}}} for resume_id in chunk]}
+        for retry in range(int(config["dynamodb_batch_write_max_retries"]) + 1):
+            if retry:
+                sleep(min(0.05 * 2**retry, 1))
+            response = dynamodb_resource.batch_write_item(RequestItems=request_items)
+            request_items = response.get("UnprocessedItems")
+            if not request_items:
+                break
+        else:
+            raise RuntimeError(f"{len(request_items[table_name])} items were still unprocessed after retrying")
+
+        ret["deleted"] += chunk
+        ret["batches"].append({"target": table_name, "requested": len(chunk), "deleted": len(chunk), "retries": retry})
+        print(f"- Deleted {len(chunk)} items from {table_name} after {retry} retries")
+
+    return ret
+
+
+def batch_delete_s3_object_versions(*, bucket: str, versions: list, raise_errors: bool = True) -> dict:
+    """
+    Deletes the provided object versions from the given S3 bucket using delete_objects, 1000 keys per request
+
+    Chunks are deleted concurrently. Keys that return an error are retried with exponential backoff up to
+    s3_delete_objects_max_retries times before an error is raised.
+
+    Parameters
+    ----------
+    bucket : str
+        The bucket to delete the object versions from
+    versions : list
+        The versions to delete in the following format:
+        [{"Key": "KeyName", "VersionId": "string"}, ...]
+    raise_errors : bool
+        Whether an error is raised for keys that still return an error after the retries. If not, they are logged
+        and left out of the deleted versions.
+
+    Returns
+    ------
+    dict
+        A dict in the following format:
+        {
+            "deleted": [{"Key": "KeyName", "VersionId": "string"}, ...],
+            "batches": [{"target": "bucket name", "requested": int, "deleted": int, "retries": int}, ...]
+        }
+    """
+
+    def delete_chunk(chunk: list) -> tuple:
+        requested = len(chunk)
+        deleted = []
+        for retry in range(int(config["s3_delete_objects_max_retries"]) + 1):
+            if retry:
+                sleep(min(0.05 * 2**retry, 1))
+            response = s3.delete_objects(Bucket=bucket, Delete={"Objects": chunk, "Quiet": False})
+            deleted += [
+                {"Key": deleted_object["Key"], "VersionId": deleted_object["VersionId"]}
+                for deleted_object in response.get("Deleted", [])
+            ]
+            errors = response.get("Errors")
+            if not errors:
+                break
+            chunk = [{"Key": error["Key"], "VersionId": error["VersionId"]} for error in errors]
+        else:
+            message = f"There was an error deleting the following objects from bucket {bucket}: {dumps(errors)}"
+            if raise_errors:
+                raise Exception(message)
+            print(message)
+
+        print(f"- Deleted {len(deleted)} object versions from {bucket} after {retry} retries")
+        return deleted, {"target": bucket, "requested": requested, "deleted": len(deleted), "retries": retry}
+
+    chunks = [versions[i : i + 1000] for i in range(0, len(versions), 1000)]
+    ret = {"deleted": [], "batches": []}
+    with ThreadPoolExecutor(max_workers=int(config["s3_delete_objects_max_workers"])) as executor:
+        for deleted, batch in executor.map(delete_chunk, chunks):
+            ret["deleted"] += deleted
+            ret["batches"].append(batch)
+
+    return ret
+
+
+def get_dangling_resumes(*, full_scan: bool = True) -> dict:
+    """
+    Gets all DynamoDB items and S3 objects that do not have a respective associated object or item
+
+    For a DynamoDB item to have an associated object, there must be an object in the resumes folder of the website
+    bucket, the object must have at least one non-delete-marker version, and if a delete marker is the first version,
+    a non-delete marker version must follow it. All of its attributes must also be filled in.
+    Items holding an unexpired resume ID reservation are not dangling.
+
+    For a website S3 object to have an associated item, the S3 object must have at least one non-delete-marker version,
+    if a delete marker is the first version, a non-delete marker version must follow it, and there must be an item
+    within the DynamoDB database with an ID matching the base object name.
+
+    For an unparsed document S3 object, it must not have existed for more than 30 seconds, otherwise its parse is
+    considered failed and dangling.
+
+    For a parsed document S3 object to have an associated item, the S3 object must have at least one non-delete-marker
+    version and it must have an associated dynamodb item.
+
+    By default, a full scan lists the whole ID index and all three S3 prefixes. Without a full scan, only the resume
+    IDs flagged inconsistent within the reconciliation index for longer than its grace period are checked, which is
+    much cheaper but only finds resumes that have changed since the reconciliation index was created. The S3 prefixes
+    are streamed one key at a time, keeping only the dangling versions and whether the html object of each resume is
+    live, so memory does not grow with the number of object versions.
+
+    Parameters
+    ----------
+    full_scan : bool
+        Whether to check every resume instead of only those flagged by the reconciliation index. Defaults to True.
+
+    Returns
+    ------
+    dict
+        A dict containing items and objects in the following format:
+        {
+            items: (id1, id2, ...),
+            html_objects: ({version1Dict}, {version2Dict}, ...),
+            unparsed_document_objects: ({version1Dict}, {version2Dict}, ...),
+            parsed_document_objects: ({version1Dict}, {version2Dict}, ...)
+        }
+        Each version dict will have the following format:
+        {
+            "Key": "KeyName",
+            "VersionId": "string",
+            "is_delete_marker": boolean,
+            "LastModifiedTime": datetime
+        }
+    """
+    required_attributes = [
+        "id",
+        "company",
+        "job_title",
+        "job_posting",
+        "view_count",
+        "resume_state",
+        "resume_url",
+        "date_created",
+    ]
+
+    def timed_listing(source: str, function, **kwargs):
+        start = monotonic()
+        ret = function(**kwargs)
+        print(f"- Listed {source} in {monotonic() - start:.3f} seconds")
+        return ret
+
+    def get_dangling_unparsed_document_versions(key: str, versions: list) -> list:
+        return [
+            version
+            for version in versions
+            if (datetime.now(timezone.utc) - version["LastModifiedTime"]).total_seconds() >= 30
+        ]
+
+    def get_dangling_parsed_document_versions(key: str, versions: list, resume_ids: frozenset) -> list:
+        if get_resume_id_from_object_key(key) not in resume_ids or all(
+            version["is_delete_marker"] for version in versions
+        ):
+            return versions
+        return []
+
+    # Resume IDs to the key of their html object and whether it is live. Only the versions of orphaned html objects are
+    # kept while listing, those of the html objects of dangling items are listed again once the items are known.
+    html_objects = {}
+
+    def get_dangling_html_versions(key: str, versions: list, resume_ids: frozenset) -> list:
+        resume_id = get_resume_id_from_object_key(key)
+        if resume_id not in resume_ids:
+            return versions
+        has_object_version = any(not version["is_delete_marker"] for version in versions)
+        has_two_delete_markers_first = (
+            len(versions) > 1 and versions[0]["is_delete_marker"] and versions[1]["is_delete_marker"]
+        )
+        html_objects[resume_id] = (key, has_object_version and not has_two_delete_markers_first)
+        return []
+
+    start = monotonic()
+    if full_scan:
+        # The listings are independent, so they run concurrently and share the module's thread safe boto3 clients
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            resume_ids_future = executor.submit(timed_listing, "resume IDs", get_all_ids_from_table)
+            resume_id_set_future = executor.submit(lambda: frozenset(resume_ids_future.result()))
+            # Object versions are streamed per key and only the dangling ones are kept, so memory stays bounded
+            dangling_html_objects_future = executor.submit(
+                timed_listing,
+                "html objects",
+                list_dangling_s3_object_versions,
+                bucket=config["s3_bucket_webpage"],
+                prefix=config["s3_bucket_webpage_resumes_location"],
+                file_extension=".html",
+                get_dangling_versions=lambda key, versions: get_dangling_html_versions(
+                    key, versions, resume_id_set_future.result()
+                ),
+            )
+            unparsed_document_objects_future = executor.submit(
+                timed_listing,
+                "unparsed document objects",
+                list_dangling_s3_object_versions,
+                bucket=config["s3_bucket_documents"],
+                prefix=config["s3_bucket_documents_upload_location"],
+                file_extension=".docx",
+                get_dangling_versions=get_dangling_unparsed_document_versions,
+            )
+            parsed_document_objects_future = executor.submit(
+                timed_listing,
+                "parsed document objects",
+                list_dangling_s3_object_versions,
+                bucket=config["s3_bucket_documents"],
+                prefix=config["s3_bucket_documents_parsed_location"],
+                file_extension=".docx",
+                get_dangling_versions=lambda key, versions: get_dangling_parsed_document_versions(
+                    key, versions, resume_id_set_future.result()
+                ),
+            )
+            all_resume_ids = resume_ids_future.result()
+            dangling_html_objects = dangling_html_objects_future.result()
+            dangling_unparsed_document_objects = unparsed_document_objects_future.result()
+            dangling_parsed_document_objects = parsed_document_objects_future.result()
+
+        items = get_items_from_table(
+            resume_ids=list(all_resume_ids), projection_expression=",".join(required_attributes + ["expires_at"])
+        )
+    else:
+        candidate_ids = timed_listing("inconsistent resume IDs", get_inconsistent_resume_ids)
+        items = get_items_from_table(
+            resume_ids=list(candidate_ids), projection_expression=",".join(required_attributes + ["expires_at"])
+        )
+        all_resume_ids = tuple(items.keys())
+
+        # Only the keys of the flagged IDs are listed, so each listing is a handful of requests
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            html_objects_future, unparsed_document_objects_future, parsed_document_objects_future = [
+                executor.submit(
+                    timed_listing,
+                    source,
+                    list_s3_object_versions_of_keys,
+                    bucket=bucket,
+                    keys=[f"{location}/{resume_id}{file_extension}" for resume_id in candidate_ids],
+                )
+                for source, bucket, location, file_extension in (
+                    (
+                        "html objects",
+                        config["s3_bucket_webpage"],
+                        config["s3_bucket_webpage_resumes_location"],
+                        ".html",
+                    ),
+                    (
+                        "unparsed document objects",
+                        config["s3_bucket_documents"],
+                        config["s3_bucket_documents_upload_location"],
+                        ".docx",
+                    ),
+                    (
+                        "parsed document objects",
+                        config["s3_bucket_documents"],
+                        config["s3_bucket_documents_parsed_location"],
+                        ".docx",
+                    ),
+                )
+            ]
+            resume_id_set = frozenset(all_resume_ids)
+            dangling_html_objects = [
+                version
+                for key, versions in html_objects_future.result().items()
+                for version in get_dangling_html_versions(key, versions, resume_id_set)
+            ]
+            dangling_unparsed_document_objects = [
+                version
+                for key, versions in unparsed_document_objects_future.result().items()
+                for version in get_dangling_unparsed_document_versions(key, versions)
+            ]
+            dangling_parsed_document_objects = [
+                version
+                for key, versions in parsed_document_objects_future.result().items()
+                for version in get_dangling_parsed_document_versions(key, versions, resume_id_set)
+            ]
+    print(f"- Listed all sources in {monotonic() - start:.3f} seconds")
+
+    dangling_items = list()
+    dangling_item_html_keys = list()
+
+    now = int(datetime.now(timezone.utc).timestamp())
+
+    for resume_id in all_resume_ids:
+        item = items.get(resume_id, {})
+        if item.get("resume_state") == resume_pending_state and int(item.get("expires_at", 0)) > now:
+            # A reserved ID whose resume has not been added yet, its upload may already have been converted
+            continue
+        if resume_id in html_objects.keys():
+            html_key, is_live = html_objects[resume_id]
+            intersection = set(item.keys()).intersection(required_attributes)
+            if len(intersection) < len(required_attributes) or not is_live:
+                dangling_items.append(resume_id)
+                dangling_item_html_keys.append(html_key)
+        else:
+            dangling_items.append(resume_id)
+
+    if dangling_item_html_keys:
+        dangling_html_objects += [
+            version
+            for versions in list_s3_object_versions_of_keys(
+                bucket=config["s3_bucket_webpage"], keys=dangling_item_html_keys
+            ).values()
+            for version in versions
+        ]
+
+    ret_dict = dict()
+    ret_dict["items"] = tuple(dangling_items)
+    ret_dict["html_objects"] = tuple(dangling_html_objects)
+    ret_dict["unparsed_document_objects"] = tuple(dangling_unparsed_document_objects)
+    ret_dict["parsed_document_objects"] = tuple(dangling_parsed_document_objects)
+
+    return ret_dict
+
+
+def get_all_ids_from_table() -> tuple:
     """
     Gets all ids from the DynamoDB table's ID index
 
@@ -950,6 +2175,39 @@ def get_all_ids_from_table() -> tuple:
     return tuple(ret_list)
 
 
+def get_inconsistent_resume_ids() -> tuple:
+    """
+    Gets the resume IDs the reconciliation index has flagged inconsistent for longer than its grace period, which
+    leaves uploads and conversions in progress time to complete
+
+    Returns
+    ------
+    tuple
+        A tuple of the flagged resume IDs
+    """
+    key_condition = Key("inconsistent").eq("true") & Key("updated_at").lte(
+        int(datetime.now(timezone.utc).timestamp()) - int(config["dynamodb_reconciliation_grace_period_seconds"])
+    )
+    ret_list = []
+    more_items = True
+    while more_items:
+        if type(more_items) is bool:
+            response = reconciliation_table.query(
+                IndexName=config["dynamodb_reconciliation_inconsistent_index"], KeyConditionExpression=key_condition
+            )
+        else:
+            response = reconciliation_table.query(
+                IndexName=config["dynamodb_reconciliation_inconsistent_index"],
+                KeyConditionExpression=key_condition,
+                ExclusiveStartKey=more_items,
+            )
+
+        ret_list += [item["id"] for item in response.get("Items", [])]
+        more_items = response["LastEvaluatedKey"] if "LastEvaluatedKey" in response.keys() else False
+
+    return tuple(ret_list)
+
+
 def get_item_from_table(
     *,
     resume_id: str,
@@ -976,8 +2234,67 @@ def get_item_from_table(
     ret = {}
     if "Item" in item.keys():
         ret = item["Item"]
-        if "view_count" in item["Item"].keys():
-            ret["view_count"] = int(ret["view_count"])
+        for key in ["view_count", "version"]:
+            if key in item["Item"].keys():
+                ret[key] = int(ret[key])
+
+    return ret
+
+
+def get_items_from_table(*, resume_ids: list, projection_expression: str, consistent_read: bool = False) -> dict:
+    """
+    Gets the items with the provided IDs from the DynamoDB table using BatchGetItem, 100 keys per request
+
+    Chunks are requested concurrently. Keys returned as unprocessed are retried with exponential backoff up to
+    dynamodb_batch_get_max_retries times before an error is raised.
+
+    Parameters
+    ----------
+    resume_ids : list
+        The IDs of the resumes within DynamoDB
+    projection_expression : str
+        A comma separated list of attributes that should be retrieved when getting the items
+    consistent_read : bool
+        Whether the items should be read with strongly consistent reads
+
+    Returns
+    ------
+    dict
+        A dictionary of resume IDs to their returned item attributes. IDs with no item are omitted.
+    """
+    table_name = config["dynamodb_table"]
+    attribute_names = {f"#{attribute}": attribute for attribute in projection_expression.split(",")}
+
+    def get_chunk(chunk: list) -> list:
+        items = []
+        request_items = {
+            table_name: {
+                "Keys": [{"id": resume_id} for resume_id in chunk],
+                "ProjectionExpression": ",".join(attribute_names.keys()),
+                "ExpressionAttributeNames": attribute_names,
+                "ConsistentRead": consistent_read,
+            }
+        }
+        for retry in range(int(config["dynamodb_batch_get_max_retries"]) + 1):
+            if retry:
+                sleep(min(0.05 * 2**retry, 1))
+            response = dynamodb_resource.batch_get_item(RequestItems=request_items)
+            items += response["Responses"].get(table_name, [])
+            request_items = response.get("UnprocessedKeys")
+            if not request_items:
+                return items
+
+        raise RuntimeError(f"{len(request_items[table_name]['Keys'])} keys were still unprocessed after retrying")
+
+    chunks = [resume_ids[i : i + 100] for i in range(0, len(resume_ids), 100)]
+    ret = {}
+    with ThreadPoolExecutor(max_workers=int(config["dynamodb_batch_get_max_workers"])) as executor:
+        for items in executor.map(get_chunk, chunks):
+            for item in items:
+                for attribute in ["view_count", "version"]:
+                    if attribute in item.keys():
+                        item[attribute] = int(item[attribute])
+                ret[item["id"]] = item
 
     return ret
 
@@ -1004,6 +2321,132 @@ def delete_item_from_table(*, resume_id: str) -> int:
         return 500
 
 
+def bump_resume_cache_version() -> None:
+    """
+    Increments the cache version stamp within the views table, causing the resume backend's warm containers to drop
+    their cached resume existence lookups
+    """
+    _ = views_table.update_item(
+        Key={"id": views_table_cache_version_id},
+        UpdateExpression="ADD cache_version :increment, change_sequence :increment",
+        ExpressionAttributeValues={":increment": 1},
+    )
+    print("Bumped resume cache version")
+
+
+def bump_resume_change_sequence() -> None:
+    """
+    Increments the change sequence within the views table, changing the ETag of the resume listings
+    """
+    _ = views_table.update_item(
+        Key={"id": views_table_cache_version_id},
+        UpdateExpression="ADD change_sequence :increment",
+        ExpressionAttributeValues={":increment": 1},
+    )
+    print("Bumped resume change sequence")
+
+
+def get_resumes_list_etag(body: dict) -> str:
+    """
+    Returns the ETag of a resume listing without reading the resumes table
+
+    The ETag covers the change sequence, the request body, and the current resumes_list_etag_max_age_seconds window.
+    The window bounds how stale view counts and the attributes set outside of the manager backend, such as resume_url
+    after a parse, can be.
+
+    Parameters
+    ----------
+    body : dict
+        The body of the listing request
+
+    Returns
+    ------
+    str
+        The quoted ETag
+    """
+    item = views_table.get_item(Key={"id": views_table_cache_version_id}, ProjectionExpression="change_sequence")
+    change_sequence = int(item["Item"]["change_sequence"]) if "change_sequence" in item.get("Item", {}).keys() else 0
+    window = int(time() // int(config["resumes_list_etag_max_age_seconds"]))
+    return get_etag({"change_sequence": change_sequence, "window": window, "request": body})
+
+
+def get_etag(value) -> str:
+    return f'"{sha256(dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]}"'
+
+
+def get_version_condition(*, version: int = None) -> tuple:
+    """
+    Builds the condition that makes an update of a resume item depend on its version attribute
+
+    Parameters
+    ----------
+    version : int
+        The version of the item the client last read. Items created before versions were stored match version 0.
+
+    Returns
+    ------
+    tuple (condition_expression, expression_attribute_values)
+        condition_expression : str
+            An expression to append to an existing ConditionExpression, or an empty string if version is None
+        expression_attribute_values : dict
+            The values used by condition_expression
+    """
+    if version is None:
+        return "", {}
+    if int(version) == 0:
+        return " AND (attribute_not_exists(version) OR version = :version)", {":version": 0}
+    return " AND version = :version", {":version": int(version)}
+
+
+def get_condition_failure_status_code(error: Exception, *, resume_states: list) -> int:
+    """
+    Maps a ConditionalCheckFailedException raised with ReturnValuesOnConditionCheckFailure set to ALL_OLD to a status
+    code. An item that exists in one of the expected states can only have failed on its version.
+
+    Parameters
+    ----------
+    error : Exception
+        The ConditionalCheckFailedException, or the CancellationReasons entry of a cancelled TransactWriteItems
+    resume_states : list
+        The resume_state values the update expected
+
+    Returns
+    ------
+    int
+        409 - The item was in an expected state, so its version did not match
+        404 - The item could not be found or was not in an expected state
+    """
+    item = error.get("Item", {}) if isinstance(error, dict) else error.response.get("Item", {})
+    if item.get("resume_state", {}).get("S") in resume_states:
+        return 409
+    return 404
+
+
+def get_return_attributes(item: dict) -> dict:
+    """
+    Removes the internal attributes of a resume item and converts its numbers to ints, ready to be returned
+
+    Parameters
+    ----------
+    item : dict
+        The item's attributes as returned by DynamoDB
+
+    Returns
+    ------
+    dict
+        The item's public attributes with its no_increment_id set
+    """
+    return_attributes = {
+        key: value
+        for (key, value) in item.items()
+        if key not in ["resume_state", "delete_marker_id", "invalidate_cache", "invalidate_cache_at", "expires_at"]
+    }
+    for key in ["view_count", "version"]:
+        if key in return_attributes.keys():
+            return_attributes[key] = int(return_attributes[key])
+    return add_no_increment_token(return_attributes)
+
+
 def list_item_names_from_s3(
     *,
     bucket: str,
@@ -1060,9 +2503,72 @@ def list_item_names_from_s3(
     return tuple(s3_objects)
 
 
-def list_all_s3_object_versions(
+def get_resume_id_from_object_key(key: str) -> str:
+    return ".".join(key.split("/")[-1].split(".")[0:-1])
+
+
+def iterate_s3_object_versions(
     *, bucket: str, prefix: str, file_extension: str = "", recursive: bool = False
-) -> tuple:
+) -> Iterator[tuple]:
+    """
+    Yields the versions of each object under a prefix in the given S3 bucket, one key at a time
+
+    Pages are read with the list_object_versions paginator, which carries both the key and version ID markers between
+    pages. S3 lists keys in order, so only the versions of the last key of a page are held until the next page shows
+    whether more of them follow, keeping memory bounded to a single page.
+
+    Parameters
+    ----------
+    bucket : str
+        The bucket to list versions from
+    prefix : str
+        The prefix to list
+    file_extension : str
+        The extension to filter items to
+    recursive : bool
+        Whether or not objects within subfolders of the prefix should be included
+
+    Returns
+    ----------
+    Iterator[tuple]
+        Tuples of the key and its versions, newest first, in the following format:
+        (
+            "KeyName1",
+            [
+                {"Key": "KeyName1", "VersionId": "string", "is_delete_marker": boolean, "LastModifiedTime": datetime},
+                {"Key": "KeyName1", "VersionId": "string", "is_delete_marker": boolean, "LastModifiedTime": datetime}
+            ]
+        )
+    """
+    levels = len(prefix.split("/"))
+    current_key = None
+    current_versions = []
+    paginator = s3.get_paginator("list_object_versions")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        page_versions = [
+            {
+                "Key": version["Key"],
+                "VersionId": version["VersionId"],
+                "LastModifiedTime": version["LastModified"],
+                "is_delete_marker": is_delete_marker,
+            }
+            for versions_key, is_delete_marker in (("DeleteMarkers", True), ("Versions", False))
+            for version in page.get(versions_key, [])
+            if version["Key"].endswith(file_extension) and (recursive or len(version["Key"].split("/")) - 1 == levels)
+        ]
+        for version in sorted(page_versions, key=lambda version: version["Key"]):
+            if version["Key"] != current_key:
+                if current_versions:
+                    yield current_key, sorted(current_versions, key=lambda obj: obj["LastModifiedTime"], reverse=True)
+                current_key = version["Key"]
+                current_versions = []
+            current_versions.append(version)
+
+    if current_versions:
+        yield current_key, sorted(current_versions, key=lambda obj: obj["LastModifiedTime"], reverse=True)
+
+
+def list_all_s3_object_versions(*, bucket: str, prefix: str, file_extension: str = "", recursive: bool = False) -> dict:
     """
     Lists all versions of a specified prefix in the given S3 bucket
 
@@ -1074,6 +2580,8 @@ def list_all_s3_object_versions(
         The prefix to list
     file_extension : str
         The extension to filter items to
+    recursive : bool
+        Whether or not objects within subfolders of the prefix should be included
 
     Returns
     ----------
@@ -1089,62 +2597,67 @@ def list_all_s3_object_versions(
             ]
         }
     """
-    levels = len(prefix.split("/"))
-    s3_objects = s3.list_object_versions(Bucket=bucket, Prefix=prefix)
-    has_more_objects = len(set(s3_objects.keys()).intersection(["Versions", "DeleteMarkers"]))
-    objects = dict()
-    # Pagination
-    while has_more_objects:
-        # Delete the versions per page
-        if "DeleteMarkers" in s3_objects.keys():
-            for version in s3_objects["DeleteMarkers"]:
-                if not recursive and len(version["Key"].split("/")) - 1 != levels:
-                    continue
-                if version["Key"] not in objects.keys():
-                    objects[version["Key"]] = list()
-                objects[version["Key"]] += [
-                    {
-                        "Key": version["Key"],
-                        "VersionId": version["VersionId"],
-                        "LastModifiedTime": version["LastModified"],
-                        "is_delete_marker": True,
-                    }
-                ]
-
-        if "Versions" in s3_objects.keys():
-            for version in s3_objects["Versions"]:
-                if not recursive and len(version["Key"].split("/")) - 1 != levels:
-                    continue
-                if version["Key"] not in objects.keys():
-                    objects[version["Key"]] = list()
-                objects[version["Key"]] += [
-                    {
-                        "Key": version["Key"],
-                        "VersionId": version["VersionId"],
-                        "LastModifiedTime": version["LastModified"],
-                        "is_delete_marker": False,
-                    }
-                ]
-
-        if "NextVersionIdMarker" in s3_objects.keys():
-            s3_objects = s3.list_object_versions(
-                Bucket=bucket, Prefix=prefix, VersionIdMarker=s3_objects["NextVersionIdMarker"]
-            )
-        else:
-            has_more_objects = False
+    return dict(
+        iterate_s3_object_versions(bucket=bucket, prefix=prefix, file_extension=file_extension, recursive=recursive)
+    )
 
-    # Filter the objects to the file extension
-    if file_extension != "":
-        objects = {key: value for key, value in objects.items() if key.endswith(file_extension)}
-        if len(objects) == 0:
-            return {}
 
-    # Sort the objects by date, newest first
-    objects = {
-        key: sorted(value, key=lambda obj: obj["LastModifiedTime"], reverse=True) for key, value in objects.items()
-    }
+def list_s3_object_versions_of_keys(*, bucket: str, keys: list) -> dict:
+    """
+    Lists all versions of each of the given keys in the given S3 bucket, listing the keys concurrently
+
+    Parameters
+    ----------
+    bucket : str
+        The bucket to list versions from
+    keys : list
+        The exact keys to list
+
+    Returns
+    ----------
+    dict
+        A dictionary of the keys that have versions in the same format as list_all_s3_object_versions
+    """
+
+    def list_key_versions(key: str) -> list:
+        for versions_key, versions in iterate_s3_object_versions(bucket=bucket, prefix=key, recursive=True):
+            if versions_key == key:
+                return versions
+        return []
+
+    with ThreadPoolExecutor(max_workers=int(config["s3_list_object_versions_max_workers"])) as executor:
+        key_versions = dict(zip(keys, executor.map(list_key_versions, keys)))
+
+    return {key: versions for key, versions in key_versions.items() if versions}
+
 
-    return objects
+def list_dangling_s3_object_versions(
+    *, bucket: str, prefix: str, file_extension: str = "", get_dangling_versions
+) -> list:
+    """
+    Streams the versions of each object under a prefix and keeps only those that get_dangling_versions returns
+
+    Parameters
+    ----------
+    bucket : str
+        The bucket to list versions from
+    prefix : str
+        The prefix to list
+    file_extension : str
+        The extension to filter items to
+    get_dangling_versions : callable
+        Called with each key and its versions, newest first. Returns the versions that are dangling.
+
+    Returns
+    ----------
+    list
+        The dangling versions of all objects
+    """
+    dangling_versions = []
+    for key, versions in iterate_s3_object_versions(bucket=bucket, prefix=prefix, file_extension=file_extension):
+        dangling_versions += get_dangling_versions(key, versions)
+
+    return dangling_versions
 
 
 def delete_all_s3_object_versions(*, bucket: str, object_name: str) -> int:
@@ -1156,7 +2669,7 @@ def delete_all_s3_object_versions(*, bucket: str, object_name: str) -> int:
     bucket : str
         The bucket to delete the object versions from
     object_name : str
-        The object key to delete
+        The object key to delete, or a prefix ending with / to delete all objects under it
 
     Returns
     ----------
@@ -1164,44 +2677,67 @@ def delete_all_s3_object_versions(*, bucket: str, object_name: str) -> int:
         Number of deleted versions
     """
     num_deleted_versions = 0
-    s3_object = s3.list_object_versions(Bucket=bucket, Prefix=object_name)
-    has_more_objects = len(set(s3_object.keys()).intersection(["Versions", "DeleteMarkers"]))
+    for key, versions in iterate_s3_object_versions(bucket=bucket, prefix=object_name, recursive=True):
+        if key != object_name and not object_name.endswith("/"):
+            continue
 
-    # Pagination
-    while has_more_objects:
-        # Delete the versions per page
-        if "DeleteMarkers" in s3_object.keys():
-            delete_marker_versions = [
-                {"Key": version["Key"], "VersionId": version["VersionId"]} for version in s3_object["DeleteMarkers"]
+        # Delete the delete markers first to allow those s3 event notifications to go through
+        for is_delete_marker in (True, False):
+            object_versions = [
+                {"Key": version["Key"], "VersionId": version["VersionId"]}
+                for version in versions
+                if version["is_delete_marker"] is is_delete_marker
             ]
+            # delete_objects accepts at most 1000 keys per request
+            for i in range(0, len(object_versions), 1000):
+                response = s3.delete_objects(Bucket=bucket, Delete={"Objects": object_versions[i : i + 1000]})
+                if response.get("Errors"):
+                    print(f"Error deleting some versions. Errors:\n{dumps(response['Errors'])}")
+                    raise ConnectionError("Error deleting versions")
+                num_deleted_versions += len(object_versions[i : i + 1000])
 
-            # Delete the delete markers first to allow those s3 event notifications to go through
-            _ = s3.delete_objects(Bucket=bucket, Delete={"Objects": delete_marker_versions})
-            if "Errors" in s3_object.keys():
-                print(f"Error deleting some delete marker versions. Errors:\n{dumps(s3_object['Errors'])}")
-                raise ConnectionError("Error deleting versions")
-            else:
-                num_deleted_versions += len(delete_marker_versions)
+    return num_deleted_versions
 
-        if "Versions" in s3_object.keys():
-            object_versions = [
-                {"Key": version["Key"], "VersionId": version["VersionId"]} for version in s3_object["Versions"]
-            ]
-            _ = s3.delete_objects(Bucket=bucket, Delete={"Objects": object_versions})
-            if "Errors" in s3_object.keys():
-                print(f"Error deleting some versions. Errors:\n{dumps(s3_object['Errors'])}")
-                raise ConnectionError("Error deleting versions")
-            else:
-                num_deleted_versions += len(object_versions)
 
-        if "NextVersionIdMarker" in s3_object.keys():
-            s3_object = s3.list_object_versions(
-                Bucket=bucket, Prefix=object_name, VersionIdMarker=s3_object["NextVersionIdMarker"]
-            )
-        else:
-            has_more_objects = False
+def add_no_increment_token(item: dict) -> dict:
+    """
+    Sets an item's no_increment_id to a signed no increment token generated from its id. Items keep their stored
+    no_increment_id if no signing keys could be loaded.
 
-    return num_deleted_versions
+    Parameters
+    ----------
+    item : dict
+        The item's attributes. Must contain id for a token to be generated.
+
+    Returns
+    ------
+    dict
+        The same item dict passed in
+    """
+    if no_increment_token_keys and "id" in item.keys():
+        item["no_increment_id"] = generate_no_increment_token(item["id"])
+    return item
+
+
+def generate_no_increment_token(resume_id: str) -> str:
+    """
+    Generates a no increment token for the resume ID, which the resume backend can verify without reading DynamoDB
+
+    Parameters
+    ----------
+    resume_id : str
+        The ID of the resume within DynamoDB
+
+    Returns
+    ------
+    str
+        A token with the format {key_id}.{signature}, where signature is the unpadded urlsafe base64 HMAC-SHA256 of
+        the resume ID using the current signing key
+    """
+    signature = hmac.new(
+        bytes(no_increment_token_keys[no_increment_token_key_id], "UTF-8"), bytes(resume_id, "UTF-8"), sha256
+    ).digest()
+    return f"{no_increment_token_key_id}.{urlsafe_b64encode(signature).decode('UTF-8').rstrip('=')}"
 
 
 def generate_random_string(length: int) -> str:
@@ -1,10 +1,17 @@
-from datetime import datetime
+from base64 import urlsafe_b64encode
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from hashlib import sha256
 from json import loads, dumps
+from random import randrange
 from re import match
+from threading import Lock
+from time import monotonic, sleep, time
 from traceback import format_exc
 import ast
 import boto3
+import hmac
 
 with open("./config.json", "r") as f:
     config = ast.literal_eval(f.read())
@@ -14,11 +21,34 @@ try:
     resumes_table = dynamodb.Table(config["dynamodb_resumes_table"])
     viewers_table = dynamodb.Table(config["dynamodb_resume_viewers_table"])
     views_table = dynamodb.Table(config["dynamodb_resume_views_table"])
+    view_count_shards = max(int(config["dynamodb_resume_views_shards"]), 1)
+    ConditionalCheckFailedException = dynamodb.meta.client.exceptions.ConditionalCheckFailedException
     error_loading_tables = False
 except Exception as e:
     print(f"Error loading table. Stack trace: {format_exc()}")
     error_loading_tables = True
 
+no_increment_token_keys = {}
+no_increment_token_keys_loaded_at = None
+# Minimum time between reloads of the signing keys when a token signed with an unknown key is received
+no_increment_token_keys_reload_interval = 60
+
+
+def load_no_increment_token_keys() -> None:
+    """
+    Loads the no increment token signing keys from SSM into the no_increment_token_keys global variable
+    """
+    globals()["no_increment_token_keys_loaded_at"] = monotonic()
+    try:
+        ssm = boto3.client("ssm", region_name=config["ssm_region"])
+        parameter = ssm.get_parameter(Name=config["ssm_no_increment_token_keys_parameter"], WithDecryption=True)
+        globals()["no_increment_token_keys"] = loads(parameter["Parameter"]["Value"])["keys"]
+    except Exception:
+        print(f"Error loading no increment token keys. Stack trace: {format_exc()}")
+
+
+load_no_increment_token_keys()
+
 ret_headers = {
     "Access-Control-Allow-Credentials": config["Access_Control_Allow_Credentials"],
     "Access-Control-Allow-Origin": config["Access_Control_Allow_Origin"],
@@ -29,6 +59,286 @@ internal_server_error_response = {"statusCode": "500", "body": "Internal server
 
 bad_resume_id_response = {"statusCode": "404", "body": "ID not found", "headers": ret_headers}
 
+# Kept at module level so warm containers reuse the worker threads between invocations
+executor = ThreadPoolExecutor(max_workers=4)
+
+views_table_total_id = "all_resumes"
+# Items of resume IDs the manager backend has reserved for an upload, which do not exist as resumes yet
+resume_pending_state = "pending"
+views_table_cache_version_id = "resume_cache_version"
+
+# Raw views are stored in one viewers table partition per day so they can be queried by time and rolled up daily.
+# Dedup items are stored in their own partition per viewer and resume. Both expire through the table's TTL.
+viewers_table_views_bucket_prefix = "views#"
+viewers_table_dedup_bucket_prefix = "dedup#"
+viewers_table_dedup_event = "dedup"
+viewer_events_retention = int(config["viewer_events_retention_days"]) * 86400
+
+# Either api, where each call counts a view, or access_logs, where views are counted from CloudFront access logs
+view_counting_mode = config["view_counting_mode"]
+
+# The most recent total view count seen by this container and when it was read, refreshed by every increment.
+# It is served to owner previews and deduplicated views until it is older than view_count_cache_max_age seconds.
+last_view_count = None
+last_view_count_at = None
+view_count_cache_max_age = float(config["view_count_cache_max_age_seconds"])
+
+
+class ResumeExistenceCache:
+    """
+    A bounded, in-process LRU cache of whether resume IDs exist within the resumes table
+
+    Both positive and negative lookups are cached, each with their own TTL. The whole cache is cleared whenever the
+    cache version stamp in the views table changes, which the manager backend bumps when resumes are added or deleted.
+    """
+
+    def __init__(self, *, max_size: int, ttl: float, negative_ttl: float, version_check_interval: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.version_check_interval = version_check_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._version_checked_at = None
+        self._lock = Lock()
+
+    def get(self, resume_id: str) -> bool | None:
+        """
+        Returns True or False if the existence of resume_id is cached, otherwise None
+        """
+        with self._lock:
+            entry = self._entries.get(resume_id)
+            if entry is None or entry[1] <= monotonic():
+                if entry is not None:
+                    del self._entries[resume_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(resume_id)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, resume_id: str, exists: bool) -> None:
+        with self._lock:
+            self._entries[resume_id] = (exists, monotonic() + (self.ttl if exists else self.negative_ttl))
+            self._entries.move_to_end(resume_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def check_version(self) -> None:
+        """
+        Clears the cache if the version stamp has changed. The stamp is read at most once per version_check_interval.
+        """
+        now = monotonic()
+        if self._version_checked_at is not None and now - self._version_checked_at < self.version_check_interval:
+            return
+        self._version_checked_at = now
+
+        response = views_table.get_item(
+            Key={"id": views_table_cache_version_id}, AttributesToGet=["id", "cache_version"]
+        )
+        version = response["Item"]["cache_version"] if "Item" in response.keys() else 0
+        if version != self._version:
+            if self._version is not None:
+                print(f"- Resume cache version changed from {self._version} to {version}. Clearing cache")
+            self.clear()
+            self._version = version
+
+
+resume_cache = ResumeExistenceCache(
+    max_size=int(config["resume_cache_max_size"]),
+    ttl=float(config["resume_cache_ttl_seconds"]),
+    negative_ttl=float(config["resume_cache_negative_ttl_seconds"]),
+    version_check_interval=float(config["resume_cache_version_check_interval_seconds"]),
+)
+
+
+class ViewerEventQueue:
+    """
+    A buffer of viewer events which are written to the viewers table in batches rather than one put per view
+
+    Every invocation writes its events before it returns, so no events are left in the memory of a container that is
+    frozen or idles until it is shut down. With an executor, a write is started as soon as an event is put so it runs
+    alongside the view count updates, and wait collects it at the end of the invocation. Items left unprocessed by a
+    batch write are retried with exponential backoff, and items that still cannot be written are logged.
+
+    The writer is any callable that takes a list of items, writes them, and returns the items that were not processed.
+    write_viewer_events_to_table is used in Lambda and InMemoryViewerEventWriter can be used to run this locally.
+    """
+
+    def __init__(self, *, writer, batch_size: int = 25, max_retries: int = 5, executor=None):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.executor = executor
+        self._events = []
+        self._futures = []
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def put(self, item: dict) -> None:
+        with self._lock:
+            self._events.append(item)
+            if self.executor:
+                self._futures.append(self.executor.submit(self.flush))
+
+    def flush(self) -> int:
+        """
+        Writes all buffered events
+
+        Returns
+        ------
+        int
+            The number of events written
+        """
+        with self._lock:
+            events, self._events = self._events, []
+
+        written = 0
+        for i in range(0, len(events), self.batch_size):
+            items = events[i : i + self.batch_size]
+            for retry in range(self.max_retries + 1):
+                if retry:
+                    sleep(min(0.05 * 2**retry, 1))
+                unprocessed = self.writer(items)
+                written += len(items) - len(unprocessed)
+                items = unprocessed
+                if not items:
+                    break
+            if items:
+                print(f"- {len(items)} viewer events could not be written after {self.max_retries} retries")
+                print(f"- Unwritten viewer events: {dumps(items)}")
+
+        return written
+
+    def wait(self) -> int:
+        """
+        Waits for the writes started by put, then writes any events still buffered
+
+        Returns
+        ------
+        int
+            The number of events written
+        """
+        with self._lock:
+            futures, self._futures = self._futures, []
+
+        written = 0
+        for future in futures:
+            try:
+                written += future.result()
+            except Exception:
+                print(f"Error writing viewer events to DynamoDB. Stack trace: {format_exc()}")
+
+        return written + self.flush()
+
+
+class InMemoryViewerEventWriter:
+    """
+    A local stand-in for the viewers table which records each batch it is given
+
+    The first unprocessed_batches calls leave their last item unprocessed to exercise the retry path.
+    """
+
+    def __init__(self, *, unprocessed_batches: int = 0):
+        self.batches = []
+        self.items = []
+        self.unprocessed_batches = unprocessed_batches
+
+    def __call__(self, items: list) -> list:
+        self.batches.append(list(items))
+        if self.unprocessed_batches > 0:
+            self.unprocessed_batches -= 1
+            self.items += items[:-1]
+            return items[-1:]
+        self.items += items
+        return []
+
+
+def write_viewer_events_to_table(items: list) -> list:
+    """
+    Writes up to 25 items to the viewers table with a single batch_write_item call
+
+    Parameters
+    ----------
+    items : list
+        The viewer items to put
+
+    Returns
+    ------
+    list
+        The items that DynamoDB did not process
+    """
+    response = dynamodb.batch_write_item(
+        RequestItems={config["dynamodb_resume_viewers_table"]: [{"PutRequest": {"Item": item}} for item in items]}
+    )
+    unprocessed = response.get("UnprocessedItems", {}).get(config["dynamodb_resume_viewers_table"], [])
+    return [request["PutRequest"]["Item"] for request in unprocessed]
+
+
+class ViewerDedupFilter:
+    """
+    An in-container Bloom filter of viewer and resume pairs seen within the dedup window
+
+    The filter is split into two generations which are rotated every half window, so a pair is remembered for between
+    half a window and a full window. Misses are always passed on to the conditional put in the viewers table, so the
+    filter only needs to be right about the pairs it reports as seen, which it is apart from its false positive rate.
+    """
+
+    def __init__(self, *, window: float, bits: int, hashes: int):
+        self.window = window
+        self.bits = bits
+        self.hashes = hashes
+        self._generations = [bytearray(bits // 8 + 1), bytearray(bits // 8 + 1)]
+        self._rotated_at = monotonic()
+        self._lock = Lock()
+
+    def _positions(self, key: str) -> list:
+        digest = sha256(bytes(key, "UTF-8")).digest()
+        first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:16], "big") | 1
+        return [(first + i * second) % self.bits for i in range(self.hashes)]
+
+    def _rotate(self) -> None:
+        if monotonic() - self._rotated_at >= self.window / 2:
+            self._generations = [bytearray(self.bits // 8 + 1), self._generations[0]]
+            self._rotated_at = monotonic()
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self._rotate()
+            for position in self._positions(key):
+                self._generations[0][position // 8] |= 1 << position % 8
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._rotate()
+            positions = self._positions(key)
+            return any(
+                all(generation[position // 8] & 1 << position % 8 for position in positions)
+                for generation in self._generations
+            )
+
+
+viewer_dedup_window = int(config["viewer_dedup_window_seconds"])
+viewer_dedup_filter = ViewerDedupFilter(
+    window=viewer_dedup_window,
+    bits=int(config["viewer_dedup_filter_bits"]),
+    hashes=int(config["viewer_dedup_filter_hashes"]),
+)
+
+viewer_events = ViewerEventQueue(
+    writer=write_viewer_events_to_table,
+    batch_size=int(config["viewer_events_batch_size"]),
+    executor=executor,
+)
+
 
 def handler(event, context):
     # if loading the tables errored out or the uri doesn't match content/[12 character alphanumeric].html format
@@ -56,91 +366,403 @@ def handler(event, context):
     print(f"- Resume ID: {resume_id}")
     print(f"- No Increment ID: {no_increment_id}")
 
-    if resume_id:
+    if resume_id and not response:
         try:
-            resume_exists = check_if_resume_exists(resume_id)
+            view_count = record_view(resume_id=resume_id, no_increment_id=no_increment_id, client_ip=source_ip)
+            resume_exists = view_count is not None
         except Exception:
-            print(f"Error getting item from resumes table. Stack trace: {format_exc()}")
+            print(f"Error updating or getting data from DynamoDB. Stack trace: {format_exc()}")
             response = internal_server_error_response
 
     if resume_exists:
-        if no_increment_id and check_if_no_increment_id_matches(resume_id, no_increment_id):
-            print("- No Increment ID matches")
-            view_count = get_view_count()
-        else:
-            print("- No Increment ID does not match")
-            view_count = increase_view_count(resume_id=resume_id)
-
-        try:
-            add_item_to_viewers_table(clientIp=source_ip)
-
-            response = {
-                "statusCode": "200",
-                "body": dumps({"views": f"{view_count}"}),
-                "headers": ret_headers,
-            }
-        except Exception:
-            print(f"Error updating or getting data from DynamoDB. Stack trace: {format_exc()}")
-            response = internal_server_error_response
-    else:
+        response = {
+            "statusCode": "200",
+            "body": dumps({"views": f"{view_count}"}),
+            "headers": ret_headers,
+        }
+    elif not response:
         print("- Resume ID does not exist")
         response = bad_resume_id_response
 
+    try:
+        viewer_events_written = viewer_events.wait()
+        print(f"- Viewer events written: {viewer_events_written}")
+    except Exception:
+        print(f"Error writing viewer events to DynamoDB. Stack trace: {format_exc()}")
+
+    print(f"- Resume cache hits: {resume_cache.hits}, misses: {resume_cache.misses}")
     print(f"- Sending response: {dumps(response, indent=4)}")
 
     return response
 
 
-def check_if_resume_exists(resume_id: str) -> bool:
-    response = resumes_table.get_item(Key={"id": resume_id}, AttributesToGet=["id"])
-
-    if "Item" in response.keys():
-        return True
+def record_view(*, resume_id: str, no_increment_id: str, client_ip: str) -> int | None:
+    """
+    Records a single view of a resume in as few round trips to DynamoDB as possible
+
+    Without a no increment ID, the resume's view count is incremented with a conditional update, which doubles as
+    the existence check. The global view count increment is then sent while the viewer event is being written.
+    With a stored no increment ID, a single read both checks existence and compares the ID. A signed no increment
+    token is verified locally, and the resume's existence is then checked through the existence cache.
+
+    Resumes known not to exist from the existence cache are rejected without any call to the resumes table. Within the
+    dedup window, the dedup item and the view count increment are written in a single transaction, so a view costs
+    one round trip to the resumes table and leaves no dedup item behind for a missing resume. Repeat views by the same
+    viewer within the dedup window are not counted and return the last known view count. When views are counted from
+    the CloudFront access logs, no view is counted at all.
+
+    Parameters
+    ----------
+    resume_id : str
+        The ID of the resume within DynamoDB
+    no_increment_id : str
+        The no increment ID provided by the caller, or an empty string
+    client_ip : str
+        The IP address of the viewer
+
+    Returns
+    ------
+    int
+        The total view count of all resumes
+    None
+        If the resume does not exist
+    """
+    resume_cache.check_version()
+    cached_resume_exists = resume_cache.get(resume_id)
+    if cached_resume_exists is False:
+        return None
+
+    if no_increment_id:
+        no_increment_id_matches = check_if_no_increment_token_is_valid(resume_id, no_increment_id)
+        if no_increment_id_matches is None:
+            # Not a signed token, so fall back to the no_increment_id stored within the resumes table
+            no_increment_id_matches = check_if_no_increment_id_matches(resume_id, no_increment_id)
+            resume_cache.set(resume_id, no_increment_id_matches is not None)
+            if no_increment_id_matches is None:
+                return None
+        elif no_increment_id_matches and not check_if_resume_exists(resume_id, cached=cached_resume_exists):
+            # A signed token is verified without reading the item, so the resume may have been deleted since
+            return None
+        if no_increment_id_matches:
+            print("- No Increment ID matches")
+            add_item_to_viewers_table(clientIp=client_ip, resume_id=resume_id, preview=True)
+            return get_cached_view_count()
+
+    if view_counting_mode == "access_logs":
+        # Views are counted from the CloudFront access logs instead, so the count is only read
+        if not check_if_resume_exists(resume_id, cached=cached_resume_exists):
+            return None
+        add_item_to_viewers_table(clientIp=client_ip, resume_id=resume_id)
+        return get_view_count()
+
+    print("- No Increment ID does not match")
+    if viewer_dedup_window:
+        view_counted = increase_resume_view_count_once(resume_id=resume_id, client_ip=client_ip)
+        if view_counted is False:
+            print("- View is a duplicate within the dedup window")
+            return get_cached_view_count()
+        resume_exists = view_counted is not None
     else:
+        resume_exists = increase_resume_view_count(resume_id=resume_id)
+    resume_cache.set(resume_id, resume_exists)
+    if not resume_exists:
+        return None
+
+    add_item_to_viewers_table(clientIp=client_ip, resume_id=resume_id)
+    return increase_total_view_count()
+
+
+def increase_resume_view_count_once(*, resume_id: str, client_ip: str) -> bool | None:
+    """
+    Increments the view count of a resume unless the viewer has already viewed it within the dedup window
+
+    The in-container filter is checked first. Views it has not seen are counted with a single transaction, which puts
+    a dedup item into the viewers table and increments the resume's view count. The put fails if an unexpired dedup
+    item for the viewer and resume already exists, and the increment fails if the resume does not exist or is
+    pending, so the cancellation reason of each item tells a duplicate view from a missing resume.
+
+    Parameters
+    ----------
+    resume_id : str
+        The ID of the resume within DynamoDB
+    client_ip : str
+        The IP address of the viewer
+
+    Returns
+    ------
+    bool
+        True if the view was counted, False if the view is a duplicate
+    None
+        If the resume does not exist
+    """
+    viewer_hash = sha256(bytes(client_ip, "UTF-8")).hexdigest()
+    dedup_key = f"{viewer_hash}#{resume_id}"
+    if dedup_key in viewer_dedup_filter:
+        return False
+
+    client = dynamodb.meta.client
+    retry = 0
+    while True:
+        now = int(time())
+        try:
+            _ = client.transact_write_items(
+                TransactItems=[
+                    {
+                        "Put": {
+                            "TableName": config["dynamodb_resume_viewers_table"],
+                            "Item": {
+                                "bucket": f"{viewers_table_dedup_bucket_prefix}{viewer_hash}#{resume_id}",
+                                "event": viewers_table_dedup_event,
+                                "expires_at": now + viewer_dedup_window,
+                            },
+                            "ConditionExpression": "attribute_not_exists(#bucket) OR expires_at <= :now",
+                            "ExpressionAttributeNames": {"#bucket": "bucket"},
+                            "ExpressionAttributeValues": {":now": now},
+                        }
+                    },
+                    {
+                        "Update": {
+                            "TableName": config["dynamodb_resumes_table"],
+                            "Key": {"id": resume_id},
+                            "UpdateExpression": "ADD view_count :newtotal",
+                            "ConditionExpression": "attribute_exists(id) AND "
+                            "(attribute_not_exists(resume_state) OR resume_state <> :pending)",
+                            "ExpressionAttributeValues": {":newtotal": 1, ":pending": resume_pending_state},
+                        }
+                    },
+                ]
+            )
+            break
+        except client.exceptions.TransactionCanceledException as e:
+            dedup_reason, resume_reason = (
+                reason.get("Code") for reason in e.response.get("CancellationReasons", [{}, {}])
+            )
+            if resume_reason == "ConditionalCheckFailed":
+                return None
+            if dedup_reason == "ConditionalCheckFailed":
+                viewer_dedup_filter.add(dedup_key)
+                return False
+            if retry >= int(config["dynamodb_transact_write_max_retries"]):
+                raise
+            retry += 1
+            sleep(min(0.05 * 2**retry, 1))
+
+    viewer_dedup_filter.add(dedup_key)
+    return True
+
+
+def check_if_no_increment_token_is_valid(resume_id: str, no_increment_token: str) -> bool | None:
+    """
+    Verifies a signed no increment token locally, without reading from DynamoDB
+
+    Tokens have the format {key_id}.{signature}, where signature is the unpadded urlsafe base64 HMAC-SHA256 of the
+    resume ID. Tokens signed with any key in the key set are accepted so keys can be rotated without breaking links.
+    Signatures are compared as bytes, so a token with non-ASCII characters is rejected rather than raising.
+
+    Parameters
+    ----------
+    resume_id : str
+        The ID of the resume within DynamoDB
+    no_increment_token : str
+        The no increment ID provided by the caller
+
+    Returns
+    ------
+    bool
+        Whether the token's signature is valid for the resume ID, False if the token is malformed
+    None
+        If the token is not a signed token
+    """
+    key_id, _, signature = no_increment_token.partition(".")
+    if not signature:
+        return None
+    try:
+        signature = signature.encode("ascii")
+    except UnicodeEncodeError:
+        print("- No increment token is malformed")
         return False
 
+    if (
+        key_id not in no_increment_token_keys.keys()
+        and monotonic() - no_increment_token_keys_loaded_at >= no_increment_token_keys_reload_interval
+    ):
+        print(f"- No increment token key {key_id} not found. Reloading keys")
+        load_no_increment_token_keys()
+    if key_id not in no_increment_token_keys.keys():
+        return False
 
-def check_if_no_increment_id_matches(resume_id: str, no_increment_id: str) -> bool:
-    response = resumes_table.get_item(Key={"id": resume_id}, AttributesToGet=["id", "no_increment_id"])
+    expected_signature = hmac.new(
+        bytes(no_increment_token_keys[key_id], "UTF-8"), bytes(resume_id, "UTF-8"), sha256
+    ).digest()
+    expected_signature = urlsafe_b64encode(expected_signature).rstrip(b"=")
 
-    if "Item" not in response.keys():
-        raise ValueError(f"resume ID {resume_id} could not be found")
+    return hmac.compare_digest(expected_signature, signature)
+
+
+def check_if_no_increment_id_matches(resume_id: str, no_increment_id: str) -> bool | None:
+    response = resumes_table.get_item(Key={"id": resume_id}, AttributesToGet=["id", "no_increment_id", "resume_state"])
+
+    if "Item" not in response.keys() or response["Item"].get("resume_state") == resume_pending_state:
+        return None
     if "no_increment_id" not in response["Item"].keys():
         return False
     return response["Item"]["no_increment_id"] == no_increment_id
 
 
-def add_item_to_viewers_table(*, clientIp: str) -> None:
+def check_if_resume_exists(resume_id: str, *, cached: bool | None = None) -> bool:
+    """
+    Checks whether a resume exists, reading it only if its existence is not cached. The cached value of a lookup the
+    caller already made is passed in, so each request counts a single cache hit or miss.
+    """
+    resume_exists = cached
+    if resume_exists is None:
+        response = resumes_table.get_item(Key={"id": resume_id}, AttributesToGet=["id", "resume_state"])
+        resume_exists = "Item" in response.keys() and response["Item"].get("resume_state") != resume_pending_state
+        resume_cache.set(resume_id, resume_exists)
+    return resume_exists
+
+
+def add_item_to_viewers_table(*, clientIp: str, resume_id: str, preview: bool = False) -> None:
+    """
+    Buffers a viewer event for the viewers table. Owner previews are marked with a preview attribute, so they are kept
+    in the raw viewer rows but left out of the view stats and rollups.
+    """
     viewer_hash = sha256(bytes(clientIp, "UTF-8")).hexdigest()
-    now = datetime.now()
-    current_datetime = now.strftime("%Y-%m-%d - %H:%M:%S.%f")
-    _ = viewers_table.put_item(Item={"viewer": viewer_hash, "datetime": current_datetime})
+    now = datetime.now(timezone.utc)
+    item = {
+        "bucket": f"{viewers_table_views_bucket_prefix}{now.strftime('%Y-%m-%d')}",
+        "event": f"{now.strftime('%H:%M:%S.%f')}#{viewer_hash}",
+        "viewer": viewer_hash,
+        "resume_id": resume_id,
+        "expires_at": int(now.timestamp()) + viewer_events_retention,
+    }
+    if preview:
+        item["preview"] = True
+    viewer_events.put(item)
+
+
+def increase_resume_view_count(*, resume_id: str) -> bool:
+    try:
+        _ = resumes_table.update_item(
+            Key={"id": resume_id},
+            UpdateExpression="ADD view_count :newtotal",
+            ConditionExpression="attribute_exists(id) AND (attribute_not_exists(resume_state) OR resume_state <> :pending)",
+            ExpressionAttributeValues={
+                ":newtotal": 1,
+                ":pending": resume_pending_state,
+            },
+            ReturnValues="NONE",
+        )
+    except ConditionalCheckFailedException:
+        return False
 
+    return True
 
-def increase_view_count(*, resume_id: str) -> int:
-    _ = resumes_table.update_item(
-        Key={"id": resume_id},
-        UpdateExpression="ADD view_count :newtotal",
-        ExpressionAttributeValues={
-            ":newtotal": 1,
-        },
-        ReturnValues="NONE",
-    )
+
+def get_view_count_shard_ids() -> list:
+    """
+    Returns the IDs of all view count shard items within the views table
+
+    The first shard is always the original all_resumes item, so a shard count of 1 behaves as an unsharded counter
+    and existing counts are carried over when sharding is enabled.
+
+    Returns
+    ------
+    list
+        A list of the shard item IDs
+    """
+    return [views_table_total_id] + [f"{views_table_total_id}#{shard}" for shard in range(1, view_count_shards)]
+
+
+def increase_total_view_count() -> int:
+    shard_ids = get_view_count_shard_ids()
+    shard_id = shard_ids[randrange(0, len(shard_ids))]
+    other_shard_ids = [other_shard_id for other_shard_id in shard_ids if other_shard_id != shard_id]
+
+    # The remaining shards are read while the increment is in flight to keep the view to a single round trip
+    other_shards_view_count = executor.submit(get_view_count_of_shards, other_shard_ids) if other_shard_ids else None
 
     views = views_table.update_item(
-        Key={"id": "all_resumes"},
+        Key={"id": shard_id},
         UpdateExpression="ADD view_count :newtotal",
         ExpressionAttributeValues={":newtotal": 1},
         ReturnValues="UPDATED_NEW",
     )
 
-    return views["Attributes"]["view_count"]
+    view_count = views["Attributes"]["view_count"]
+    if other_shards_view_count:
+        view_count += other_shards_view_count.result()
+
+    set_last_view_count(view_count)
+    return view_count
 
 
 def get_view_count() -> int:
-    response = views_table.get_item(Key={"id": "all_resumes"}, AttributesToGet=["id", "view_count"])
+    if view_count_shards == 1:
+        response = views_table.get_item(Key={"id": views_table_total_id}, AttributesToGet=["id", "view_count"])
 
-    if "Item" not in response.keys():
-        raise ValueError(f"all_resumes could not be found in views table")
+        if "Item" not in response.keys():
+            raise ValueError(f"{views_table_total_id} could not be found in views table")
 
-    return response["Item"]["view_count"]
+        view_count = response["Item"]["view_count"]
+    else:
+        view_count = get_view_count_of_shards(get_view_count_shard_ids())
+
+    set_last_view_count(view_count)
+    return view_count
+
+
+def get_cached_view_count() -> int:
+    """
+    Returns the total view count last seen by this container if it is within the staleness bound, otherwise reads it
+    from the views table
+
+    Returns
+    ------
+    int
+        The total view count
+    """
+    if (
+        last_view_count is not None
+        and view_count_cache_max_age > 0
+        and monotonic() - last_view_count_at < view_count_cache_max_age
+    ):
+        print("- Serving cached view count")
+        return last_view_count
+
+    return get_view_count()
+
+
+def set_last_view_count(view_count: int) -> None:
+    globals()["last_view_count"] = view_count
+    globals()["last_view_count_at"] = monotonic()
+
+
+def get_view_count_of_shards(shard_ids: list) -> int:
+    """
+    Sums the view counts of the provided shard items. Shards that have not yet been written count as 0.
+
+    Parameters
+    ----------
+    shard_ids : list
+        The IDs of the shard items within the views table
+
+    Returns
+    ------
+    int
+        The sum of the view counts
+    """
+    view_count = 0
+    request_items = {
+        config["dynamodb_resume_views_table"]: {
+            "Keys": [{"id": shard_id} for shard_id in shard_ids],
+            "ProjectionExpression": "id,view_count",
+        }
+    }
+    while request_items:
+        response = dynamodb.batch_get_item(RequestItems=request_items)
+        for item in response["Responses"].get(config["dynamodb_resume_views_table"], []):
+            view_count += item["view_count"] if "view_count" in item.keys() else 0
+        request_items = response["UnprocessedKeys"] if response.get("UnprocessedKeys") else None
+
+    return view_count
@@ -0,0 +1,163 @@
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from random import uniform
+from threading import Lock
+from time import monotonic, sleep
+
+MAX_STATEMENTS_PER_BATCH = 25
+THROTTLING_STATEMENT_ERROR_CODES = ["ProvisionedThroughputExceeded", "RequestLimitExceeded", "ThrottlingError"]
+THROTTLING_REQUEST_ERROR_CODES = [
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+    "ThrottlingException",
+]
+
+
+class BatchWriteMetrics:
+    """
+    Counters of a batched write, updated by the concurrently running chunks
+
+    Attributes
+    ----------
+    statements : int
+        The number of statements to execute
+    chunks : int
+        The number of chunks the statements were split into
+    requests : int
+        The number of BatchExecuteStatement requests sent, including retries
+    throttled : int
+        The number of statements or whole requests that were throttled
+    retries : int
+        The number of times a chunk's throttled statements were sent again
+    succeeded : int
+        The number of statements that succeeded
+    errors : dict
+        A dict of the indexes of the statements that failed to a dict of {"code", "message"}
+    duration_seconds : float
+        The time the batched write took
+    """
+
+    def __init__(self, *, statements: int, chunks: int):
+        self.statements = statements
+        self.chunks = chunks
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.succeeded = 0
+        self.errors = {}
+        self.duration_seconds = 0.0
+        self._lock = Lock()
+
+    def add(self, **counters) -> None:
+        with self._lock:
+            for counter, value in counters.items():
+                setattr(self, counter, getattr(self, counter) + value)
+
+    def add_error(self, index: int, *, code: str, message: str) -> None:
+        with self._lock:
+            self.errors[index] = {"code": code, "message": message}
+
+    def __str__(self) -> str:
+        return (
+            f"{self.succeeded}/{self.statements} statements succeeded in {self.chunks} chunks and {self.requests} "
+            f"requests ({self.throttled} throttled, {self.retries} retries, {len(self.errors)} errors) in "
+            f"{self.duration_seconds:.2f} seconds"
+        )
+
+
+def batch_execute_statements(
+    *,
+    dynamodb_client,
+    statements: list,
+    max_workers: int = 8,
+    max_retries: int = 8,
+    base_delay_seconds: float = 0.05,
+    max_delay_seconds: float = 5,
+) -> BatchWriteMetrics:
+    """
+    Executes PartiQL write statements with BatchExecuteStatement, 25 statements per request, running the chunks
+    concurrently
+
+    Only statements that were throttled are sent again, after a full jitter backoff of a random time between zero and
+    base_delay_seconds * 2 ** retry, capped at max_delay_seconds. Statements that fail for any other reason, or are
+    still throttled after max_retries retries, are recorded as errors instead of raising, so the caller decides how to
+    handle them.
+
+    Parameters
+    ----------
+    dynamodb_client : boto3.client
+        The DynamoDB client to use. The client of a DynamoDB resource accepts plain Python parameters.
+    statements : list
+        A list of dicts of {"Statement": str, "Parameters": list}
+    max_workers : int
+        The maximum number of chunks to execute concurrently
+    max_retries : int
+        The maximum number of times a chunk's throttled statements are sent again
+    base_delay_seconds : float
+        The backoff of the first retry
+    max_delay_seconds : float
+        The maximum backoff of a retry
+
+    Returns
+    -------
+    BatchWriteMetrics
+        The metrics of the batched write, with the errors keyed by the index of the statement within statements
+    """
+    started_at = monotonic()
+    chunks = [
+        list(range(chunk_num, min(chunk_num + MAX_STATEMENTS_PER_BATCH, len(statements))))
+        for chunk_num in range(0, len(statements), MAX_STATEMENTS_PER_BATCH)
+    ]
+    metrics = BatchWriteMetrics(statements=len(statements), chunks=len(chunks))
+
+    def execute_chunk(indexes: list) -> None:
+        retry = 0
+        while indexes:
+            if retry:
+                sleep(uniform(0, min(max_delay_seconds, base_delay_seconds * 2**retry)))
+            metrics.add(requests=1)
+            try:
+                response = dynamodb_client.batch_execute_statement(Statements=[statements[index] for index in indexes])
+                responses = response["Responses"]
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in THROTTLING_REQUEST_ERROR_CODES:
+                    for index in indexes:
+                        metrics.add_error(
+                            index, code=e.response["Error"]["Code"], message=e.response["Error"]["Message"]
+                        )
+                    return
+                metrics.add(throttled=1)
+                responses = None
+
+            if responses is None:
+                throttled_indexes = indexes
+            else:
+                # Responses are returned in the same order as the statements were sent
+                throttled_indexes = []
+                for index, statement_response in zip(indexes, responses):
+                    if "Error" not in statement_response.keys():
+                        metrics.add(succeeded=1)
+                    elif statement_response["Error"]["Code"] in THROTTLING_STATEMENT_ERROR_CODES:
+                        throttled_indexes.append(index)
+                    else:
+                        metrics.add_error(
+                            index,
+                            code=statement_response["Error"]["Code"],
+                            message=statement_response["Error"].get("Message", ""),
+                        )
+                metrics.add(throttled=len(throttled_indexes))
+
+            if throttled_indexes and retry == max_retries:
+                for index in throttled_indexes:
+                    metrics.add_error(index, code="MaximumRetriesExceeded", message="The statement was throttled")
+                return
+            if throttled_indexes:
+                retry += 1
+                metrics.add(retries=1)
+            indexes = throttled_indexes
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(execute_chunk, chunks))
+
+    metrics.duration_seconds = monotonic() - started_at
+    return metrics
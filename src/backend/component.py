@@ -21,6 +21,7 @@ from src.backend.configuration.common import (
 
 import src.backend.api.infrastructure as api_infrastructure
 import src.backend.database.infrastructure as database_infrastructure
+import src.backend.events.infrastructure as events_infrastructure
 import src.backend.monitoring.infrastructure as monitoring_infrastructure
 import src.backend.userstore.infrastructure as userstore_infrastructure
 import src.backend.webapp.infrastructure as webapp_infrastructure
@@ -70,6 +71,7 @@ class ResumeWebAppBackend:
         deploy_region_stack_part_2.add_dependency(target=us_east_1_stack_part_1)
 
         deploy_region_stack_part_2.create_dynamodb()
+        deploy_region_stack_part_2.create_eventbridge_rules()
         deploy_region_stack_part_2.configure_s3_buckets()
         deploy_region_stack_part_2.configure_cognito()
         deploy_region_stack_part_2.create_api()
@@ -149,6 +151,9 @@ class ResumeWebAppDeployRegionStack(Stack):
     def create_dynamodb(self):
         database_infrastructure.create_dynamodb_databases(self)
 
+    def create_eventbridge_rules(self):
+        events_infrastructure.create_eventbridge_rules(self)
+
     def create_monitoring(self):
         monitoring_infrastructure.create_monitoring(self, self.region)
 
@@ -38,6 +38,7 @@ required_config_json_files = [
     "cognito.json",
     "dns.json",
     "dynamodb.json",
+    "eventbridge.json",
     "iam.json",
     "lambda.json",
     "monitoring.json",
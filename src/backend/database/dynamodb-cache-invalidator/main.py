@@ -1,9 +1,14 @@
+from common.common import batch_execute_statements
+
 from ast import literal_eval
 from base64 import urlsafe_b64encode
+from boto3.dynamodb.conditions import Attr, Key
 from botocore.config import Config
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from time import sleep, time
 from traceback import format_exc
+from uuid import uuid4
 
 import boto3
 
@@ -12,16 +17,25 @@ with open("./config.json", "r") as f:
 
 dynamodb_resource = None
 resumes_table = None
+invalidations_table = None
 cloudfront_client = None
 cloudfront_config = Config(signature_version="v4")
 
 
 def handler(event, context) -> dict:
-    resume_ids = list(set([record["dynamodb"]["Keys"]["id"]["S"] for record in event["Records"]]))
-    print(f"- Received the following resumes IDs to invalidate: {', '.join(resume_ids)}")
+    """
+    Queues and submits CloudFront invalidations for the resumes within the resumes table stream records, or, when
+    invoked by the poller schedule, submits the queued invalidations and checks on the submitted ones
+
+    Invalidations are recorded within the invalidations table instead of being waited on, so the stream handler
+    returns as soon as they are submitted. The poller updates the resumes of each completed invalidation, and
+    the records of recent invalidations are kept as a ledger so paths they already cover are not invalidated again.
+    Resumes still marked with invalidate_cache that no pending invalidation covers are queued again by the poller.
+    """
     try:
         globals()["dynamodb_resource"] = boto3.resource("dynamodb", region_name=config["dynamodb_table_region"])
         globals()["resumes_table"] = dynamodb_resource.Table(config["dynamodb_table_name"])
+        globals()["invalidations_table"] = dynamodb_resource.Table(config["dynamodb_invalidations_table_name"])
     except Exception:
         print(f"Could not open DynamoDB table. Error {format_exc()}")
         return
@@ -32,115 +46,687 @@ def handler(event, context) -> dict:
         print(f"Could not get CloudFront client. Error {format_exc()}")
         return
 
-    max_invalidation_files = 500
-    for chunk_num in range(0, len(resume_ids), max_invalidation_files):
-        min_range = chunk_num
-        max_range = min(len(resume_ids), chunk_num + max_invalidation_files)
-        chunk = resume_ids[min_range:max_range]
-        print(f"- {min_range + 1}-{max_range}/{len(resume_ids)}: Attempting to invalidate")
-        try:
-            invalidation = cloudfront_client.create_invalidation(
-                DistributionId=config["cloudfront_distribution_id"],
-                InvalidationBatch={
-                    "Paths": {
-                        "Quantity": len(chunk),
-                        "Items": [f"{config['resume_path']}/{resume_id}.html" for resume_id in chunk],
-                    },
-                    "CallerReference": str(time()).replace(".", ""),
-                },
+    if "Records" in event.keys():
+        changed_at = {}
+        for record in event["Records"]:
+            resume_id = record["dynamodb"]["Keys"]["id"]["S"]
+            record_changed_at = int(record["dynamodb"]["ApproximateCreationDateTime"])
+            changed_at[resume_id] = max(changed_at.get(resume_id, 0), record_changed_at)
+        print(f"- Received the following resumes IDs to invalidate: {', '.join(changed_at.keys())}")
+        pending = get_pending_invalidations()
+        queued = queue_invalidations(changed_at=changed_at, pending=pending)
+        # The pending index is eventually consistent, so the invalidations just queued may be missing from it
+        pending_ids = [invalidation["id"] for invalidation in pending]
+        pending += [invalidation for invalidation in queued if invalidation["id"] not in pending_ids]
+        _ = submit_queued_invalidations(pending=pending)
+    else:
+        poll_invalidations()
+
+
+def queue_invalidations(*, changed_at: dict, pending: list = None) -> list:
+    """
+    Plans the invalidation paths of the changed resumes and queues an invalidation within the invalidations table for
+    each planned batch of paths
+
+    Resumes already covered by an invalidation within the ledger, or by a pending invalidation that was not submitted
+    yet, are attached to that invalidation instead of being invalidated again. Queued invalidations do not expire until
+    they are submitted, so their resumes are never left marked with invalidate_cache by a record that expired while
+    waiting for CloudFront's limits.
+
+    Parameters
+    ----------
+    changed_at : dict
+        A dict of the resume IDs to invalidate to the epoch seconds they were changed at
+    pending : list
+        A list of the pending invalidation records
+
+    Returns
+    -------
+    list
+        A list of the records of the queued invalidations
+    """
+    ledger = get_invalidation_ledger(since=min(changed_at.values()))
+    # Claimed invalidations may have been submitted before the changes, so only unclaimed ones can take resumes
+    unclaimed = {
+        invalidation["id"]: invalidation
+        for invalidation in (pending or [])
+        if "invalidation_id" not in invalidation.keys() and "claimed_at" not in invalidation.keys()
+    }
+    resume_ids = []
+    covered_resume_ids = {}
+    unclaimed_resume_ids = {}
+    for resume_id, resume_changed_at in changed_at.items():
+        paths = get_resume_paths(resume_id)
+        invalidation = get_covering_invalidation(ledger=ledger, paths=paths, changed_at=resume_changed_at)
+        if invalidation:
+            covered_resume_ids.setdefault(invalidation["id"], []).append(resume_id)
+            continue
+
+        invalidation = next(
+            (
+                invalidation
+                for invalidation in unclaimed.values()
+                if all(covers_path(paths=invalidation["paths"], path=path) for path in paths)
+            ),
+            None,
+        )
+        if invalidation:
+            unclaimed_resume_ids.setdefault(invalidation["id"], []).append(resume_id)
+        else:
+            resume_ids.append(resume_id)
+
+    for record_id, record_resume_ids in covered_resume_ids.items():
+        attach_to_invalidation(record_id=record_id, resume_ids=record_resume_ids)
+    for record_id, record_resume_ids in unclaimed_resume_ids.items():
+        # Resumes the invalidation already holds are not attached again, but still depend on it being unclaimed
+        if not attach_to_unclaimed_invalidation(
+            record_id=record_id,
+            resume_ids=[
+                resume_id for resume_id in record_resume_ids if resume_id not in unclaimed[record_id]["resume_ids"]
+            ],
+        ):
+            resume_ids += record_resume_ids
+
+    batches = plan_invalidation_batches(resume_ids=resume_ids)
+    queued = []
+    for batch_num, (paths, chunk) in enumerate(batches):
+        invalidation = {
+            "id": str(uuid4()),
+            "paths": paths,
+            "resume_ids": chunk,
+            "queued_at": int(time()),
+            "pending": "true",
+            "distribution_id": config["cloudfront_distribution_id"],
+        }
+        _ = invalidations_table.put_item(Item=invalidation)
+        queued.append(invalidation)
+        print(f"- {batch_num + 1}/{len(batches)}: Queued invalidation {invalidation['id']} of {len(paths)} paths")
+
+    return queued
+
+
+def get_resume_paths(resume_id: str) -> list:
+    """
+    Gets the CloudFront paths of a resume's html objects
+
+    When resumes are published with content hashed keys, a wildcard path also covers the resume's content hashed html
+    under the prefix named after its ID. The prefix ends with a slash, so it covers no resume whose ID starts with the
+    resume's ID.
+
+    Parameters
+    ----------
+    resume_id : str
+        The ID of the resume
+
+    Returns
+    -------
+    list
+        A list of the paths of the resume's html objects
+    """
+    if config["publishing_mode"] == "content_hashed":
+        return [f"{config['resume_path']}/{resume_id}.html", f"{config['resume_path']}/{resume_id}/*"]
+    return [f"{config['resume_path']}/{resume_id}.html"]
+
+
+def plan_invalidation_batches(*, resume_ids: list) -> list:
+    """
+    Plans the paths to invalidate for the resume IDs. Once the number of resumes reaches the wildcard threshold, all
+    of them are covered by a single wildcard path instead of one path each, which CloudFront counts as one path.
+    Batches of wildcard paths are kept within CloudFront's limit of wildcard paths in progress, so each can be
+    submitted.
+
+    Parameters
+    ----------
+    resume_ids : list
+        A list of the resume IDs to invalidate
+
+    Returns
+    -------
+    list
+        A list of tuples (paths, resume_ids) with one tuple per invalidation to submit
+    """
+    if not resume_ids:
+        return []
+    if len(resume_ids) >= int(config["invalidation_wildcard_threshold"]):
+        print(f"- {len(resume_ids)} resumes reached the wildcard threshold. Coalescing into a single path")
+        return [([f"{config['resume_path']}/*"], resume_ids)]
+
+    resume_paths = get_resume_paths(resume_ids[0])
+    wildcard_paths = len([path for path in resume_paths if "*" in path])
+    max_invalidation_resumes = 500 // len(resume_paths)
+    if wildcard_paths:
+        max_invalidation_resumes = min(
+            max_invalidation_resumes, int(config["cloudfront_max_in_progress_wildcard_paths"]) // wildcard_paths
+        )
+    return [
+        (
+            [
+                path
+                for resume_id in resume_ids[chunk_num : chunk_num + max_invalidation_resumes]
+                for path in get_resume_paths(resume_id)
+            ],
+            resume_ids[chunk_num : chunk_num + max_invalidation_resumes],
+        )
+        for chunk_num in range(0, len(resume_ids), max_invalidation_resumes)
+    ]
+
+
+def get_invalidation_ledger(*, since: int) -> list:
+    """
+    Gets the invalidations within the ledger that were submitted after a point in time and have not expired. Completed
+    invalidations stay within the ledger for the ledger window after they complete. The ledger index is eventually
+    consistent, so an invalidation submitted within the last moment may be missing and its paths invalidated again.
+
+    Parameters
+    ----------
+    since : int
+        The epoch seconds to get the invalidations submitted after
+
+    Returns
+    -------
+    list
+        A list of the invalidation records
+    """
+    key_condition = Key("distribution_id").eq(config["cloudfront_distribution_id"]) & Key("submitted_at").gt(since)
+    filter_expression = Attr("expires_at").gt(int(time()))
+    invalidations = []
+    more_items = True
+    while more_items:
+        if type(more_items) is bool:
+            response = invalidations_table.query(
+                IndexName=config["dynamodb_invalidations_ledger_index"],
+                KeyConditionExpression=key_condition,
+                FilterExpression=filter_expression,
             )
-            invalidation_id = invalidation["Invalidation"]["Id"]
-        except ClientError as e:
-            print(
-                f"Could not invalidate the following resume_ids due to {e.response['Error']['Message']}: {', '.join(chunk)}"
+        else:
+            response = invalidations_table.query(
+                IndexName=config["dynamodb_invalidations_ledger_index"],
+                KeyConditionExpression=key_condition,
+                FilterExpression=filter_expression,
+                ExclusiveStartKey=more_items,
             )
-            batch_update_items(resume_ids=chunk, message="cache_invalidation_error")
+
+        invalidations += response.get("Items", [])
+        more_items = response["LastEvaluatedKey"] if "LastEvaluatedKey" in response.keys() else False
+
+    return invalidations
+
+
+def get_covering_invalidation(*, ledger: list, paths: list, changed_at: int) -> dict:
+    """
+    Gets an invalidation within the ledger that covers all the paths changed at a point in time. An invalidation only
+    covers the change if it was submitted after it. Both times are whole seconds, so an invalidation submitted within
+    the same second as the change is not treated as covering it.
+
+    Parameters
+    ----------
+    ledger : list
+        A list of the invalidation records
+    paths : list
+        A list of the paths to invalidate
+    changed_at : int
+        The epoch seconds the paths were changed at
+
+    Returns
+    -------
+    dict
+        The covering invalidation record
+    None
+        If no invalidation covers the paths
+    """
+    for invalidation in ledger:
+        if int(invalidation["submitted_at"]) <= changed_at:
             continue
-        print(f"- {min_range + 1}-{max_range}/{len(resume_ids)}: Invalidation submitted. Awaiting completion")
-        invalidated = False
-        wait_time = 5
-        while not invalidated:
-            try:
-                status = cloudfront_client.get_invalidation(
-                    DistributionId=config["cloudfront_distribution_id"],
-                    Id=invalidation_id,
-                )
-            except ClientError as e:
-                print(f"Error getting invalidation status: {e.response['Error']['Message']}")
-                return
-            if status["Invalidation"]["Status"] != "Completed":
-                sleep(wait_time)
-            else:
-                invalidated = True
-        print(f"- {min_range + 1}-{max_range}/{len(resume_ids)}: Invalidation completed. Updating DynamoDB database.")
-        batch_update_items(resume_ids=chunk)
+        if all(covers_path(paths=invalidation.get("paths", []), path=path) for path in paths):
+            return invalidation
+
+    return None
+
+
+def covers_path(*, paths: list, path: str) -> bool:
+    """
+    Checks whether a path is covered by the paths of an invalidation, either exactly or by a wildcard path
+
+    Parameters
+    ----------
+    paths : list
+        A list of the invalidation's paths
+    path : str
+        The path to invalidate
+
+    Returns
+    -------
+    bool
+        Whether the path is covered
+    """
+    return any(
+        invalidation_path == path or (invalidation_path.endswith("*") and path.startswith(invalidation_path[:-1]))
+        for invalidation_path in paths
+    )
+
+
+def attach_to_invalidation(*, record_id: str, resume_ids: list) -> None:
+    """
+    Attaches resumes to an invalidation that already covers them, so that they are updated when it completes. If the
+    invalidation completed in the meantime, the resumes are updated right away.
+
+    Parameters
+    ----------
+    record_id : str
+        The ID of the covering invalidation's record
+    resume_ids : list
+        A list of the resume IDs to attach
+    """
+    try:
+        _ = invalidations_table.update_item(
+            Key={"id": record_id},
+            UpdateExpression="SET resume_ids = list_append(resume_ids, :resume_ids)",
+            ConditionExpression="attribute_exists(id) AND attribute_not_exists(completed_at)",
+            ExpressionAttributeValues={":resume_ids": resume_ids},
+        )
+        print(f"- Invalidation {record_id} already covers {len(resume_ids)} resumes. Attached them to it")
+    except dynamodb_resource.meta.client.exceptions.ConditionalCheckFailedException:
+        print(f"- Invalidation {record_id} already completed for {len(resume_ids)} resumes. Updating DynamoDB")
+        batch_update_items(resume_ids=resume_ids)
+
+
+def attach_to_unclaimed_invalidation(*, record_id: str, resume_ids: list) -> bool:
+    """
+    Attaches resumes to a queued invalidation that covers them and was not claimed for submission yet, so that it is
+    submitted after their changes
+
+    Parameters
+    ----------
+    record_id : str
+        The ID of the queued invalidation's record
+    resume_ids : list
+        A list of the resume IDs to attach
+
+    Returns
+    -------
+    bool
+        Whether the resumes were attached. False if the invalidation was claimed in the meantime
+    """
+    try:
+        _ = invalidations_table.update_item(
+            Key={"id": record_id},
+            UpdateExpression="SET resume_ids = list_append(resume_ids, :resume_ids)",
+            ConditionExpression=(
+                "attribute_exists(id) AND attribute_not_exists(invalidation_id) AND attribute_not_exists(claimed_at)"
+            ),
+            ExpressionAttributeValues={":resume_ids": resume_ids},
+        )
+        print(f"- Queued invalidation {record_id} covers {len(resume_ids)} resumes. Attached them to it")
+        return True
+    except dynamodb_resource.meta.client.exceptions.ConditionalCheckFailedException:
+        print(f"- Queued invalidation {record_id} was claimed in the meantime. Queueing {len(resume_ids)} resumes")
+        return False
+
+
+def get_pending_invalidations() -> list:
+    """
+    Gets the invalidations within the invalidations table that have not completed from the pending index, which only
+    holds the records marked as pending
+
+    Returns
+    -------
+    list
+        A list of the queued and submitted invalidation records
+    """
+    invalidations = []
+    more_items = True
+    while more_items:
+        if type(more_items) is bool:
+            response = invalidations_table.query(
+                IndexName=config["dynamodb_invalidations_pending_index"],
+                KeyConditionExpression=Key("pending").eq("true"),
+            )
+        else:
+            response = invalidations_table.query(
+                IndexName=config["dynamodb_invalidations_pending_index"],
+                KeyConditionExpression=Key("pending").eq("true"),
+                ExclusiveStartKey=more_items,
+            )
+
+        invalidations += response.get("Items", [])
+        more_items = response["LastEvaluatedKey"] if "LastEvaluatedKey" in response.keys() else False
+
+    return invalidations
+
+
+def submit_queued_invalidations(*, pending: list) -> list:
+    """
+    Submits the queued invalidations, oldest first, as long as they fit within CloudFront's limits of paths in
+    progress. The invalidations are submitted concurrently, and those that do not fit stay queued for the next poll.
+
+    Invalidations claimed by a submission that did not finish within the claim timeout are submitted again. Their
+    record ID is the caller reference, so CloudFront returns the invalidation created by the earlier submission if
+    there was one.
+
+    Parameters
+    ----------
+    pending : list
+        A list of the pending invalidation records
+
+    Returns
+    -------
+    list
+        A list of the records of the submitted invalidations
+    """
+    stale_claimed_at = int(time()) - int(config["invalidation_claim_timeout_seconds"])
+    queued = sorted(
+        [
+            invalidation
+            for invalidation in pending
+            if "invalidation_id" not in invalidation.keys()
+            and ("claimed_at" not in invalidation.keys() or int(invalidation["claimed_at"]) < stale_claimed_at)
+        ],
+        key=lambda invalidation: int(invalidation["queued_at"]),
+    )
+    if not queued:
+        return []
+
+    in_progress = [invalidation for invalidation in pending if "claimed_at" in invalidation.keys()]
+    in_progress_paths = [path for invalidation in in_progress for path in invalidation["paths"]]
+    paths_available = int(config["cloudfront_max_in_progress_paths"]) - len(
+        [path for path in in_progress_paths if "*" not in path]
+    )
+    wildcard_paths_available = int(config["cloudfront_max_in_progress_wildcard_paths"]) - len(
+        [path for path in in_progress_paths if "*" in path]
+    )
+
+    to_submit = []
+    for invalidation in queued:
+        paths = len([path for path in invalidation["paths"] if "*" not in path])
+        wildcard_paths = len(invalidation["paths"]) - paths
+        if paths > paths_available or wildcard_paths > wildcard_paths_available:
+            break
+        paths_available -= paths
+        wildcard_paths_available -= wildcard_paths
+        to_submit.append(invalidation)
+
+    if len(to_submit) < len(queued):
+        print(f"- {len(queued) - len(to_submit)} queued invalidations exceed the paths in progress limits. Waiting")
+    if not to_submit:
+        return []
+
+    print(f"- Submitting {len(to_submit)} queued invalidations")
+    with ThreadPoolExecutor(max_workers=int(config["max_workers"])) as executor:
+        submitted = list(executor.map(lambda invalidation: submit_invalidation(invalidation["id"]), to_submit))
+
+    return [invalidation for invalidation in submitted if invalidation]
+
+
+def submit_invalidation(record_id: str) -> dict:
+    """
+    Claims a queued invalidation and submits it to CloudFront
+
+    If CloudFront has too many invalidations in progress, the claim is released so the invalidation is submitted by a
+    later poll. Any other error marks the invalidation's resumes with cache_invalidation_error and removes its record.
+
+    Parameters
+    ----------
+    record_id : str
+        The ID of the invalidation record
+
+    Returns
+    -------
+    dict
+        The record of the submitted invalidation
+    None
+        If the invalidation was claimed by another submission or could not be submitted
+    """
+    claimed_at = int(time())
+    try:
+        invalidation = invalidations_table.update_item(
+            Key={"id": record_id},
+            UpdateExpression="SET claimed_at = :claimed_at",
+            ConditionExpression=(
+                "attribute_exists(id) AND attribute_not_exists(invalidation_id) AND "
+                "(attribute_not_exists(claimed_at) OR claimed_at < :stale_claimed_at)"
+            ),
+            ExpressionAttributeValues={
+                ":claimed_at": claimed_at,
+                ":stale_claimed_at": claimed_at - int(config["invalidation_claim_timeout_seconds"]),
+            },
+            ReturnValues="ALL_NEW",
+        )["Attributes"]
+    except dynamodb_resource.meta.client.exceptions.ConditionalCheckFailedException:
+        print(f"- Invalidation {record_id} was claimed by another submission. Skipping")
+        return None
+
+    try:
+        response = cloudfront_client.create_invalidation(
+            DistributionId=config["cloudfront_distribution_id"],
+            InvalidationBatch={
+                "Paths": {
+                    "Quantity": len(invalidation["paths"]),
+                    "Items": invalidation["paths"],
+                },
+                "CallerReference": record_id,
+            },
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "TooManyInvalidationsInProgress":
+            print(f"- Invalidation {record_id}: Too many invalidations in progress. Leaving it queued")
+            _ = invalidations_table.update_item(Key={"id": record_id}, UpdateExpression="REMOVE claimed_at")
+            return None
+
+        print(f"Could not submit invalidation {record_id} due to {e.response['Error']['Message']}")
+        # Resumes may have been attached since the claim, so the deleted record's resume IDs are used
+        old_invalidation = invalidations_table.delete_item(Key={"id": record_id}, ReturnValues="ALL_OLD")
+        if "Attributes" in old_invalidation.keys():
+            resume_ids = list(old_invalidation["Attributes"]["resume_ids"])
+            batch_update_items(resume_ids=resume_ids, message="cache_invalidation_error")
+        return None
+
+    submitted_at = int(response["Invalidation"]["CreateTime"].timestamp())
+    invalidation = invalidations_table.update_item(
+        Key={"id": record_id},
+        UpdateExpression="SET invalidation_id = :invalidation_id, submitted_at = :submitted_at, expires_at = :expires_at",
+        ExpressionAttributeValues={
+            ":invalidation_id": response["Invalidation"]["Id"],
+            ":submitted_at": submitted_at,
+            ":expires_at": submitted_at + int(config["invalidation_record_ttl_seconds"]),
+        },
+        ReturnValues="ALL_NEW",
+    )["Attributes"]
+    print(f"- Invalidation {record_id} submitted as {invalidation['invalidation_id']}")
+    return invalidation
+
+
+def poll_invalidations() -> None:
+    """
+    Submits the queued invalidations that fit within CloudFront's limits, then checks the status of all submitted
+    invalidations together with exponential backoff. The resumes of each invalidation are updated as soon as it
+    completes, and invalidations still in progress once the poll's time runs out are left for the next poll.
+    """
+    pending = get_pending_invalidations()
+    pending += requeue_orphaned_resumes(pending=pending)
+    if not pending:
+        return
+
+    submitted = submit_queued_invalidations(pending=pending)
+    submitted_ids = [invalidation["id"] for invalidation in submitted]
+    invalidations = submitted + [
+        invalidation
+        for invalidation in pending
+        if "invalidation_id" in invalidation.keys() and invalidation["id"] not in submitted_ids
+    ]
+
+    deadline = time() + int(config["invalidation_poll_max_seconds"])
+    wait_time = int(config["invalidation_poll_initial_wait_seconds"])
+    while invalidations:
+        print(f"- Checking {len(invalidations)} submitted invalidations")
+        with ThreadPoolExecutor(max_workers=int(config["max_workers"])) as executor:
+            settled = list(executor.map(check_invalidation, invalidations))
+
+        invalidations = [invalidation for invalidation, is_settled in zip(invalidations, settled) if not is_settled]
+        if invalidations and time() + wait_time > deadline:
+            print(f"- {len(invalidations)} invalidations are still in progress. Leaving them for the next poll")
+            break
+        if invalidations:
+            sleep(wait_time)
+            wait_time = min(wait_time * 2, int(config["invalidation_poll_max_wait_seconds"]))
     print("- All updates complete")
 
 
+def requeue_orphaned_resumes(*, pending: list) -> list:
+    """
+    Queues invalidations for the resumes marked with invalidate_cache longer than the orphan grace period that no
+    pending invalidation covers. These are resumes whose invalidation record expired or was lost, which would otherwise
+    keep the manager from accepting a new upload of them.
+
+    Parameters
+    ----------
+    pending : list
+        A list of the pending invalidation records
+
+    Returns
+    -------
+    list
+        A list of the records of the queued invalidations
+    """
+    pending_resume_ids = set(resume_id for invalidation in pending for resume_id in invalidation["resume_ids"])
+    key_condition = Key("invalidate_cache").eq(1) & Key("invalidate_cache_at").lte(
+        int(time()) - int(config["invalidation_orphan_grace_seconds"])
+    )
+    changed_at = {}
+    more_items = True
+    while more_items:
+        if type(more_items) is bool:
+            response = resumes_table.query(
+                IndexName=config["dynamodb_invalidate_cache_index"], KeyConditionExpression=key_condition
+            )
+        else:
+            response = resumes_table.query(
+                IndexName=config["dynamodb_invalidate_cache_index"],
+                KeyConditionExpression=key_condition,
+                ExclusiveStartKey=more_items,
+            )
+
+        for item in response.get("Items", []):
+            if item["id"] not in pending_resume_ids:
+                changed_at[item["id"]] = int(item["invalidate_cache_at"])
+        more_items = response["LastEvaluatedKey"] if "LastEvaluatedKey" in response.keys() else False
+
+    if not changed_at:
+        return []
+
+    print(f"- Requeueing the invalidation of {len(changed_at)} resumes no pending invalidation covers")
+    return queue_invalidations(changed_at=changed_at, pending=pending)
+
+
+def check_invalidation(invalidation: dict) -> bool:
+    """
+    Checks the status of a submitted invalidation. Once it completes, it is marked as completed and kept within the
+    ledger for the ledger window, and its resumes are updated.
+
+    Parameters
+    ----------
+    invalidation : dict
+        The invalidation record
+
+    Returns
+    -------
+    bool
+        Whether the invalidation needs no further checks within this poll
+    """
+    try:
+        status = cloudfront_client.get_invalidation(
+            DistributionId=config["cloudfront_distribution_id"],
+            Id=invalidation["invalidation_id"],
+        )["Invalidation"]["Status"]
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "NoSuchInvalidation":
+            print(f"Error getting invalidation status: {e.response['Error']['Message']}")
+            return True
+        print(f"- Invalidation {invalidation['invalidation_id']} no longer exists")
+        # Resumes may have been attached since the query, so the deleted record's resume IDs are used
+        old_invalidation = invalidations_table.delete_item(Key={"id": invalidation["id"]}, ReturnValues="ALL_OLD")
+        if "Attributes" in old_invalidation.keys():
+            resume_ids = list(old_invalidation["Attributes"]["resume_ids"])
+            batch_update_items(resume_ids=resume_ids, message="cache_invalidation_error")
+        return True
+
+    if status != "Completed":
+        waited = int(time()) - int(invalidation["submitted_at"])
+        print(f"- Invalidation {invalidation['invalidation_id']} is {status} after {waited} seconds")
+        return False
+
+    completed_at = int(time())
+    try:
+        completed_invalidation = invalidations_table.update_item(
+            Key={"id": invalidation["id"]},
+            UpdateExpression="SET completed_at = :completed_at, expires_at = :expires_at REMOVE pending",
+            ConditionExpression="attribute_exists(id) AND attribute_not_exists(completed_at)",
+            ExpressionAttributeValues={
+                ":completed_at": completed_at,
+                ":expires_at": completed_at + int(config["invalidation_ledger_window_seconds"]),
+            },
+            ReturnValues="ALL_NEW",
+        )["Attributes"]
+    except dynamodb_resource.meta.client.exceptions.ConditionalCheckFailedException:
+        print(f"- Invalidation {invalidation['invalidation_id']} was completed by another poll. Skipping")
+        return True
+
+    resume_ids = list(completed_invalidation["resume_ids"])
+    print(f"- Invalidation {invalidation['invalidation_id']} completed. Updating {len(resume_ids)} resumes in DynamoDB")
+    try:
+        batch_update_items(resume_ids=resume_ids)
+    except Exception:
+        print(f"Could not update the resumes of invalidation {invalidation['invalidation_id']}. Error {format_exc()}")
+        # Releasing the completion lets the next poll update them again
+        _ = invalidations_table.update_item(
+            Key={"id": invalidation["id"]},
+            UpdateExpression="SET expires_at = :expires_at, pending = :pending REMOVE completed_at",
+            ExpressionAttributeValues={
+                ":expires_at": int(invalidation["submitted_at"]) + int(config["invalidation_record_ttl_seconds"]),
+                ":pending": "true",
+            },
+        )
+    return True
+
+
 def batch_update_items(*, resume_ids: list, message=None):
     """
-    Batch updates all items to remove invalidate_cache attribute and set the resume_url attribute
-    to its proper url
+    Batch updates all items to remove the invalidate_cache attributes and set the resume_url attribute
+    to its proper url. Resumes that were deleted in the meantime fail the update's condition and are skipped.
 
     Parameters
     ----------
-    resume_id : list
+    resume_ids : list
         A list of the resume IDs to update within DynamoDB
+    message : str
+        A message to set the resume_url attribute to instead of the resume's url
     """
-    ids_to_update = resume_ids.copy()
-    i = 0
-    max_items = 25
-    while i * max_items < len(ids_to_update):
-        min_range = max_items * i
-        max_range = min(max_items * (i + 1), len(ids_to_update))
-        i += 1
-        id_chunk = ids_to_update[min_range:max_range]
-        print(
-            f"-- {min_range + 1}-{max_range}/{len(ids_to_update)}: Attempting to update resume_url and invalidate_cache attributes."
-        )
-        retry = 0
-        max_retries = 3
-        while id_chunk:
-            sleep(retry**2)
-            statements = [
-                'UPDATE "' + config["dynamodb_table_name"] + '" SET resume_url=? REMOVE invalidate_cache WHERE id=?',
-            ] * len(resume_ids)
-            parameters = [
-                [f"{config['resumes_url_base']}/{resume_id}.html" if not message else message, resume_id]
-                for resume_id in resume_ids
-            ]
-            try:
-                response = dynamodb_resource.meta.client.batch_execute_statement(
-                    Statements=[
-                        {"Statement": statement, "Parameters": params}
-                        for statement, params in zip(statements, parameters)
-                    ]
-                )
-            except ClientError as e:
-                print(
-                    f"-- {min_range + 1}-{max_range}/{len(ids_to_update)}: Error updating resume_ids. Error: {format_exc()}"
-                )
-                raise e
-
-            id_chunk = []
-            errors = []
-            for item in response["Responses"]:
-                if "Error" in item.keys():
-                    resume_id = item["Error"]["Item"]["resume_id"]["S"]
-                    if item["Error"]["Code"] in ["ProvisionedThroughputExceeded", "RequestLimitExceeded"]:
-                        id_chunk.append(resume_id)
-                    else:
-                        errors.append(f"{resume_id}: {item['Error']['Code']}")
-            if errors:
-                print(f"-- {min_range + 1}-{max_range}/{len(ids_to_update)}: The following items returned an error:")
-                print("\n".join(errors))
-                raise RuntimeError("Error updating items")
-            if id_chunk:
-                if retry == max_retries:
-                    print(
-                        f"-- {min_range + 1}-{max_range}/{len(ids_to_update)}: Could not update the following resumes:"
-                    )
-                    print(", ".join(id_chunk))
-                    raise RuntimeError("Maximum retries exceeded")
-                retry += 1
-        print(f"{min_range + 1}-{max_range}/{len(ids_to_update)}: Update complete")
+    print(f"-- Attempting to update resume_url and invalidate_cache attributes of {len(resume_ids)} resumes")
+    statement = (
+        'UPDATE "'
+        + config["dynamodb_table_name"]
+        + '" SET resume_url=? REMOVE invalidate_cache REMOVE invalidate_cache_at WHERE id=?'
+    )
+    metrics = batch_execute_statements(
+        dynamodb_client=dynamodb_resource.meta.client,
+        statements=[
+            {
+                "Statement": statement,
+                "Parameters": [
+                    f"{config['resumes_url_base']}/{resume_id}.html" if not message else message,
+                    resume_id,
+                ],
+            }
+            for resume_id in resume_ids
+        ],
+        max_workers=int(config["max_workers"]),
+        max_retries=int(config["dynamodb_batch_write_max_retries"]),
+    )
+    print(f"-- {metrics}")
+    deleted_indexes = [index for index, error in metrics.errors.items() if error["code"] == "ConditionalCheckFailed"]
+    if deleted_indexes:
+        print(f"-- Skipped {len(deleted_indexes)} resumes that no longer exist")
+    errors = {index: error for index, error in metrics.errors.items() if index not in deleted_indexes}
+    if errors:
+        print("-- The following items returned an error:")
+        print("\n".join(f"{resume_ids[index]}: {error['code']}" for index, error in sorted(errors.items())))
+        raise RuntimeError("Error updating items")
@@ -42,6 +42,9 @@ def create_dynamodb_databases(stack: Stack) -> None:
             removal_policy=(RemovalPolicy.RETAIN if env.APP_DEPLOY_ENV == "PROD" else RemovalPolicy.DESTROY),
             sort_key=sort_key,
             deletion_protection=(env.APP_DEPLOY_ENV == "PROD"),
+            time_to_live_attribute=(
+                table_config.time_to_live_attribute if "time_to_live_attribute" in table_config.keys() else None
+            ),
         )
 
         for global_index_name, global_index_config in table_config.global_indexes.items():
@@ -98,47 +101,52 @@ def create_dynamodb_databases(stack: Stack) -> None:
 
         if "stream" in table_config.keys():
             stream_config = table_config.stream
+            # A stream feeds each function listed in event_sources, or the function of the stream itself
+            source_configs = stream_config.event_sources if stream_config.event_sources else [stream_config]
 
-            metrics_config = (
-                MetricsConfig(metrics=[getattr(MetricType.EVENT_COUNT, stream_config.metrics_config)])
-                if stream_config.metrics_config
-                else None
-            )
-
-            event_source = DynamoEventSource(
-                stack.resources.databases.dynamodb[table_name],
-                bisect_batch_on_error=(
-                    stream_config.bisect_batch_on_error if stream_config.bisect_batch_on_error else None
-                ),
-                filters=(
-                    [{"pattern": dumps(stream_filter.pattern)} for stream_filter in stream_config.filters]
-                    if stream_config.filters
+            for source_config in source_configs:
+                metrics_config = (
+                    MetricsConfig(metrics=[getattr(MetricType.EVENT_COUNT, source_config.metrics_config)])
+                    if source_config.metrics_config
                     else None
-                ),
-                max_record_age=(Duration.parse(stream_config.max_record_age) if stream_config.max_record_age else None),
-                metrics_config=metrics_config,
-                parallelization_factor=(
-                    stream_config.parallelization_factor if stream_config.parallelization_factor else None
-                ),
-                report_batch_item_failures=(
-                    stream_config.report_batch_item_failures if stream_config.report_batch_item_failures else None
-                ),
-                retry_attempts=(stream_config.retry_attempts if stream_config.retry_attempts else 0),
-                tumbling_window=(
-                    Duration.parse(stream_config.tumbling_window) if stream_config.tumbling_window else None
-                ),
-                starting_position=(
-                    getattr(StartingPosition, stream_config.starting_position)
-                    if stream_config.starting_position
-                    else StartingPosition.LATEST
-                ),
-                batch_size=(stream_config.batch_size if stream_config.batch_size else None),
-                enabled=(stream_config.enabled if stream_config.enabled else None),
-                max_batching_window=(
-                    Duration.parse(stream_config.max_batching_window) if stream_config.max_batching_window else None
-                ),
-            )
+                )
+
+                event_source = DynamoEventSource(
+                    stack.resources.databases.dynamodb[table_name],
+                    bisect_batch_on_error=(
+                        source_config.bisect_batch_on_error if source_config.bisect_batch_on_error else None
+                    ),
+                    filters=(
+                        [{"pattern": dumps(stream_filter.pattern)} for stream_filter in source_config.filters]
+                        if source_config.filters
+                        else None
+                    ),
+                    max_record_age=(
+                        Duration.parse(source_config.max_record_age) if source_config.max_record_age else None
+                    ),
+                    metrics_config=metrics_config,
+                    parallelization_factor=(
+                        source_config.parallelization_factor if source_config.parallelization_factor else None
+                    ),
+                    report_batch_item_failures=(
+                        source_config.report_batch_item_failures if source_config.report_batch_item_failures else None
+                    ),
+                    retry_attempts=(source_config.retry_attempts if source_config.retry_attempts else 0),
+                    tumbling_window=(
+                        Duration.parse(source_config.tumbling_window) if source_config.tumbling_window else None
+                    ),
+                    starting_position=(
+                        getattr(StartingPosition, source_config.starting_position)
+                        if source_config.starting_position
+                        else StartingPosition.LATEST
+                    ),
+                    batch_size=(source_config.batch_size if source_config.batch_size else None),
+                    enabled=(source_config.enabled if source_config.enabled else None),
+                    max_batching_window=(
+                        Duration.parse(source_config.max_batching_window) if source_config.max_batching_window else None
+                    ),
+                )
 
-            function_dict = get_lambda_function(stack, stream_config.function_name)
+                function_dict = get_lambda_function(stack, source_config.function_name)
 
-            function_dict.function.add_event_source(event_source)
+                function_dict.function.add_event_source(event_source)
@@ -0,0 +1,294 @@
+from ast import literal_eval
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from traceback import format_exc
+
+import boto3
+
+with open("./config.json", "r") as f:
+    config = literal_eval(f.read())
+
+s3 = None
+dynamodb_resource = None
+reconciliation_table = None
+ConditionalCheckFailedException = None
+
+# Each row tracks the sources of one resume ID. item_state holds the resume_state the item was inserted with,
+# html_state and parsed_document_state hold present_state or stale_state, and document_state holds present_state while
+# an upload has not been parsed. The sparse inconsistent attribute is only set on rows whose sources do not form a
+# valid resume, so dangling resume detection only has to query the rows within the inconsistent index. Rows of ID
+# reservations also hold the reservation's expires_at as item_expires_at.
+sources = ["item_state", "html_state", "document_state", "parsed_document_state"]
+present_state = "present"
+stale_state = "stale"
+pending_resume_state = "pending"
+inconsistent_value = "true"
+
+
+def handler(event, context) -> None:
+    """
+    Keeps the reconciliation index up to date from the resumes table stream and the S3 object events of the resume
+    buckets delivered by EventBridge
+
+    Item changes are taken from the stream records, while the state of an object is read from its versions when its
+    event is handled, so events of the same object that arrive out of order still leave the row correct.
+    """
+    if not reconciliation_table:
+        try:
+            globals()["s3"] = boto3.client("s3", region_name=config["s3_region"])
+            globals()["dynamodb_resource"] = boto3.resource("dynamodb", region_name=config["dynamodb_table_region"])
+            globals()["reconciliation_table"] = dynamodb_resource.Table(config["dynamodb_table_name"])
+            globals()[
+                "ConditionalCheckFailedException"
+            ] = dynamodb_resource.meta.client.exceptions.ConditionalCheckFailedException
+        except Exception:
+            print(f"Could not load S3 client or DynamoDB table. Error {format_exc()}")
+            raise
+
+    if "Records" in event.keys():
+        changes = get_item_changes(event["Records"])
+    else:
+        changes = get_object_changes(event)
+
+    print(f"- Reconciling {len(changes)} resume IDs")
+    with ThreadPoolExecutor(max_workers=int(config["max_workers"])) as executor:
+        list(executor.map(lambda resume_id: update_row(resume_id, changes[resume_id]), changes.keys()))
+
+    print("- All updates complete")
+
+
+def get_item_changes(records: list) -> dict:
+    """
+    Gets the item source of each resume ID from the resumes table stream records. Records of the same ID are in order,
+    so the last one wins.
+
+    Parameters
+    ----------
+    records : list
+        The stream records
+
+    Returns
+    ------
+    dict
+        A dict of resume IDs to a dict of {"item_state": resume_state or None, "item_expires_at": int or None}
+    """
+    changes = {}
+    for record in records:
+        resume_id = record["dynamodb"]["Keys"]["id"]["S"]
+        if record["eventName"] == "REMOVE":
+            changes[resume_id] = {"item_state": None, "item_expires_at": None}
+        else:
+            new_image = record["dynamodb"]["NewImage"]
+            item_state = new_image["resume_state"]["S"] if "resume_state" in new_image.keys() else present_state
+            changes[resume_id] = {
+                "item_state": item_state,
+                "item_expires_at": (
+                    int(new_image["expires_at"]["N"])
+                    if item_state == pending_resume_state and "expires_at" in new_image.keys()
+                    else None
+                ),
+            }
+
+    return changes
+
+
+def get_object_changes(event: dict) -> dict:
+    """
+    Gets the state of the object within an S3 EventBridge event
+
+    Parameters
+    ----------
+    event : dict
+        The Object Created or Object Deleted event
+
+    Returns
+    ------
+    dict
+        A dict of the object's resume ID to a dict of {source: state or None}, or an empty dict if the object is not
+        a resume source
+    """
+    bucket = event["detail"]["bucket"]["name"]
+    key = event["detail"]["object"]["key"]
+    object_source = get_object_source(bucket=bucket, key=key)
+    if not object_source:
+        print(f"- {bucket}/{key} is not a resume source. Skipping")
+        return {}
+
+    resume_id, source = object_source
+    state = get_object_state(bucket=bucket, key=key, source=source)
+    print(f"- {event['detail-type']}: {bucket}/{key} is {state}")
+    return {resume_id: {source: state}}
+
+
+def get_object_source(*, bucket: str, key: str) -> tuple:
+    """
+    Gets the resume ID and source an S3 object represents
+
+    Parameters
+    ----------
+    bucket : str
+        The object's bucket
+    key : str
+        The object's key
+
+    Returns
+    ------
+    tuple (resume_id, source)
+        The resume ID and one of html_state, document_state or parsed_document_state
+    None
+        If the object is not a resume source
+    """
+    locations = [
+        (config["s3_bucket_webpage"], config["s3_bucket_webpage_resumes_location"], ".html", "html_state"),
+        (config["s3_bucket_documents"], config["s3_bucket_documents_upload_location"], ".docx", "document_state"),
+        (
+            config["s3_bucket_documents"],
+            config["s3_bucket_documents_parsed_location"],
+            ".docx",
+            "parsed_document_state",
+        ),
+    ]
+    for location_bucket, location, file_extension, source in locations:
+        if bucket != location_bucket or not key.startswith(f"{location}/") or not key.endswith(file_extension):
+            continue
+        resume_id = key[len(location) + 1 : -len(file_extension)]
+        if resume_id and "/" not in resume_id:
+            return resume_id, source
+
+    return None
+
+
+def get_object_state(*, bucket: str, key: str, source: str) -> str:
+    """
+    Gets the state of an S3 object from its versions, using the same rules as the manager's dangling resume detection
+
+    An html object is present if it has a version that is not a delete marker and its two newest versions are not both
+    delete markers. A parsed document is present if it has a version that is not a delete marker. Objects with only
+    versions that do not meet these rules are stale. An unparsed document is present as long as it has any version.
+
+    Parameters
+    ----------
+    bucket : str
+        The object's bucket
+    key : str
+        The object's key
+    source : str
+        One of html_state, document_state or parsed_document_state
+
+    Returns
+    ------
+    str
+        present_state or stale_state
+    None
+        If the object has no versions
+    """
+    versions = []
+    paginator = s3.get_paginator("list_object_versions")
+    for page in paginator.paginate(Bucket=bucket, Prefix=key):
+        for versions_key, is_delete_marker in (("DeleteMarkers", True), ("Versions", False)):
+            versions += [
+                {"is_delete_marker": is_delete_marker, "LastModified": version["LastModified"]}
+                for version in page.get(versions_key, [])
+                if version["Key"] == key
+            ]
+
+    if not versions:
+        return None
+    if source == "document_state":
+        return present_state
+
+    versions.sort(key=lambda version: version["LastModified"], reverse=True)
+    if all(version["is_delete_marker"] for version in versions):
+        return stale_state
+    if source == "html_state" and len(versions) > 1 and all(version["is_delete_marker"] for version in versions[:2]):
+        return stale_state
+
+    return present_state
+
+
+def is_row_inconsistent(row: dict) -> bool:
+    """
+    Checks whether the sources of a row form a valid resume
+
+    A row is consistent when its item has a present html object, or when it holds an ID reservation that has not
+    expired. Unparsed documents, stale objects and objects without an item are always inconsistent.
+
+    Parameters
+    ----------
+    row : dict
+        The row's attributes
+
+    Returns
+    ------
+    bool
+        Whether the row is inconsistent
+    """
+    if "document_state" in row.keys() or stale_state in [row.get("html_state"), row.get("parsed_document_state")]:
+        return True
+    if "item_state" not in row.keys():
+        return "html_state" in row.keys() or "parsed_document_state" in row.keys()
+    # A reservation's later change to a full resume is not in the stream records the index receives
+    if row["item_state"] == pending_resume_state:
+        return int(row.get("item_expires_at", 0)) <= int(datetime.now(timezone.utc).timestamp())
+
+    return row.get("html_state") != present_state
+
+
+def update_row(resume_id: str, changes: dict) -> None:
+    """
+    Applies the changed sources to a resume ID's row, then flags or unflags it as inconsistent
+
+    The row's revision is incremented with the changes, and the flag is only written if the revision is unchanged. If
+    another change to the row is applied in between, the flag is left for that change to write.
+
+    Parameters
+    ----------
+    resume_id : str
+        The ID of the resume
+    changes : dict
+        A dict of sources to their new state, or None if the source no longer exists
+    """
+    set_sources = [source for source, state in changes.items() if state]
+    removed_sources = [source for source, state in changes.items() if not state]
+    update_expression = "SET updated_at = :updated_at"
+    update_expression += "".join(f", {source} = :{source}" for source in set_sources)
+    update_expression += " ADD revision :increment"
+    if removed_sources:
+        update_expression += f" REMOVE {', '.join(removed_sources)}"
+
+    row = reconciliation_table.update_item(
+        Key={"id": resume_id},
+        UpdateExpression=update_expression,
+        ExpressionAttributeValues={
+            ":updated_at": int(datetime.now(timezone.utc).timestamp()),
+            ":increment": 1,
+            **{f":{source}": changes[source] for source in set_sources},
+        },
+        ReturnValues="ALL_NEW",
+    )["Attributes"]
+
+    try:
+        if not set(row.keys()).intersection(sources):
+            _ = reconciliation_table.delete_item(
+                Key={"id": resume_id},
+                ConditionExpression="revision = :revision",
+                ExpressionAttributeValues={":revision": row["revision"]},
+            )
+            print(f"- {resume_id}: No sources remain. Removed row")
+        elif is_row_inconsistent(row):
+            _ = reconciliation_table.update_item(
+                Key={"id": resume_id},
+                UpdateExpression="SET inconsistent = :inconsistent",
+                ConditionExpression="revision = :revision",
+                ExpressionAttributeValues={":inconsistent": inconsistent_value, ":revision": row["revision"]},
+            )
+            print(f"- {resume_id}: Flagged inconsistent")
+        else:
+            _ = reconciliation_table.update_item(
+                Key={"id": resume_id},
+                UpdateExpression="REMOVE inconsistent",
+                ConditionExpression="revision = :revision",
+                ExpressionAttributeValues={":revision": row["revision"]},
+            )
+    except ConditionalCheckFailedException:
+        print(f"- {resume_id}: Row changed concurrently. Leaving its flag to the newer change")
@@ -0,0 +1,192 @@
+from ast import literal_eval
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from time import sleep
+from traceback import format_exc
+
+import boto3
+
+with open("./config.json", "r") as f:
+    config = literal_eval(f.read())
+
+dynamodb_resource = None
+stats_table = None
+
+# Each stats item is keyed on the resume ID and a period of hour#YYYY-MM-DDTHH or day#YYYY-MM-DD. Unique viewers are
+# counted with one marker item per viewer and period, keyed viewer#{period}#{viewer hash}, and every counted stream
+# record leaves a marker keyed event#{eventID}. Markers expire once the period can no longer receive views and the
+# record can no longer be redelivered.
+hourly_stats_retention = int(config["hourly_stats_retention_days"]) * 86400
+marker_retention = 2 * 86400
+# A view adds up to five transaction items: its event marker, two viewer markers and two stats updates
+transaction_max_views = 20
+
+
+def handler(event, context) -> None:
+    """
+    Maintains hourly and daily per-resume view counts and unique viewer counts from the resume-viewers table stream
+
+    The views of each resume are counted in transactions which write the marker of every counted record and every new
+    viewer along with the stats updates, so a batch that is retried or bisected after a failure is only counted once.
+    Views within a transaction are aggregated, so each period receives a single update. Owner previews are skipped.
+    """
+    if not stats_table:
+        try:
+            globals()["dynamodb_resource"] = boto3.resource("dynamodb", region_name=config["dynamodb_table_region"])
+            globals()["stats_table"] = dynamodb_resource.Table(config["dynamodb_table_name"])
+        except Exception:
+            print(f"Could not open DynamoDB table. Error {format_exc()}")
+            raise
+
+    resume_views = {}
+    for record in event["Records"]:
+        new_image = record["dynamodb"]["NewImage"]
+        if "preview" in new_image.keys():
+            continue
+        day = new_image["bucket"]["S"].split("#", 1)[1]
+        hour = new_image["event"]["S"][:2]
+        resume_id = new_image["resume_id"]["S"] if "resume_id" in new_image.keys() else "unknown"
+        resume_views.setdefault(resume_id, []).append(
+            {
+                "event_id": record["eventID"],
+                "viewer": new_image["viewer"]["S"],
+                "periods": [f"hour#{day}T{hour}", f"day#{day}"],
+            }
+        )
+
+    chunks = [
+        (resume_id, views[i : i + transaction_max_views])
+        for resume_id, views in resume_views.items()
+        for i in range(0, len(views), transaction_max_views)
+    ]
+    print(f"- Counting {sum(len(views) for _, views in chunks)} views of {len(resume_views)} resumes")
+
+    with ThreadPoolExecutor(max_workers=int(config["max_workers"])) as executor:
+        counted = sum(executor.map(lambda chunk: count_views(*chunk), chunks))
+
+    print(f"- All updates complete. Counted {counted} views")
+
+
+def count_views(resume_id: str, views: list) -> int:
+    """
+    Counts views of a resume with a single transaction, skipping the views whose stream record was already counted and
+    the viewers already counted within a period
+
+    The transaction conditionally puts the marker of each record and each new viewer. When it is cancelled by markers
+    that already exist, those records or viewers are left out and the transaction is resubmitted. Other cancellations
+    are retried with exponential backoff up to dynamodb_transact_write_max_retries times.
+
+    Parameters
+    ----------
+    resume_id : str
+        The ID of the resume
+    views : list
+        Dicts of each view's stream record eventID as event_id, its viewer hash as viewer, and its periods
+
+    Raises
+    ------
+    RuntimeError
+        If the transaction could not be written within the retries
+
+    Returns
+    ------
+    int
+        The number of views counted
+    """
+    client = dynamodb_resource.meta.client
+    now = int(datetime.now(timezone.utc).timestamp())
+    counted_viewers = set()
+    retry = 0
+    while views:
+        period_views = {}
+        period_viewers = {}
+        for view in views:
+            for period in view["periods"]:
+                period_views[period] = period_views.get(period, 0) + 1
+                if (period, view["viewer"]) not in counted_viewers:
+                    period_viewers.setdefault(period, set()).add(view["viewer"])
+
+        markers = [("event", view) for view in views] + [
+            ("viewer", (period, viewer)) for period, viewers in period_viewers.items() for viewer in sorted(viewers)
+        ]
+        transact_items = [
+            {
+                "Put": {
+                    "TableName": config["dynamodb_table_name"],
+                    "Item": {
+                        "resume_id": resume_id,
+                        "period": (
+                            f"event#{marker['event_id']}"
+                            if marker_type == "event"
+                            else f"viewer#{marker[0]}#{marker[1]}"
+                        ),
+                        "expires_at": now + marker_retention,
+                    },
+                    "ConditionExpression": "attribute_not_exists(#period)",
+                    "ExpressionAttributeNames": {"#period": "period"},
+                }
+            }
+            for marker_type, marker in markers
+        ] + [
+            {
+                "Update": {
+                    "TableName": config["dynamodb_table_name"],
+                    "Key": {"resume_id": resume_id, "period": period},
+                    **get_stats_update(period, views=view_count, unique_viewers=len(period_viewers.get(period, []))),
+                }
+            }
+            for period, view_count in period_views.items()
+        ]
+
+        try:
+            _ = client.transact_write_items(TransactItems=transact_items)
+            return len(views)
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = e.response.get("CancellationReasons", [])
+            existing_markers = [
+                marker for marker, reason in zip(markers, reasons) if reason.get("Code") == "ConditionalCheckFailed"
+            ]
+            if existing_markers:
+                counted_event_ids = set(
+                    marker["event_id"] for marker_type, marker in existing_markers if marker_type == "event"
+                )
+                if counted_event_ids:
+                    print(f"- {resume_id}: Skipping {len(counted_event_ids)} views that were already counted")
+                views = [view for view in views if view["event_id"] not in counted_event_ids]
+                counted_viewers.update(marker for marker_type, marker in existing_markers if marker_type == "viewer")
+                continue
+            if retry >= int(config["dynamodb_transact_write_max_retries"]):
+                raise RuntimeError(f"Could not count the views of resume {resume_id} within the retries") from e
+            retry += 1
+            sleep(min(0.05 * 2**retry, 1))
+
+    return 0
+
+
+def get_stats_update(period: str, *, views: int, unique_viewers: int) -> dict:
+    """
+    Builds the Update parameters that add views and unique viewers to a stats item. Hourly items expire after
+    hourly_stats_retention_days.
+
+    Parameters
+    ----------
+    period : str
+        The period, formatted as hour#YYYY-MM-DDTHH or day#YYYY-MM-DD
+    views : int
+        The number of views to add
+    unique_viewers : int
+        The number of unique viewers to add
+
+    Returns
+    ------
+    dict
+        The UpdateExpression and ExpressionAttributeValues of the update
+    """
+    update_expression = "ADD view_count :views, unique_viewers :unique_viewers"
+    expression_attribute_values = {":views": views, ":unique_viewers": unique_viewers}
+    if period.startswith("hour#"):
+        hour = datetime.strptime(period.split("#", 1)[1], "%Y-%m-%dT%H").replace(tzinfo=timezone.utc)
+        update_expression += " SET expires_at = :expires_at"
+        expression_attribute_values[":expires_at"] = int((hour + timedelta(seconds=hourly_stats_retention)).timestamp())
+
+    return {"UpdateExpression": update_expression, "ExpressionAttributeValues": expression_attribute_values}
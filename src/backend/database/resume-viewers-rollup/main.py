@@ -0,0 +1,104 @@
+from ast import literal_eval
+from datetime import datetime, timedelta, timezone
+from traceback import format_exc
+
+import boto3
+
+with open("./config.json", "r") as f:
+    config = literal_eval(f.read())
+
+viewers_table = None
+
+# Raw viewer rows are stored in one partition per day (views#YYYY-MM-DD) and expire through the table's TTL.
+# Daily aggregates are stored without an expiry in the rollup partition, with the day as the sort key. Owner previews
+# are marked with a preview attribute and are not counted.
+views_bucket_prefix = "views#"
+daily_rollup_bucket = "rollup#daily"
+
+
+def handler(event, context) -> dict:
+    """
+    Compacts the raw viewer rows of recent days into daily aggregates
+
+    The previous rollup_lookback_days complete days are rolled up on every run so a missed run is caught up well before
+    the raw rows expire. Specific days can be rolled up by invoking the function with {"days": ["YYYY-MM-DD", ...]}.
+    Aggregates are overwritten on every run, so rolling up a day more than once is safe.
+    """
+    try:
+        dynamodb_resource = boto3.resource("dynamodb", region_name=config["dynamodb_table_region"])
+        globals()["viewers_table"] = dynamodb_resource.Table(config["dynamodb_table_name"])
+    except Exception:
+        print(f"Could not open DynamoDB table. Error {format_exc()}")
+        raise
+
+    if event and "days" in event.keys():
+        days = event["days"]
+    else:
+        today = datetime.now(timezone.utc).date()
+        days = [
+            (today - timedelta(days=days_ago)).isoformat()
+            for days_ago in range(int(config["rollup_lookback_days"]), 0, -1)
+        ]
+
+    rollups = {}
+    for day in days:
+        rollups[day] = rollup_day(day)
+        print(f"- {day}: {rollups[day]['view_count']} views from {rollups[day]['unique_viewers']} unique viewers")
+
+    return {"rollups": rollups}
+
+
+def rollup_day(day: str) -> dict:
+    """
+    Aggregates the raw viewer rows of a single day and writes the aggregate to the rollup partition
+
+    Parameters
+    ----------
+    day : str
+        The day to roll up, formatted as YYYY-MM-DD
+
+    Returns
+    ------
+    dict
+        The view count and unique viewer count of the day
+    """
+    viewers = set()
+    resume_viewers = {}
+    resume_views = {}
+    view_count = 0
+
+    query_kwargs = {
+        "KeyConditionExpression": "#bucket = :bucket",
+        "ProjectionExpression": "viewer, resume_id, preview",
+        "ExpressionAttributeNames": {"#bucket": "bucket"},
+        "ExpressionAttributeValues": {":bucket": f"{views_bucket_prefix}{day}"},
+    }
+    while True:
+        response = viewers_table.query(**query_kwargs)
+        for item in response["Items"]:
+            if "preview" in item.keys():
+                continue
+            view_count += 1
+            viewers.add(item["viewer"])
+            resume_id = item["resume_id"] if "resume_id" in item.keys() else "unknown"
+            resume_views[resume_id] = resume_views.get(resume_id, 0) + 1
+            resume_viewers.setdefault(resume_id, set()).add(item["viewer"])
+        if "LastEvaluatedKey" not in response.keys():
+            break
+        query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    _ = viewers_table.put_item(
+        Item={
+            "bucket": daily_rollup_bucket,
+            "event": day,
+            "view_count": view_count,
+            "unique_viewers": len(viewers),
+            "resumes": {
+                resume_id: {"view_count": resume_views[resume_id], "unique_viewers": len(resume_viewers[resume_id])}
+                for resume_id in resume_views.keys()
+            },
+            "rolled_up_at": datetime.now(timezone.utc).isoformat(),
+        }
+    )
+
+    return {"view_count": view_count, "unique_viewers": len(viewers)}
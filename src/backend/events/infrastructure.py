@@ -0,0 +1,66 @@
+from aws_cdk import Duration, Stack
+from aws_cdk.aws_events import EventPattern, Rule, Schedule
+from aws_cdk.aws_events_targets import LambdaFunction
+from json import dumps, loads
+
+from src.backend.configuration.common import get_cdk_config, get_eventbridge_config, get_lambda_function
+
+
+def create_eventbridge_rules(stack: Stack) -> None:
+    eventbridge_config = get_eventbridge_config()
+    for rule_name, rule_config in eventbridge_config.rules.items():
+        targets = []
+        for target_config in rule_config.targets:
+            if target_config.target_type == "lambda":
+                function_dict = get_lambda_function(stack, target_config.function_name)
+                if target_config.function_alias:
+                    function = function_dict.aliases[target_config.function_alias]
+                else:
+                    function = function_dict.function
+
+                targets.append(
+                    LambdaFunction(
+                        function,
+                        max_event_age=(
+                            Duration.parse(target_config.max_event_age) if target_config.max_event_age else None
+                        ),
+                        retry_attempts=(target_config.retry_attempts if target_config.retry_attempts else None),
+                    )
+                )
+            else:
+                raise NotImplementedError("Target types other than Lambda have not yet been implemented")
+
+        stack.resources.events.rules[rule_name] = Rule(
+            stack,
+            rule_config.logical_name,
+            description=(rule_config.description if rule_config.description else None),
+            enabled=(rule_config.enabled if "enabled" in rule_config.keys() else True),
+            event_pattern=(_get_event_pattern(stack, rule_config) if rule_config.event_pattern else None),
+            schedule=(Schedule.expression(rule_config.schedule) if rule_config.schedule else None),
+            targets=targets,
+        )
+
+
+def _get_event_pattern(stack: Stack, rule_config) -> EventPattern:
+    # The names of the buckets in event_pattern_s3_buckets are only known once deployed, so they are added to the
+    # pattern's detail here
+    detail = loads(dumps(rule_config.event_pattern.detail)) if rule_config.event_pattern.detail else {}
+    if rule_config.event_pattern_s3_buckets:
+        detail["bucket"] = {
+            "name": [
+                stack.resources.s3.buckets[bucket_name].bucket_name
+                for bucket_name in rule_config.event_pattern_s3_buckets
+            ]
+        }
+    # The key prefixes come from the same cdk.json static variables as the locations the functions are configured with
+    if rule_config.event_pattern_s3_key_locations:
+        static_variables = get_cdk_config().static_variables
+        detail.setdefault("object", {})["key"] = [
+            {"prefix": f"{static_variables[location]}/"} for location in rule_config.event_pattern_s3_key_locations
+        ]
+
+    return EventPattern(
+        source=(rule_config.event_pattern.source if rule_config.event_pattern.source else None),
+        detail_type=(rule_config.event_pattern.detail_type if rule_config.event_pattern.detail_type else None),
+        detail=(detail if detail else None),
+    )
@@ -0,0 +1,317 @@
+from ast import literal_eval
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from gzip import GzipFile
+from io import TextIOWrapper
+from random import randrange
+from time import sleep
+from traceback import format_exc
+from typing import Iterable, Iterator
+from urllib.parse import unquote_plus
+import re
+import sys
+
+import boto3
+
+with open("./config.json", "r") as f:
+    config = literal_eval(f.read())
+
+s3 = None
+dynamodb_client = None
+
+views_table_total_id = "all_resumes"
+resume_pending_state = "pending"
+# Markers in the viewers table are keyed on the log file, with one marker per resume counted from the file and one
+# marker once the whole file has been counted
+processed_log_bucket_prefix = "access_log#"
+processed_log_event = "processed"
+processed_log_resume_event_prefix = "resume#"
+
+
+def handler(event, context) -> None:
+    """
+    Counts resume views from CloudFront standard access log files as they are delivered to S3
+
+    Each log file is streamed and decompressed line by line, and views are aggregated per resume ID in memory. The
+    views of each resume are then added in a transaction along with a marker for the log file and resume, so a log file
+    that is delivered more than once or retried after a partial failure only counts each resume once. Once all of its
+    resumes are counted, a processed marker lets later deliveries skip the file without reading it.
+    """
+    if not dynamodb_client:
+        try:
+            globals()["s3"] = boto3.client("s3", region_name=config["s3_region"])
+            dynamodb_resource = boto3.resource("dynamodb", region_name=config["dynamodb_table_region"])
+            globals()["dynamodb_client"] = dynamodb_resource.meta.client
+        except Exception:
+            print(f"Could not load S3 client or DynamoDB tables. Error {format_exc()}")
+            raise
+
+    for record in event["Records"]:
+        bucket = record["s3"]["bucket"]["name"]
+        key = unquote_plus(record["s3"]["object"]["key"])
+        if check_if_log_processed(key, client=dynamodb_client):
+            print(f"- {key} has already been processed. Skipping")
+            continue
+
+        body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+        view_counts = count_resume_views(parse_log_lines(read_gzip_lines(body)))
+        print(f"- {key}: {sum(view_counts.values())} views of {len(view_counts)} resumes")
+        counted = apply_view_counts(
+            view_counts,
+            log_key=key,
+            client=dynamodb_client,
+            view_count_shards=int(config["dynamodb_resume_views_shards"]),
+        )
+        mark_log_processed(key, client=dynamodb_client)
+        print(f"- {key}: Added {counted} views to existing resumes")
+
+
+def read_gzip_lines(stream) -> Iterator[str]:
+    """
+    Yields the lines of a gzip compressed stream, decompressing it as it is read
+
+    Parameters
+    ----------
+    stream : file-like
+        Any object with a read method, such as a botocore StreamingBody or an open file
+
+    Returns
+    ------
+    Iterator[str]
+        The decompressed lines without their line endings
+    """
+    with GzipFile(fileobj=stream) as gzip_file:
+        for line in TextIOWrapper(gzip_file, encoding="utf-8"):
+            yield line.rstrip("\n")
+
+
+def parse_log_lines(lines: Iterable[str]) -> Iterator[dict]:
+    """
+    Yields each entry of a CloudFront standard access log as a dict keyed on the field names of its #Fields header
+
+    Parameters
+    ----------
+    lines : Iterable[str]
+        The lines of the log file
+
+    Returns
+    ------
+    Iterator[dict]
+        The log entries
+    """
+    fields = []
+    for line in lines:
+        if line.startswith("#Fields:"):
+            fields = line[len("#Fields:") :].split()
+        elif line and not line.startswith("#"):
+            yield dict(zip(fields, line.split("\t")))
+
+
+def count_resume_views(entries: Iterable[dict]) -> Counter:
+    """
+    Counts successful page loads of each resume, ignoring owner previews made with a noIncrement query string
+
+    Parameters
+    ----------
+    entries : Iterable[dict]
+        The parsed log entries
+
+    Returns
+    ------
+    Counter
+        The number of views of each resume ID
+    """
+    resume_path_regex = re.compile(rf"^{re.escape(config['resume_path'])}([a-zA-Z0-9_-]+)\.html$")
+    view_counts = Counter()
+    for entry in entries:
+        if entry.get("cs-method") != "GET" or entry.get("sc-status") not in ("200", "304"):
+            continue
+        if "noIncrement=" in entry.get("cs-uri-query", ""):
+            continue
+        resume_path_match = resume_path_regex.match(entry.get("cs-uri-stem", ""))
+        if resume_path_match:
+            view_counts[resume_path_match.group(1)] += 1
+
+    return view_counts
+
+
+def apply_view_counts(view_counts: Counter, *, log_key: str, client, view_count_shards: int = 1) -> int:
+    """
+    Adds the aggregated view counts of a log file to each resume and to a shard of the global view count
+
+    Each resume is counted with its own transaction, which conditionally puts the marker of the log file and resume,
+    adds the views to the resume if it exists, and adds them to a random shard of the global view count. Resumes that
+    were already counted from the log file and resumes that do not exist are skipped. Other cancellations are retried
+    with exponential backoff up to dynamodb_transact_write_max_retries times.
+
+    Parameters
+    ----------
+    view_counts : Counter
+        The number of views of each resume ID
+    log_key : str
+        The key of the log file the views were counted from
+    client : DynamoDB client or InMemoryDynamoDB
+        The client to write the transactions with
+    view_count_shards : int
+        The number of shards of the global view count
+
+    Raises
+    ------
+    RuntimeError
+        If the views of a resume could not be added within the retries
+
+    Returns
+    ------
+    int
+        The number of views added to existing resumes
+    """
+    expires_at = int(datetime.now(timezone.utc).timestamp()) + int(config["processed_log_retention_days"]) * 86400
+
+    def add_views(resume_id: str) -> int:
+        for retry in range(int(config["dynamodb_transact_write_max_retries"]) + 1):
+            if retry:
+                sleep(min(0.05 * 2**retry, 1))
+            shard = randrange(0, max(view_count_shards, 1))
+            try:
+                _ = client.transact_write_items(
+                    TransactItems=[
+                        {
+                            "Put": {
+                                "TableName": config["dynamodb_resume_viewers_table"],
+                                "Item": {
+                                    "bucket": f"{processed_log_bucket_prefix}{log_key}",
+                                    "event": f"{processed_log_resume_event_prefix}{resume_id}",
+                                    "expires_at": expires_at,
+                                },
+                                "ConditionExpression": "attribute_not_exists(#bucket)",
+                                "ExpressionAttributeNames": {"#bucket": "bucket"},
+                            }
+                        },
+                        {
+                            "Update": {
+                                "TableName": config["dynamodb_resumes_table"],
+                                "Key": {"id": resume_id},
+                                "UpdateExpression": "ADD view_count :views",
+                                "ConditionExpression": "attribute_exists(id) AND "
+                                "(attribute_not_exists(resume_state) OR resume_state <> :pending)",
+                                "ExpressionAttributeValues": {
+                                    ":views": view_counts[resume_id],
+                                    ":pending": resume_pending_state,
+                                },
+                            }
+                        },
+                        {
+                            "Update": {
+                                "TableName": config["dynamodb_resume_views_table"],
+                                "Key": {
+                                    "id": views_table_total_id if shard == 0 else f"{views_table_total_id}#{shard}"
+                                },
+                                "UpdateExpression": "ADD view_count :views",
+                                "ExpressionAttributeValues": {":views": view_counts[resume_id]},
+                            }
+                        },
+                    ]
+                )
+            except client.exceptions.TransactionCanceledException as e:
+                reasons = [reason.get("Code") for reason in e.response.get("CancellationReasons", [])]
+                if reasons[:1] == ["ConditionalCheckFailed"]:
+                    print(f"- Resume {resume_id} was already counted from {log_key}. Skipping")
+                    return 0
+                if reasons[1:2] == ["ConditionalCheckFailed"]:
+                    print(f"- Resume {resume_id} does not exist. Skipping {view_counts[resume_id]} views")
+                    return 0
+                continue
+            return view_counts[resume_id]
+
+        raise RuntimeError(f"Could not add the views of resume {resume_id} within the retries")
+
+    with ThreadPoolExecutor(max_workers=int(config["max_workers"])) as executor:
+        return sum(executor.map(add_views, view_counts.keys()))
+
+
+def check_if_log_processed(key: str, *, client) -> bool:
+    response = client.get_item(
+        TableName=config["dynamodb_resume_viewers_table"],
+        Key={"bucket": f"{processed_log_bucket_prefix}{key}", "event": processed_log_event},
+    )
+    return "Item" in response.keys()
+
+
+def mark_log_processed(key: str, *, client) -> None:
+    expires_at = int(datetime.now(timezone.utc).timestamp()) + int(config["processed_log_retention_days"]) * 86400
+    _ = client.put_item(
+        TableName=config["dynamodb_resume_viewers_table"],
+        Item={"bucket": f"{processed_log_bucket_prefix}{key}", "event": processed_log_event, "expires_at": expires_at},
+    )
+
+
+class InMemoryDynamoDB:
+    """
+    A local stand-in for the DynamoDB client supporting the transactions, puts and gets used by this function
+
+    Items are stored per table name, keyed on the values of their key attributes. If existing_ids is None, every resume
+    is treated as existing.
+    """
+
+    class _Exceptions:
+        class TransactionCanceledException(Exception):
+            def __init__(self, reasons: list):
+                super().__init__("Transaction cancelled")
+                self.response = {"CancellationReasons": reasons}
+
+    exceptions = _Exceptions
+
+    def __init__(self, *, existing_ids: set = None):
+        self.existing_ids = existing_ids
+        self.tables = {}
+
+    def _key(self, item: dict) -> tuple:
+        return (item["bucket"], item["event"]) if "bucket" in item.keys() else (item["id"],)
+
+    def _condition_failed(self, transact_item: dict) -> bool:
+        if "Put" in transact_item.keys():
+            put = transact_item["Put"]
+            return self._key(put["Item"]) in self.tables.get(put["TableName"], {}).keys()
+        update = transact_item["Update"]
+        if "ConditionExpression" not in update.keys() or self.existing_ids is None:
+            return False
+        return update["Key"]["id"] not in self.existing_ids
+
+    def transact_write_items(self, *, TransactItems: list) -> dict:
+        reasons = [
+            {"Code": "ConditionalCheckFailed" if self._condition_failed(transact_item) else "None"}
+            for transact_item in TransactItems
+        ]
+        if any(reason["Code"] != "None" for reason in reasons):
+            raise self._Exceptions.TransactionCanceledException(reasons)
+
+        for transact_item in TransactItems:
+            if "Put" in transact_item.keys():
+                self.put_item(**transact_item["Put"])
+            else:
+                update = transact_item["Update"]
+                items = self.tables.setdefault(update["TableName"], {})
+                item = items.setdefault(self._key(update["Key"]), dict(update["Key"]))
+                item["view_count"] = item.get("view_count", 0) + update["ExpressionAttributeValues"][":views"]
+        return {}
+
+    def put_item(self, *, TableName: str, Item: dict, **kwargs) -> dict:
+        self.tables.setdefault(TableName, {})[self._key(Item)] = dict(Item)
+        return {}
+
+    def get_item(self, *, TableName: str, Key: dict) -> dict:
+        item = self.tables.get(TableName, {}).get(self._key(Key))
+        return {"Item": item} if item else {}
+
+
+if __name__ == "__main__":
+    # Counts the views in local log files against in-memory tables, e.g. python main.py E2EXAMPLE.2024-01-01-00.gz
+    local_client = InMemoryDynamoDB()
+    for log_file_path in sys.argv[1:]:
+        with open(log_file_path, "rb") as log_file:
+            local_view_counts = count_resume_views(parse_log_lines(read_gzip_lines(log_file)))
+        print(f"{log_file_path}: {dict(local_view_counts)}")
+        apply_view_counts(local_view_counts, log_key=log_file_path, client=local_client)
+    print(f"Resumes: {local_client.tables.get(config['dynamodb_resumes_table'], {})}")
+    print(f"Views: {local_client.tables.get(config['dynamodb_resume_views_table'], {})}")
@@ -1,10 +1,11 @@
 import { readFileSync } from "fs";
-import { S3, DeleteObjectCommand, GetObjectCommand, CopyObjectCommand } from "@aws-sdk/client-s3";
+import { S3, DeleteObjectCommand, DeleteObjectsCommand, GetObjectCommand, CopyObjectCommand, ListObjectVersionsCommand } from "@aws-sdk/client-s3";
 import { Upload } from "@aws-sdk/lib-storage";
 import { DynamoDBClient, GetItemCommand, UpdateItemCommand } from "@aws-sdk/client-dynamodb";
 import { JSDOM } from "jsdom";
 import * as mammoth from "mammoth";
 import { Buffer } from "node:buffer";
+import { createHash } from "node:crypto";
 import prettier from "prettier";
 
 var config = JSON.parse(readFileSync(import.meta.dirname + "/config.json").toString("utf8"));
@@ -118,15 +119,33 @@ export const handler = async (event, context) => {
             console.log(`Error moving docx object from source bucket dropoff to archive. ${e.stack}`);
             throw new Error("handler_move_object_error");
         }
-        try {
-            const destinationKey = `${config["destination_bucket_destination_folder"]}/${htmlFileName}`;
-            var prettifiedResume = await prettier.format(newResume, { parser: "html", printWidth: 200 });
-            prettifiedResume = prettifiedResume.replace("DOCTYPE html", "doctype html");
-            await putS3Object(s3DestinationClient, config["destination_bucket"], destinationKey, prettifiedResume);
-            console.log(`Put new resume's HTML string into object ${destinationKey} in bucket ${config["destination_bucket"]}`);
-        } catch (e) {
-            console.log(`Error putting object from source bucket dropoff to website. ${e.stack}`);
-            throw new Error("handler_put_object_error");
+        if (config["publishing_mode"] == "content_hashed") {
+            try {
+                var contentHashedKey = await putContentHashedResume(s3DestinationClient, config["destination_bucket"], config["destination_bucket_destination_folder"], itemId, newResume);
+                console.log(`Put new resume's HTML string into object ${contentHashedKey} and its redirect into object ${config["destination_bucket_destination_folder"]}/${htmlFileName} in bucket ${config["destination_bucket"]}`);
+            } catch (e) {
+                console.log(`Error putting content hashed objects from source bucket dropoff to website. ${e.stack}`);
+                throw new Error("handler_put_object_error");
+            }
+            try {
+                // The redirect no longer points to the previous versions' html, so they are removed to not be served forever
+                const contentHashedPrefix = `${config["destination_bucket_destination_folder"]}/${itemId}/`;
+                const numDeletedVersions = await deleteOtherS3ObjectVersions(s3DestinationClient, config["destination_bucket"], contentHashedPrefix, contentHashedKey);
+                console.log(`Deleted ${numDeletedVersions} versions of previous content hashed objects under ${contentHashedPrefix}`);
+            } catch (e) {
+                console.log(`Error deleting previous content hashed objects. ${e.stack}`);
+            }
+        } else {
+            try {
+                const destinationKey = `${config["destination_bucket_destination_folder"]}/${htmlFileName}`;
+                var prettifiedResume = await prettier.format(newResume, { parser: "html", printWidth: 200 });
+                prettifiedResume = prettifiedResume.replace("DOCTYPE html", "doctype html");
+                await putS3Object(s3DestinationClient, config["destination_bucket"], destinationKey, prettifiedResume);
+                console.log(`Put new resume's HTML string into object ${destinationKey} in bucket ${config["destination_bucket"]}`);
+            } catch (e) {
+                console.log(`Error putting object from source bucket dropoff to website. ${e.stack}`);
+                throw new Error("handler_put_object_error");
+            }
         }
     } catch (e) {
         errorMessage = e.message;
@@ -141,6 +160,9 @@ export const handler = async (event, context) => {
         ];
         if (errorMessage !== undefined) {
             attributes[0].value = errorMessage;
+        } else if (config["publishing_mode"] == "content_hashed") {
+            // The redirect is never cached, so the new version is live without an invalidation
+            attributes[0].value = `${config["resumes_url_base"]}/${config["destination_bucket_destination_folder"]}/${htmlFileName}`;
         } else {
             attributes[0].value = invalidatingCacheString;
             attributes.push({
@@ -148,6 +170,12 @@ export const handler = async (event, context) => {
                 type: "N",
                 value: "1",
             });
+            // Lets the invalidator find resumes whose invalidation was lost and queue them again
+            attributes.push({
+                key: "invalidate_cache_at",
+                type: "N",
+                value: `${Math.floor(Date.now() / 1000)}`,
+            });
         }
 
         const partitionKey = {
@@ -157,7 +185,7 @@ export const handler = async (event, context) => {
         };
         await updateDatabaseField(dynamodbClient, config["dynamodb_table_name"], partitionKey, null, attributes);
         var updateMessage = `Added attributes ${attributes[0].key} to ${attributes[0].value}`;
-        if (errorMessage === undefined) {
+        if (attributes.length > 1) {
             updateMessage = updateMessage.concat(` and ${attributes[1].key} to ${attributes[1].value}`);
         }
         console.log(updateMessage);
@@ -716,7 +744,7 @@ async function moveS3ObjectWithinBucket(client, bucket, oldKey, newKey, versionI
     return newItem.VersionId;
 }
 
-async function putS3Object(client, bucket, key, body) {
+async function putS3Object(client, bucket, key, body, contentType, cacheControl) {
     if (client === undefined) {
         throw new Error("Client is a required parameter");
     } else if (client.constructor != S3) {
@@ -747,6 +775,12 @@ async function putS3Object(client, bucket, key, body) {
         Key: key,
         Body: new Buffer.from(body),
     };
+    if (contentType !== undefined) {
+        input.ContentType = contentType;
+    }
+    if (cacheControl !== undefined) {
+        input.CacheControl = cacheControl;
+    }
     const upload = new Upload({
         client: client,
         params: input,
@@ -756,6 +790,34 @@ async function putS3Object(client, bucket, key, body) {
     return item;
 }
 
+async function putContentHashedResume(client, bucket, folder, itemId, resumeHtml) {
+    // The html is served from a path one level below the resumes folder, so relative links are resolved against the
+    // folder with a base element, and the page's script reads the resume ID from a meta element instead of the path
+    const hashedResumeHtml = resumeHtml.replace("<head>", `<head><base href="/${folder}/" /><meta name="resume-id" content="${itemId}" />`);
+    var prettifiedResume = await prettier.format(hashedResumeHtml, { parser: "html", printWidth: 200 });
+    prettifiedResume = prettifiedResume.replace("DOCTYPE html", "doctype html");
+    const contentHash = createHash("sha256").update(prettifiedResume).digest("hex").slice(0, config["content_hash_length"]);
+    const contentHashedKey = `${folder}/${itemId}/${contentHash}.html`;
+    await putS3Object(client, bucket, contentHashedKey, prettifiedResume, "text/html; charset=utf-8", config["content_hashed_cache_control"]);
+
+    // The redirect keeps the resume's URL stable and carries the query string over so noIncrement previews still work
+    const contentHashedPath = `${itemId}/${contentHash}.html`;
+    const redirectHtml = [
+        "<!doctype html>",
+        "<html>",
+        "  <head>",
+        '    <meta charset="utf-8" />',
+        `    <meta http-equiv="refresh" content="0; url=${contentHashedPath}" />`,
+        `    <script>window.location.replace("${contentHashedPath}" + window.location.search);</script>`,
+        "  </head>",
+        "</html>",
+        "",
+    ].join("\n");
+    await putS3Object(client, bucket, `${folder}/${itemId}.html`, redirectHtml, "text/html; charset=utf-8", config["redirect_cache_control"]);
+
+    return contentHashedKey;
+}
+
 async function deleteS3ObjectVersion(client, bucket, key, versionId) {
     const input = {};
     if (client === undefined) {
@@ -790,6 +852,58 @@ async function deleteS3ObjectVersion(client, bucket, key, versionId) {
     return item;
 }
 
+async function deleteOtherS3ObjectVersions(client, bucket, prefix, keepKey) {
+    if (client === undefined) {
+        throw new Error("Client is a required parameter");
+    } else if (client.constructor != S3) {
+        throw new Error("Client must be an instance of S3");
+    }
+
+    if (bucket === undefined) {
+        throw new Error("Bucket is a required parameter");
+    } else if (bucket.constructor != String) {
+        throw new Error("Bucket must be a string");
+    }
+
+    if (prefix === undefined) {
+        throw new Error("prefix is a required parameter");
+    } else if (prefix.constructor != String) {
+        throw new Error("prefix must be a string");
+    }
+
+    const objects = [];
+    const input = {
+        Bucket: bucket,
+        Prefix: prefix,
+    };
+    var response;
+    do {
+        response = await client.send(new ListObjectVersionsCommand(input));
+        for (const version of [...(response.Versions || []), ...(response.DeleteMarkers || [])]) {
+            if (version.Key != keepKey) {
+                objects.push({ Key: version.Key, VersionId: version.VersionId });
+            }
+        }
+        input.KeyMarker = response.NextKeyMarker;
+        input.VersionIdMarker = response.NextVersionIdMarker;
+    } while (response.IsTruncated);
+
+    // DeleteObjects accepts at most 1000 keys per request
+    for (let i = 0; i < objects.length; i += 1000) {
+        const deleted = await client.send(
+            new DeleteObjectsCommand({
+                Bucket: bucket,
+                Delete: { Objects: objects.slice(i, i + 1000), Quiet: true },
+            })
+        );
+        if (deleted.Errors !== undefined && deleted.Errors.length > 0) {
+            throw new Error(`Could not delete ${deleted.Errors.length} object versions. ${JSON.stringify(deleted.Errors)}`);
+        }
+    }
+
+    return objects.length;
+}
+
 async function getDatabaseInvalidateCacheField(client, table, partitionKey, sortKey) {
     if (client === undefined) {
         throw new Error("Client is a required parameter");
@@ -53,7 +53,9 @@ from aws_cdk.aws_s3 import (
     BucketPolicy,
     EventType,
     HttpMethods,
+    LifecycleRule,
     NotificationKeyFilter,
+    ObjectOwnership,
 )
 from aws_cdk.aws_s3_notifications import LambdaDestination
 from benedict import benedict
@@ -169,7 +171,18 @@ class create_web_infrastructure:
                 encryption=BucketEncryption(bucket_config.encryption),
                 enforce_ssl=bucket_config.enforce_ssl,
                 versioned=bucket_config.versioned,
+                event_bridge_enabled=(
+                    bucket_config.event_bridge_enabled if bucket_config.event_bridge_enabled else None
+                ),
                 removal_policy=removal_policy,
+                object_ownership=(
+                    getattr(ObjectOwnership, bucket_config.object_ownership) if bucket_config.object_ownership else None
+                ),
+                lifecycle_rules=(
+                    [LifecycleRule(expiration=Duration.days(bucket_config.expiration_days))]
+                    if bucket_config.expiration_days
+                    else None
+                ),
             )
 
             if (
@@ -312,14 +325,14 @@ class create_web_infrastructure:
                 log_bucket=(
                     self.stack.resources.s3.buckets[distribution_config.logging.log_bucket]
                     if "enable_logging" in distribution_config.logging.keys()
-                    and distribution_config.enable_logging is True
+                    and distribution_config.logging.enable_logging is True
                     and distribution_config.logging.log_bucket
                     else None
                 ),
                 log_file_prefix=(
                     distribution_config.logging.log_file_prefix
                     if "enable_logging" in distribution_config.logging.keys()
-                    and distribution_config.enable_logging is True
+                    and distribution_config.logging.enable_logging is True
                     and distribution_config.logging.log_bucket
                     and distribution_config.logging.log_file_prefix
                     else None
@@ -327,7 +340,7 @@ class create_web_infrastructure:
                 log_includes_cookies=(
                     distribution_config.logging.log_includes_cookies
                     if "enable_logging" in distribution_config.logging.keys()
-                    and distribution_config.enable_logging is True
+                    and distribution_config.logging.enable_logging is True
                     and distribution_config.logging.log_bucket
                     and distribution_config.logging.log_includes_cookies
                     else None
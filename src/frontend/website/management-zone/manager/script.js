@@ -14,12 +14,17 @@ const apiBaseUrl = "[BASE_APP_MANAGEMENT_API_URL_PLACEHOLDER]/v1/management-zone
 const apiPaths = {
     getAllResumes: { url: "/manager-backend/list-all-resumes", method: "POST" },
     getResume: { url: "/manager-backend/get-resume", method: "POST" },
+    getResumeStats: { url: "/manager-backend/get-resume-stats", method: "POST" },
     generatePresignedUrl: { url: "/manager-backend/generate-presigned-url", method: "POST" },
     addResume: { url: "/manager-backend/add-resume", method: "PUT" },
     updateResume: { url: "/manager-backend/update-resume", method: "PATCH" },
     deleteResume: { url: "/manager-backend/delete-resume", method: "DELETE" },
     undeleteResume: { url: "/manager-backend/undelete-resume", method: "POST" },
     permanentlyDeleteResume: { url: "/manager-backend/permanently-delete-resume", method: "DELETE" },
+    batchUpdateResumes: { url: "/manager-backend/batch-update-resumes", method: "PATCH" },
+    batchDeleteResumes: { url: "/manager-backend/batch-delete-resumes", method: "DELETE" },
+    batchUndeleteResumes: { url: "/manager-backend/batch-undelete-resumes", method: "POST" },
+    batchPermanentlyDeleteResumes: { url: "/manager-backend/batch-permanently-delete-resumes", method: "DELETE" },
     getDanglingResumes: { url: "/manager-backend/get-dangling-resumes", method: "POST" },
     cleanupDanglingResumes: { url: "/manager-backend/delete-dangling-resumes", method: "DELETE" },
 };
@@ -81,7 +86,7 @@ async function getAllResumes() {
         body = '{"deleted": true}';
     }
 
-    response = await sendWebRequestWithAuth(apiBaseUrl + apiPaths["getAllResumes"]["url"], apiPaths["getAllResumes"]["method"], body);
+    response = await sendConditionalWebRequestWithAuth(apiBaseUrl + apiPaths["getAllResumes"]["url"], apiPaths["getAllResumes"]["method"], body);
 
     if (response == null) {
         return;
@@ -120,7 +125,7 @@ async function getResume() {
     if (!isViewActive) {
         data["deleted"] = true;
     }
-    const response = await sendWebRequestWithAuth(apiBaseUrl + apiPaths["getResume"]["url"], apiPaths["getResume"]["method"], JSON.stringify(data));
+    const response = await sendConditionalWebRequestWithAuth(apiBaseUrl + apiPaths["getResume"]["url"], apiPaths["getResume"]["method"], JSON.stringify(data));
     if (response == null) {
         return;
     }
@@ -497,7 +502,7 @@ async function checkForResumeUrlUpdates(resumeId, oldResumeUrl) {
     for (let i = 0; i < retries; i++) {
         await new Promise((ret) => setTimeout(ret, sleepTime));
         const data = { id: resumeId };
-        const response = await sendWebRequestWithAuth(apiBaseUrl + apiPaths["getResume"]["url"], apiPaths["getResume"]["method"], JSON.stringify(data));
+        const response = await sendConditionalWebRequestWithAuth(apiBaseUrl + apiPaths["getResume"]["url"], apiPaths["getResume"]["method"], JSON.stringify(data));
         console.log(response);
         if (response != null) {
             if (response.status == 200) {
@@ -939,6 +944,34 @@ async function sendWebRequestWithAuth(url, method, body, headers, attempts) {
     return ret;
 }
 
+async function sendConditionalWebRequestWithAuth(url, method, body) {
+    // Responses are kept per request with their ETag, so unchanged resources are answered with a 304 and no body
+    const cacheKey = `conditional-response ${method} ${url} ${body}`;
+    var cached;
+    try {
+        cached = JSON.parse(sessionStorage.getItem(cacheKey));
+    } catch (e) {
+        cached = null;
+    }
+
+    const headers = cached != null ? { "If-None-Match": cached["etag"] } : {};
+    const response = await sendWebRequestWithAuth(url, method, body, headers);
+    if (response == null) {
+        return null;
+    }
+
+    if (response["status"] == 304 && cached != null) {
+        return { status: 200, body: cached["body"], etag: cached["etag"] };
+    } else if (response["status"] == 200 && response["etag"]) {
+        try {
+            sessionStorage.setItem(cacheKey, JSON.stringify({ etag: response["etag"], body: response["body"] }));
+        } catch (e) {
+            console.log(`Unable to store response for ${url}. Error: ${e.name} - ${e.message}`);
+        }
+    }
+    return response;
+}
+
 async function sendWebRequest(url, method, body, headers) {
     const fetchDict = {};
     const validMethods = ["get", "put", "post", "delete", "options", "head", "connect", "trace", "patch"];
@@ -985,7 +1018,9 @@ async function sendWebRequest(url, method, body, headers) {
     }
     const responseContentType = response.headers.get("content-type");
     var retBody;
-    if (responseContentType && responseContentType.includes("application/json")) {
+    if (response.status == 304) {
+        retBody = "";
+    } else if (responseContentType && responseContentType.includes("application/json")) {
         retBody = await response.json();
         if (Object.keys(retBody).includes("message")) {
             retBody = retBody["message"];
@@ -994,7 +1029,7 @@ async function sendWebRequest(url, method, body, headers) {
         retBody = await response.text();
     }
 
-    return { status: response.status, body: retBody };
+    return { status: response.status, body: retBody, etag: response.headers.get("etag") };
 }
 
 function setStatusElementRedirectToLogin(statusTextBefore, statusTextAfter) {
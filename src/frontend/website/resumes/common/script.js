@@ -5,7 +5,9 @@ const apiPath = "/v1/resumes/get-view-count";
 
 async function updateViewCounter() {
     const htmlFile = window.location.pathname.split("/").slice(-1).join("");
-    const resumeId = htmlFile.split(".").slice(0, -1).join(".");
+    // Content hashed resumes are served from a path named after their hash, so they carry their ID in a meta element
+    const resumeIdElement = document.querySelector('meta[name="resume-id"]');
+    const resumeId = resumeIdElement ? resumeIdElement.getAttribute("content") : htmlFile.split(".").slice(0, -1).join(".");
     const urlParams = new URLSearchParams(window.location.search);
 
     const res = await getViewCount(resumeId, urlParams.get("noIncrement") ?? "");
@@ -0,0 +1,56 @@
+import importlib.util
+import pytest
+import re
+import sys
+
+from ast import literal_eval
+from itertools import count
+from pathlib import Path
+from shutil import copytree
+
+source_dir = Path(__file__).parents[2] / "src"
+placeholder_regex = re.compile(r"^\[[A-Z_0-9]*?(?:ARN|PLACEHOLDER|STRING)\]$")
+module_ids = count()
+
+
+@pytest.fixture
+def load_lambda(tmp_path, monkeypatch):
+    """
+    Imports a Lambda function's main.py from a copy of its directory, with its config.json placeholders replaced
+
+    Config values passed as keyword arguments replace the values of config.json, and any other placeholders are
+    replaced with "test-{key}". AWS calls made while importing fail fast, as no credentials or endpoint are available.
+    """
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_EC2_METADATA_DISABLED", "true")
+    monkeypatch.setenv("AWS_MAX_ATTEMPTS", "1")
+    monkeypatch.setenv("AWS_ENDPOINT_URL", "http://127.0.0.1:9")
+
+    def load(function_dir: str, **config):
+        lambda_dir = tmp_path / function_dir.replace("/", "_")
+        copytree(source_dir / function_dir, lambda_dir, ignore=lambda *_: ["__pycache__", "node_modules"])
+        with open(lambda_dir / "config.json", "r") as f:
+            lambda_config = literal_eval(f.read())
+        for key, value in lambda_config.items():
+            if isinstance(value, str) and placeholder_regex.match(value):
+                lambda_config[key] = f"test-{key}"
+        lambda_config.update(config)
+        with open(lambda_dir / "config.json", "w") as f:
+            f.write(repr(lambda_config))
+
+        # Shared code is imported as the common package, which differs between functions
+        for name in [name for name in sys.modules.keys() if name == "common" or name.startswith("common.")]:
+            del sys.modules[name]
+        monkeypatch.chdir(lambda_dir)
+        monkeypatch.syspath_prepend(str(lambda_dir))
+        spec = importlib.util.spec_from_file_location(f"lambda_main_{next(module_ids)}", lambda_dir / "main.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    yield load
+
+    for name in [name for name in sys.modules.keys() if name == "common" or name.startswith("common.")]:
+        del sys.modules[name]
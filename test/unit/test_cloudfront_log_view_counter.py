@@ -0,0 +1,136 @@
+import gzip
+import pytest
+import subprocess
+import sys
+
+from collections import Counter
+from io import BytesIO
+from pathlib import Path
+
+sample_log = Path(__file__).parent / "data" / "E2EXAMPLE.2026-01-01-00.sample"
+expected_view_counts = Counter({"abc12345": 2, "def67890": 2, "gone0000": 1})
+
+
+@pytest.fixture
+def counter(load_lambda, monkeypatch):
+    counter = load_lambda(
+        "backend/webapp/buckets/event_notifications/cloudfront-log-view-counter",
+        dynamodb_resume_views_shards=2,
+        resume_path="/resumes/",
+    )
+    monkeypatch.setattr(counter, "sleep", lambda seconds: None)
+    return counter
+
+
+@pytest.fixture
+def gzipped_log(tmp_path) -> Path:
+    path = tmp_path / "E2EXAMPLE.2026-01-01-00.gz"
+    path.write_bytes(gzip.compress(sample_log.read_bytes()))
+    return path
+
+
+class FakeS3:
+    def __init__(self, objects: dict):
+        self.objects = objects
+        self.gets = 0
+
+    def get_object(self, *, Bucket, Key):
+        self.gets += 1
+        return {"Body": BytesIO(self.objects[Key])}
+
+
+class FailingDynamoDB:
+    """
+    Wraps an InMemoryDynamoDB and cancels every transaction of the resume IDs in failing_ids with a conflict
+    """
+
+    def __init__(self, client, failing_ids: set):
+        self.client = client
+        self.failing_ids = failing_ids
+        self.exceptions = client.exceptions
+
+    def transact_write_items(self, *, TransactItems):
+        if TransactItems[1]["Update"]["Key"]["id"] in self.failing_ids:
+            raise self.exceptions.TransactionCanceledException([{"Code": "TransactionConflict"}] * len(TransactItems))
+        return self.client.transact_write_items(TransactItems=TransactItems)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def get_event(key: str) -> dict:
+    return {"Records": [{"s3": {"bucket": {"name": "logs"}, "object": {"key": key}}}]}
+
+
+def get_view_counts(counter, client) -> dict:
+    resumes = client.tables.get(counter.config["dynamodb_resumes_table"], {})
+    views = client.tables.get(counter.config["dynamodb_resume_views_table"], {})
+    return {
+        "resumes": {key[0]: item["view_count"] for key, item in resumes.items()},
+        "total": sum(item["view_count"] for item in views.values()),
+    }
+
+
+class TestCountResumeViews:
+    def test_sample_log(self, counter, gzipped_log):
+        with open(gzipped_log, "rb") as log_file:
+            view_counts = counter.count_resume_views(counter.parse_log_lines(counter.read_gzip_lines(log_file)))
+
+        assert view_counts == expected_view_counts
+
+
+class TestHandler:
+    @pytest.fixture
+    def s3(self, counter, gzipped_log, monkeypatch):
+        s3 = FakeS3({"cloudfront/E2EXAMPLE.2026-01-01-00.gz": gzipped_log.read_bytes()})
+        monkeypatch.setattr(counter, "s3", s3)
+        return s3
+
+    @pytest.fixture
+    def client(self, counter, monkeypatch):
+        client = counter.InMemoryDynamoDB(existing_ids={"abc12345", "def67890"})
+        monkeypatch.setattr(counter, "dynamodb_client", client)
+        return client
+
+    def test_views_are_counted(self, counter, s3, client):
+        counter.handler(get_event("cloudfront/E2EXAMPLE.2026-01-01-00.gz"), None)
+
+        assert get_view_counts(counter, client) == {"resumes": {"abc12345": 2, "def67890": 2}, "total": 4}
+        markers = client.tables[counter.config["dynamodb_resume_viewers_table"]].keys()
+        assert sorted(markers) == [
+            ("access_log#cloudfront/E2EXAMPLE.2026-01-01-00.gz", "processed"),
+            ("access_log#cloudfront/E2EXAMPLE.2026-01-01-00.gz", "resume#abc12345"),
+            ("access_log#cloudfront/E2EXAMPLE.2026-01-01-00.gz", "resume#def67890"),
+        ]
+
+    def test_redelivered_log_is_skipped(self, counter, s3, client):
+        counter.handler(get_event("cloudfront/E2EXAMPLE.2026-01-01-00.gz"), None)
+        counter.handler(get_event("cloudfront%2FE2EXAMPLE.2026-01-01-00.gz"), None)
+
+        assert get_view_counts(counter, client) == {"resumes": {"abc12345": 2, "def67890": 2}, "total": 4}
+        assert s3.gets == 1
+
+    def test_retry_after_partial_failure_counts_each_resume_once(self, counter, s3, client, monkeypatch):
+        monkeypatch.setattr(counter, "dynamodb_client", FailingDynamoDB(client, failing_ids={"def67890"}))
+        with pytest.raises(RuntimeError):
+            counter.handler(get_event("cloudfront/E2EXAMPLE.2026-01-01-00.gz"), None)
+        assert get_view_counts(counter, client) == {"resumes": {"abc12345": 2}, "total": 2}
+
+        monkeypatch.setattr(counter, "dynamodb_client", client)
+        counter.handler(get_event("cloudfront/E2EXAMPLE.2026-01-01-00.gz"), None)
+
+        assert get_view_counts(counter, client) == {"resumes": {"abc12345": 2, "def67890": 2}, "total": 4}
+
+
+class TestLocalRun:
+    def test_main_counts_local_log_files(self, counter, gzipped_log):
+        result = subprocess.run(
+            [sys.executable, "main.py", str(gzipped_log)],
+            cwd=Path(counter.__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        assert f"{gzipped_log}: {dict(expected_view_counts)}" in result.stdout
+        assert "Resumes: {('abc12345',): {'id': 'abc12345', 'view_count': 2}" in result.stdout
@@ -0,0 +1,103 @@
+import importlib
+import pytest
+import sys
+
+from benedict import benedict
+from json import loads
+from pathlib import Path
+
+root_dir = Path(__file__).parents[2]
+
+
+@pytest.fixture
+def deploy_app(monkeypatch):
+    for var in [
+        "APP_DEPLOY_ACCOUNT",
+        "APP_STACK_PREFIX",
+        "APP_DEV_BLOG_URL",
+        "APP_DNS_ZONE_DOMAIN",
+        "APP_DNS_ZONE_ACCOUNT",
+        "APP_DNS_HOSTED_ZONE_ID",
+        "APP_COGNITO_INITIAL_USERNAME",
+        "APP_COGNITO_INITIAL_USER_GIVEN_NAME",
+        "APP_COGNITO_INITIAL_USER_EMAIL",
+        "APP_COGNITO_INITIAL_USER_PASSWORD",
+        "APP_MONITORING_EMAIL_LIST",
+        "APP_HOMEPAGE_TITLE",
+    ]:
+        monkeypatch.setenv(var, "test")
+    monkeypatch.setenv("APP_DEPLOY_ENV", "PROD")
+    monkeypatch.setenv("APP_COGNITO_LOGIN_NOTIFICATION_EMAIL", "test@example.com")
+    monkeypatch.syspath_prepend(str(root_dir))
+    for name in ["deploy_app", "destroy_app", "vars"]:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    return importlib.import_module("deploy_app")
+
+
+class TestViewCounterShardIds:
+    def test_shard_ids_match_the_configured_shards(self, deploy_app):
+        dynamodb_config = benedict(
+            f"{root_dir}/src/backend/configuration/config/dynamodb.json", format="json", keyattr_dynamic=True
+        )
+        view_count_shards = int(dynamodb_config["resume-views"].view_count_shards)
+
+        shard_ids = deploy_app._get_view_counter_shard_ids()
+
+        assert len(shard_ids) == view_count_shards
+        assert shard_ids[0] == "all_resumes"
+        assert shard_ids[1:] == [f"all_resumes#{shard}" for shard in range(1, view_count_shards)]
+
+    def test_shard_ids_match_the_resume_backend(self, deploy_app, load_lambda):
+        view_count_shards = len(deploy_app._get_view_counter_shard_ids())
+        resume_backend = load_lambda(
+            "backend/api/runtime/resume-backend",
+            dynamodb_table_region="us-east-1",
+            ssm_region="us-east-1",
+            dynamodb_resume_views_shards=view_count_shards,
+            viewer_events_retention_days=30,
+            view_counting_mode="api",
+        )
+
+        assert resume_backend.get_view_count_shard_ids() == deploy_app._get_view_counter_shard_ids()
+
+
+class FakeSSMClient:
+    class exceptions:
+        class ParameterNotFound(Exception):
+            pass
+
+    def __init__(self):
+        self.value = None
+
+    def get_parameter(self, *, Name, WithDecryption):
+        if self.value is None:
+            raise self.exceptions.ParameterNotFound()
+        return {"Parameter": {"Value": self.value}}
+
+    def put_parameter(self, *, Name, Value, Type, Overwrite):
+        self.value = Value
+
+
+class TestNoIncrementTokenKeys:
+    def test_keys_are_only_created_once(self, deploy_app):
+        ssm_client = FakeSSMClient()
+        deploy_app._put_no_increment_token_keys(ssm_client, "keys")
+        value = ssm_client.value
+        deploy_app._put_no_increment_token_keys(ssm_client, "keys")
+
+        assert ssm_client.value == value
+        assert len(loads(value)["keys"]) == 1
+
+    def test_rotation_keeps_the_most_recent_previous_keys(self, deploy_app):
+        ssm_client = FakeSSMClient()
+        deploy_app._put_no_increment_token_keys(ssm_client, "keys")
+        current_key_ids = [loads(ssm_client.value)["current_key_id"]]
+        for _ in range(4):
+            deploy_app._put_no_increment_token_keys(ssm_client, "keys", rotate=True)
+            current_key_ids.append(loads(ssm_client.value)["current_key_id"])
+
+        keys = loads(ssm_client.value)
+        expected_key_ids = current_key_ids[::-1][: deploy_app.no_increment_token_previous_keys + 1]
+        assert deploy_app.no_increment_token_previous_keys >= 2
+        assert keys["current_key_id"] == current_key_ids[-1]
+        assert list(keys["keys"].keys()) == expected_key_ids
@@ -0,0 +1,293 @@
+import operator
+import pytest
+
+from time import time
+from types import SimpleNamespace
+
+comparisons = {"=": operator.eq, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+def matches(condition, item: dict) -> bool:
+    """
+    Evaluates the simple key and filter conditions the invalidator builds against an item
+    """
+    expression = condition.get_expression()
+    if expression["operator"] == "AND":
+        return all(matches(value, item) for value in expression["values"])
+    attribute, value = expression["values"]
+    return attribute.name in item.keys() and comparisons[expression["operator"]](item[attribute.name], value)
+
+
+class FakeTable:
+    def __init__(self, items: list):
+        self.items = {item["id"]: dict(item) for item in items}
+
+    def query(self, *, IndexName, KeyConditionExpression, FilterExpression=None, ExclusiveStartKey=None):
+        items = [item for item in self.items.values() if matches(KeyConditionExpression, item)]
+        if FilterExpression is not None:
+            items = [item for item in items if matches(FilterExpression, item)]
+        return {"Items": [dict(item) for item in items]}
+
+
+class ConditionalCheckFailedException(Exception):
+    pass
+
+
+class FakeDynamoDBClient:
+    """
+    Executes the invalidator's PartiQL updates against a set of resume IDs. Updates of missing resumes fail with
+    ConditionalCheckFailed, as DynamoDB's do, and the resume IDs within failing_ids fail with an InternalServerError.
+    """
+
+    exceptions = SimpleNamespace(ConditionalCheckFailedException=ConditionalCheckFailedException)
+
+    def __init__(self, *, resume_ids: list, failing_ids: list = ()):
+        self.resumes = {resume_id: {"id": resume_id, "invalidate_cache": 1} for resume_id in resume_ids}
+        self.failing_ids = list(failing_ids)
+
+    def batch_execute_statement(self, *, Statements):
+        responses = []
+        for statement in Statements:
+            resume_url, resume_id = statement["Parameters"]
+            if resume_id in self.failing_ids:
+                responses.append({"Error": {"Code": "InternalServerError", "Message": "Internal server error"}})
+            elif resume_id not in self.resumes.keys():
+                responses.append({"Error": {"Code": "ConditionalCheckFailed", "Message": "The condition failed"}})
+            else:
+                self.resumes[resume_id].pop("invalidate_cache", None)
+                self.resumes[resume_id]["resume_url"] = resume_url
+                responses.append({})
+        return {"Responses": responses}
+
+
+class FakeInvalidationsTable(FakeTable):
+    def __init__(self, items: list):
+        super().__init__(items)
+        self.updates = []
+
+    def put_item(self, *, Item):
+        self.items[Item["id"]] = dict(Item)
+
+    def update_item(
+        self,
+        *,
+        Key,
+        UpdateExpression,
+        ExpressionAttributeValues=None,
+        ReturnValues=None,
+        ConditionExpression="",
+        **kwargs,
+    ):
+        self.updates.append({"UpdateExpression": UpdateExpression, **(ExpressionAttributeValues or {})})
+        item = self.items[Key["id"]]
+        if any(
+            f"attribute_not_exists({attribute})" in ConditionExpression and attribute in item.keys()
+            for attribute in ["invalidation_id", "claimed_at", "completed_at"]
+        ):
+            raise ConditionalCheckFailedException()
+        if UpdateExpression == "SET resume_ids = list_append(resume_ids, :resume_ids)":
+            item["resume_ids"] = item["resume_ids"] + ExpressionAttributeValues[":resume_ids"]
+            return {}
+        set_expression, _, remove_expression = UpdateExpression.partition(" REMOVE ")
+        for assignment in set_expression.removeprefix("SET ").split(", "):
+            attribute, _, value = assignment.partition(" = ")
+            item[attribute] = ExpressionAttributeValues[value]
+        for attribute in filter(None, remove_expression.split(", ")):
+            item.pop(attribute, None)
+        return {"Attributes": dict(item)}
+
+
+@pytest.fixture
+def invalidator(load_lambda):
+    return load_lambda("backend/database/dynamodb-cache-invalidator", dynamodb_table_region="us-east-1")
+
+
+@pytest.fixture
+def dynamodb_client(invalidator, monkeypatch):
+    dynamodb_client = FakeDynamoDBClient(resume_ids=["abc", "abd"])
+    monkeypatch.setattr(invalidator, "dynamodb_resource", SimpleNamespace(meta=SimpleNamespace(client=dynamodb_client)))
+    return dynamodb_client
+
+
+class TestBatchUpdateItems:
+    def test_resumes_are_updated(self, invalidator, dynamodb_client):
+        invalidator.batch_update_items(resume_ids=["abc", "abd"])
+
+        assert dynamodb_client.resumes["abc"] == {
+            "id": "abc",
+            "resume_url": f"{invalidator.config['resumes_url_base']}/abc.html",
+        }
+        assert "invalidate_cache" not in dynamodb_client.resumes["abd"].keys()
+
+    def test_deleted_resumes_are_skipped(self, invalidator, dynamodb_client):
+        invalidator.batch_update_items(resume_ids=["abc", "deleted", "abd"])
+
+        assert "invalidate_cache" not in dynamodb_client.resumes["abc"].keys()
+        assert "invalidate_cache" not in dynamodb_client.resumes["abd"].keys()
+        assert "deleted" not in dynamodb_client.resumes.keys()
+
+    def test_other_errors_raise(self, invalidator, dynamodb_client):
+        dynamodb_client.failing_ids = ["abd"]
+
+        with pytest.raises(RuntimeError):
+            invalidator.batch_update_items(resume_ids=["abc", "deleted", "abd"])
+
+
+class TestCheckInvalidation:
+    @pytest.fixture
+    def invalidation(self, invalidator, dynamodb_client, monkeypatch):
+        invalidation = {
+            "id": "record",
+            "paths": ["/resumes/abc.html", "/resumes/abd.html"],
+            "resume_ids": ["abc", "deleted", "abd"],
+            "invalidation_id": "I1",
+            "submitted_at": 1000,
+            "pending": "true",
+        }
+        monkeypatch.setattr(invalidator, "invalidations_table", FakeInvalidationsTable([invalidation]))
+        monkeypatch.setattr(
+            invalidator,
+            "cloudfront_client",
+            SimpleNamespace(get_invalidation=lambda **kwargs: {"Invalidation": {"Status": "Completed"}}),
+        )
+        return invalidation
+
+    def test_completes_with_deleted_resumes(self, invalidator, dynamodb_client, invalidation):
+        assert invalidator.check_invalidation(invalidation) is True
+
+        record = invalidator.invalidations_table.items["record"]
+        assert "completed_at" in record.keys()
+        assert "pending" not in record.keys()
+        assert invalidator.get_pending_invalidations() == []
+        assert record["expires_at"] == record["completed_at"] + invalidator.config["invalidation_ledger_window_seconds"]
+        assert "invalidate_cache" not in dynamodb_client.resumes["abc"].keys()
+
+    def test_release_keeps_the_expiry_of_the_submission(self, invalidator, dynamodb_client, invalidation):
+        dynamodb_client.failing_ids = ["abd"]
+
+        # Each failed poll releases the completion without pushing the record's expiry further out
+        for _ in range(3):
+            assert invalidator.check_invalidation(invalidation) is True
+
+            record = invalidator.invalidations_table.items["record"]
+            assert "completed_at" not in record.keys()
+            assert record["pending"] == "true"
+            assert record["expires_at"] == 1000 + invalidator.config["invalidation_record_ttl_seconds"]
+
+
+class TestOrphanedResumes:
+    @pytest.fixture
+    def tables(self, invalidator, monkeypatch):
+        flagged_at = int(time()) - invalidator.config["invalidation_orphan_grace_seconds"] - 60
+        resumes_table = FakeTable(
+            [
+                {"id": "orphaned", "invalidate_cache": 1, "invalidate_cache_at": flagged_at},
+                {"id": "queued", "invalidate_cache": 1, "invalidate_cache_at": flagged_at},
+                {"id": "recent", "invalidate_cache": 1, "invalidate_cache_at": int(time())},
+                {"id": "updated"},
+            ]
+        )
+        invalidations_table = FakeInvalidationsTable(
+            [
+                {
+                    "id": "record",
+                    "paths": ["/resumes/queued.html"],
+                    "resume_ids": ["queued"],
+                    "queued_at": flagged_at,
+                    "pending": "true",
+                    "distribution_id": invalidator.config["cloudfront_distribution_id"],
+                }
+            ]
+        )
+        monkeypatch.setattr(invalidator, "resumes_table", resumes_table)
+        monkeypatch.setattr(invalidator, "invalidations_table", invalidations_table)
+        return invalidations_table
+
+    def test_uncovered_resumes_are_queued_again(self, invalidator, tables):
+        queued = invalidator.requeue_orphaned_resumes(pending=invalidator.get_pending_invalidations())
+
+        assert [invalidation["resume_ids"] for invalidation in queued] == [["orphaned"]]
+        assert queued[0]["paths"] == ["/resumes/orphaned.html"]
+        assert sorted(invalidation["id"] for invalidation in invalidator.get_pending_invalidations()) == sorted(
+            ["record", queued[0]["id"]]
+        )
+
+    def test_queued_invalidations_do_not_expire(self, invalidator, tables):
+        queued = invalidator.queue_invalidations(changed_at={"abc": int(time())})
+
+        assert "expires_at" not in tables.items[queued[0]["id"]].keys()
+        assert tables.items[queued[0]["id"]]["pending"] == "true"
+
+    def test_ledger_covers_orphaned_resumes(self, invalidator, dynamodb_client, tables):
+        tables.items["record"].update({"paths": ["/resumes/*"], "submitted_at": int(time()), "expires_at": 2**32})
+
+        assert invalidator.requeue_orphaned_resumes(pending=invalidator.get_pending_invalidations()) == []
+        assert tables.items["record"]["resume_ids"] == ["queued", "orphaned"]
+
+    def test_queued_invalidations_take_covered_resumes(self, invalidator, dynamodb_client, tables):
+        tables.items["record"]["paths"] = ["/resumes/*"]
+
+        queued = invalidator.queue_invalidations(
+            changed_at={"queued": int(time()), "abc": int(time())}, pending=invalidator.get_pending_invalidations()
+        )
+
+        assert queued == []
+        assert tables.items["record"]["resume_ids"] == ["queued", "abc"]
+
+    def test_claimed_invalidations_do_not_take_resumes(self, invalidator, dynamodb_client, tables):
+        tables.items["record"].update({"paths": ["/resumes/*"], "claimed_at": int(time())})
+
+        queued = invalidator.queue_invalidations(
+            changed_at={"abc": int(time())}, pending=invalidator.get_pending_invalidations()
+        )
+
+        assert [invalidation["resume_ids"] for invalidation in queued] == [["abc"]]
+        assert tables.items["record"]["resume_ids"] == ["queued"]
+
+    def test_invalidations_claimed_since_listed_do_not_take_resumes(self, invalidator, dynamodb_client, tables):
+        tables.items["record"]["paths"] = ["/resumes/*"]
+        pending = invalidator.get_pending_invalidations()
+        tables.items["record"]["claimed_at"] = int(time())
+
+        queued = invalidator.queue_invalidations(
+            changed_at={"queued": int(time()), "abc": int(time())}, pending=pending
+        )
+
+        # The resume the claimed invalidation already held may have changed after its submission too
+        assert [invalidation["resume_ids"] for invalidation in queued] == [["queued", "abc"]]
+        assert tables.items["record"]["resume_ids"] == ["queued"]
+
+
+class TestContentHashedPaths:
+    @pytest.fixture
+    def content_hashed(self, invalidator, monkeypatch):
+        monkeypatch.setitem(invalidator.config, "publishing_mode", "content_hashed")
+
+    def test_invalidation_mode_paths(self, invalidator):
+        assert invalidator.plan_invalidation_batches(resume_ids=["abc", "abd"]) == [
+            (["/resumes/abc.html", "/resumes/abd.html"], ["abc", "abd"])
+        ]
+
+    def test_paths_cover_the_hashed_html(self, invalidator, content_hashed):
+        paths = invalidator.get_resume_paths("abc")
+
+        assert paths == ["/resumes/abc.html", "/resumes/abc/*"]
+        assert invalidator.get_covering_invalidation(
+            ledger=[{"submitted_at": 2, "paths": ["/resumes/abc.html", "/resumes/abc/*"]}], paths=paths, changed_at=1
+        )
+        # The paths of a resume whose ID starts with another resume's ID do not cover the other resume
+        assert not invalidator.get_covering_invalidation(
+            ledger=[{"submitted_at": 2, "paths": invalidator.get_resume_paths("abcd")}], paths=paths, changed_at=1
+        )
+        assert not invalidator.get_covering_invalidation(
+            ledger=[{"submitted_at": 2, "paths": ["/resumes/abc.html"]}], paths=paths, changed_at=1
+        )
+
+    def test_batches_fit_the_wildcard_paths_limit(self, invalidator, content_hashed):
+        resume_ids = [f"id{resume_num:06d}" for resume_num in range(20)]
+
+        batches = invalidator.plan_invalidation_batches(resume_ids=resume_ids)
+
+        assert [len([path for path in paths if "*" in path]) for paths, _ in batches] == [15, 5]
+        assert [len(paths) for paths, _ in batches] == [30, 10]
+        assert [resume_id for _, chunk in batches for resume_id in chunk] == resume_ids
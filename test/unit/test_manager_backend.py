@@ -0,0 +1,939 @@
+import operator
+import pytest
+
+from boto3.dynamodb.conditions import ConditionExpressionBuilder
+from boto3.dynamodb.types import TypeSerializer
+from datetime import datetime, timedelta
+from itertools import count
+from json import dumps, loads
+from re import findall, match
+from types import SimpleNamespace
+
+comparisons = {
+    "=": operator.eq,
+    "<>": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class FakeVersionedBucket:
+    """
+    Keeps the versions of each key of a versioned S3 bucket, newest last, and serves the list_object_versions paginator
+    and delete_object and delete_objects. Deletes of the keys within failing_keys return an error.
+    """
+
+    def __init__(self, keys: list):
+        self.versions = {}
+        self.version_ids = count()
+        self.failing_keys = []
+        for key in keys:
+            self.add_version(key, is_delete_marker=False)
+
+    def add_version(self, key: str, *, is_delete_marker: bool) -> str:
+        version_id = f"v{next(self.version_ids)}"
+        self.versions.setdefault(key, []).append(
+            {
+                "Key": key,
+                "VersionId": version_id,
+                "LastModified": datetime(2026, 1, 1) + timedelta(seconds=int(version_id[1:])),
+                "is_delete_marker": is_delete_marker,
+            }
+        )
+        return version_id
+
+    def is_deleted(self, key: str) -> bool:
+        return self.versions[key][-1]["is_delete_marker"]
+
+    def get_paginator(self, operation_name: str):
+        return self
+
+    def paginate(self, *, Bucket, Prefix):
+        versions = [
+            version for key, versions in self.versions.items() if key.startswith(Prefix) for version in versions
+        ]
+        yield {
+            "Versions": [dict(version) for version in versions if not version["is_delete_marker"]],
+            "DeleteMarkers": [dict(version) for version in versions if version["is_delete_marker"]],
+        }
+
+    def delete_object(self, *, Bucket, Key, VersionId=None):
+        if Key in self.failing_keys:
+            raise RuntimeError("We encountered an internal error")
+        if VersionId is not None:
+            self.versions[Key] = [version for version in self.versions[Key] if version["VersionId"] != VersionId]
+            return {"VersionId": VersionId}
+        return {"DeleteMarker": True, "VersionId": self.add_version(Key, is_delete_marker=True)}
+
+    def delete_objects(self, *, Bucket, Delete):
+        deleted = []
+        errors = []
+        for delete_object in Delete["Objects"]:
+            key = delete_object["Key"]
+            if key in self.failing_keys:
+                errors.append({**delete_object, "Code": "InternalError", "Message": "We encountered an internal error"})
+            elif "VersionId" in delete_object.keys():
+                self.versions[key] = [
+                    version for version in self.versions[key] if version["VersionId"] != delete_object["VersionId"]
+                ]
+                deleted.append({"Key": key, "VersionId": delete_object["VersionId"]})
+            else:
+                version_id = self.add_version(key, is_delete_marker=True)
+                deleted.append({"Key": key, "DeleteMarker": True, "DeleteMarkerVersionId": version_id})
+        return {"Deleted": deleted, "Errors": errors}
+
+
+class ConditionalCheckFailedException(Exception):
+    def __init__(self, item: dict = None):
+        super().__init__("The conditional request failed")
+        self.response = {"Item": serialize(item)} if item is not None else {}
+
+
+def serialize(item: dict) -> dict:
+    serializer = TypeSerializer()
+    return {key: serializer.serialize(value) for key, value in item.items()}
+
+
+def split_top_level(expression: str, separator: str = ",") -> list:
+    """
+    Splits an expression on the separators that are not within parentheses
+    """
+    parts, depth, part = [], 0, ""
+    for character in expression:
+        depth += {"(": 1, ")": -1}.get(character, 0)
+        if character == separator and depth == 0:
+            parts.append(part.strip())
+            part = ""
+        else:
+            part += character
+    return parts + [part.strip()]
+
+
+def evaluate_condition(expression: str, item: dict, values: dict, names: dict = None) -> bool:
+    """
+    Evaluates the ConditionExpressions the manager backend builds, made of attribute_exists, attribute_not_exists and
+    comparisons joined with AND, OR and parentheses, against an item
+    """
+    tokens = findall(r"\(|\)|<>|<=|>=|[=<>]|[\w:#]+", expression)
+    names = names or {}
+
+    def operand(token):
+        if token.startswith(":"):
+            return values[token]
+        return item.get(names.get(token, token))
+
+    def parse_or(position):
+        result, position = parse_and(position)
+        while position < len(tokens) and tokens[position] == "OR":
+            right, position = parse_and(position + 1)
+            result = result or right
+        return result, position
+
+    def parse_and(position):
+        result, position = parse_factor(position)
+        while position < len(tokens) and tokens[position] == "AND":
+            right, position = parse_factor(position + 1)
+            result = result and right
+        return result, position
+
+    def parse_factor(position):
+        token = tokens[position]
+        if token == "(":
+            result, position = parse_or(position + 1)
+            return result, position + 1
+        if token in ["attribute_exists", "attribute_not_exists"]:
+            exists = names.get(tokens[position + 2], tokens[position + 2]) in item.keys()
+            return exists == (token == "attribute_exists"), position + 4
+        left, operator, right = operand(token), tokens[position + 1], operand(tokens[position + 2])
+        if left is None:
+            return operator == "<>", position + 3
+        return comparisons[operator](left, right), position + 3
+
+    return parse_or(0)[0]
+
+
+def apply_update(expression: str, item: dict, values: dict) -> None:
+    """
+    Applies the SET, REMOVE and ADD clauses of an UpdateExpression, with if_not_exists within SET, to an item
+    """
+    for action, clause in findall(r"(SET|REMOVE|ADD) (.*?)(?= SET | REMOVE | ADD |$)", expression):
+        for part in split_top_level(clause):
+            if action == "REMOVE":
+                item.pop(part, None)
+            elif action == "ADD":
+                attribute, value = part.split(" ")
+                item[attribute] = item.get(attribute, 0) + values[value]
+            else:
+                attribute, _, value = part.partition(" = ")
+                default = match(r"if_not_exists\((\w+), (:\w+)\)", value)
+                if default is not None:
+                    item[attribute] = item.get(default.group(1), values[default.group(2)])
+                else:
+                    item[attribute] = values[value]
+
+
+class FakeResumesTable:
+    """
+    Serves conditional put_item, update_item and get_item calls from in-memory resume items
+    """
+
+    def __init__(self, items: list, *, index_sort_keys: dict = None):
+        self.items = {item["id"]: dict(item) for item in items}
+        self.index_sort_keys = index_sort_keys or {}
+        self.queries = []
+
+    def query(
+        self, *, IndexName, KeyConditionExpression, Limit, ScanIndexForward=True, ExclusiveStartKey=None, **kwargs
+    ):
+        """
+        Queries a resume_state index, whose items are sorted on the index's sort key and then on id
+        """
+        self.queries.append({"IndexName": IndexName, "Limit": Limit, "ExclusiveStartKey": ExclusiveStartKey})
+        built = ConditionExpressionBuilder().build_expression(KeyConditionExpression, is_key_condition=True)
+        sort_key = self.index_sort_keys[IndexName]
+        items = sorted(
+            (
+                item
+                for item in self.items.values()
+                if evaluate_condition(
+                    built.condition_expression,
+                    item,
+                    built.attribute_value_placeholders,
+                    built.attribute_name_placeholders,
+                )
+            ),
+            key=lambda item: (item[sort_key], item["id"]),
+            reverse=not ScanIndexForward,
+        )
+        if ExclusiveStartKey is not None:
+            start_keys = [(item[sort_key], item["id"]) for item in items]
+            items = items[start_keys.index((ExclusiveStartKey[sort_key], ExclusiveStartKey["id"])) + 1 :]
+        response = {"Items": [dict(item) for item in items[:Limit]]}
+        if len(items) > Limit:
+            last_item = items[Limit - 1]
+            response["LastEvaluatedKey"] = {key: last_item[key] for key in set(["id", "resume_state", sort_key])}
+        return response
+
+    def scan(self, *, IndexName, ExclusiveStartKey=None):
+        return {"Items": [{"id": resume_id} for resume_id in self.items.keys()]}
+
+    def put_item(self, *, Item, ConditionExpression=None):
+        if ConditionExpression is not None:
+            built = ConditionExpressionBuilder().build_expression(ConditionExpression)
+            if not evaluate_condition(
+                built.condition_expression,
+                self.items.get(Item["id"], {}),
+                built.attribute_value_placeholders,
+                built.attribute_name_placeholders,
+            ):
+                raise ConditionalCheckFailedException()
+        self.items[Item["id"]] = dict(Item)
+
+    def update_item(
+        self,
+        *,
+        Key,
+        UpdateExpression,
+        ExpressionAttributeValues,
+        ConditionExpression=None,
+        ReturnValues="NONE",
+        ReturnValuesOnConditionCheckFailure="NONE",
+    ):
+        old_item = self.items.get(Key["id"])
+        if ConditionExpression is not None and not evaluate_condition(
+            ConditionExpression, old_item or {}, ExpressionAttributeValues
+        ):
+            raise ConditionalCheckFailedException(
+                old_item if ReturnValuesOnConditionCheckFailure == "ALL_OLD" else None
+            )
+        item = dict(old_item or Key)
+        apply_update(UpdateExpression, item, ExpressionAttributeValues)
+        self.items[Key["id"]] = item
+        if ReturnValues == "ALL_OLD":
+            return {"Attributes": dict(old_item)} if old_item is not None else {}
+        return {"Attributes": dict(item)} if ReturnValues == "ALL_NEW" else {}
+
+    def get_item(self, *, Key, **kwargs):
+        if Key["id"] not in self.items.keys():
+            return {}
+        return {"Item": dict(self.items[Key["id"]])}
+
+
+class TransactionCanceledException(Exception):
+    def __init__(self, reasons: list):
+        super().__init__("Transaction cancelled")
+        self.response = {"CancellationReasons": reasons}
+
+
+class FakeTransactClient:
+    """
+    Applies the Update items of a transaction to a FakeResumesTable, cancelling the whole transaction if any condition
+    fails. The first conflicts transactions are cancelled with a TransactionConflict.
+    """
+
+    exceptions = SimpleNamespace(
+        ConditionalCheckFailedException=ConditionalCheckFailedException,
+        TransactionCanceledException=TransactionCanceledException,
+    )
+
+    def __init__(self, table: FakeResumesTable):
+        self.table = table
+        self.conflicts = 0
+        self.transactions = []
+
+    def transact_write_items(self, *, TransactItems):
+        updates = [transact_item["Update"] for transact_item in TransactItems]
+        self.transactions.append([update["Key"]["id"] for update in updates])
+        if self.conflicts > 0:
+            self.conflicts -= 1
+            raise TransactionCanceledException([{"Code": "TransactionConflict"} for _ in updates])
+
+        reasons = []
+        for update in updates:
+            old_item = self.table.items.get(update["Key"]["id"])
+            if "ConditionExpression" not in update.keys() or evaluate_condition(
+                update["ConditionExpression"], old_item or {}, update["ExpressionAttributeValues"]
+            ):
+                reasons.append({"Code": "None"})
+            elif old_item is not None and update.get("ReturnValuesOnConditionCheckFailure") == "ALL_OLD":
+                reasons.append({"Code": "ConditionalCheckFailed", "Item": serialize(old_item)})
+            else:
+                reasons.append({"Code": "ConditionalCheckFailed"})
+        if any(reason["Code"] != "None" for reason in reasons):
+            raise TransactionCanceledException(reasons)
+
+        for update in updates:
+            item = dict(self.table.items.get(update["Key"]["id"], update["Key"]))
+            apply_update(update["UpdateExpression"], item, update["ExpressionAttributeValues"])
+            self.table.items[item["id"]] = item
+
+
+class FakeDynamoDBResource:
+    """
+    Serves batch_get_item from a FakeResumesTable, and transactions through its client
+    """
+
+    def __init__(self, table: FakeResumesTable):
+        self.table = table
+        self.consistent_reads = []
+        self.meta = SimpleNamespace(client=FakeTransactClient(table))
+
+    def batch_get_item(self, *, RequestItems):
+        ((table_name, request),) = RequestItems.items()
+        self.consistent_reads.append(request.get("ConsistentRead", False))
+        attributes = request["ExpressionAttributeNames"].values()
+        return {
+            "Responses": {
+                table_name: [
+                    {
+                        attribute: value
+                        for attribute, value in self.table.items[key["id"]].items()
+                        if attribute in attributes
+                    }
+                    for key in request["Keys"]
+                    if key["id"] in self.table.items.keys()
+                ]
+            },
+            "UnprocessedKeys": {},
+        }
+
+
+@pytest.fixture
+def manager_backend(load_lambda):
+    return load_lambda(
+        "backend/api/runtime/manager/manager-backend",
+        dynamodb_table_region="us-east-1",
+        ssm_region="us-east-1",
+        s3_region="us-east-1",
+        s3_bucket_webpage_resumes_location="resumes",
+    )
+
+
+class TestContentHashedResumes:
+    @pytest.fixture
+    def bucket(self, manager_backend, monkeypatch):
+        bucket = FakeVersionedBucket(
+            ["resumes/abc.html", "resumes/abc/0123456789abcdef.html", "resumes/abd.html", "resumes/abd/fedcba.html"]
+        )
+        monkeypatch.setattr(manager_backend, "s3", bucket)
+        return bucket
+
+    def test_delete_hides_the_hashed_html_of_the_resume(self, manager_backend, bucket):
+        assert manager_backend.delete_content_hashed_resumes(resume_ids=["abc"]) == 1
+
+        assert bucket.is_deleted("resumes/abc/0123456789abcdef.html")
+        assert not bucket.is_deleted("resumes/abc.html")
+        assert not bucket.is_deleted("resumes/abd/fedcba.html")
+
+    def test_delete_skips_deleted_objects(self, manager_backend, bucket):
+        _ = manager_backend.delete_content_hashed_resumes(resume_ids=["abc"])
+
+        assert manager_backend.delete_content_hashed_resumes(resume_ids=["abc", "abd"]) == 1
+        assert len(bucket.versions["resumes/abc/0123456789abcdef.html"]) == 2
+
+    def test_undelete_restores_the_hashed_html(self, manager_backend, bucket):
+        _ = manager_backend.delete_content_hashed_resumes(resume_ids=["abc", "abd"])
+
+        assert manager_backend.undelete_content_hashed_resumes(resume_ids=["abc", "abd", "missing"]) == 2
+        assert not bucket.is_deleted("resumes/abc/0123456789abcdef.html")
+        assert not bucket.is_deleted("resumes/abd/fedcba.html")
+        assert len(bucket.versions["resumes/abc/0123456789abcdef.html"]) == 1
+
+    def test_resumes_without_hashed_html(self, manager_backend, bucket):
+        assert manager_backend.delete_content_hashed_resumes(resume_ids=["missing"]) == 0
+        assert manager_backend.undelete_content_hashed_resumes(resume_ids=["missing"]) == 0
+
+
+class TestAddResume:
+    @pytest.fixture
+    def table(self, manager_backend, monkeypatch):
+        table = FakeResumesTable([{"id": "taken", "resume_state": "normal", "resume_url": "url"}])
+        monkeypatch.setattr(manager_backend, "resumes_table", table)
+        monkeypatch.setattr(manager_backend, "views_table", FakeResumesTable([]))
+        monkeypatch.setattr(manager_backend, "dynamodb_resource", FakeDynamoDBResource(table))
+        return table
+
+    @staticmethod
+    def add_resume(manager_backend, resume_id: str) -> dict:
+        return manager_backend.add_resume(
+            resume_id=resume_id, company="Company", job_title="Engineer", job_posting="https://example.com/job"
+        )
+
+    def test_new_resume(self, manager_backend, table):
+        response = self.add_resume(manager_backend, "abc")
+
+        assert response["statusCode"] == 200
+        assert response["attributes"]["resume_url"] == "RESUME_PARSE_PENDING"
+        assert response["attributes"]["version"] == 0
+        assert table.items["abc"]["resume_state"] == "normal"
+
+    def test_reservation_keeps_the_converted_resume_url(self, manager_backend, table):
+        table.items["abc"] = {
+            "id": "abc",
+            "resume_state": "pending",
+            "expires_at": 2**32,
+            "resume_url": "https://example.com/resumes/abc.html",
+        }
+
+        response = self.add_resume(manager_backend, "abc")
+
+        assert response["statusCode"] == 200
+        assert response["attributes"]["resume_url"] == "https://example.com/resumes/abc.html"
+        assert "expires_at" not in table.items["abc"].keys()
+        assert table.items["abc"]["company"] == "Company"
+
+    def test_existing_resume(self, manager_backend, table):
+        assert self.add_resume(manager_backend, "taken") == {"statusCode": 409}
+        assert table.items["taken"] == {"id": "taken", "resume_state": "normal", "resume_url": "url"}
+
+
+class TestReserveResumeId:
+    @pytest.fixture
+    def table(self, manager_backend, monkeypatch):
+        now = int(datetime.now().timestamp())
+        table = FakeResumesTable(
+            [
+                {"id": "taken", "resume_state": "normal"},
+                {"id": "reserved", "resume_state": "pending", "expires_at": now + 60},
+                {"id": "expired", "resume_state": "pending", "expires_at": now - 60},
+            ]
+        )
+        monkeypatch.setattr(manager_backend, "resumes_table", table)
+        monkeypatch.setattr(manager_backend, "dynamodb_resource", FakeDynamoDBResource(table))
+        return table
+
+    @pytest.fixture
+    def random_ids(self, manager_backend, monkeypatch):
+        random_ids = []
+        monkeypatch.setattr(manager_backend, "generate_random_string", lambda length: random_ids.pop(0))
+        return random_ids
+
+    def test_collisions_are_retried(self, manager_backend, table, random_ids):
+        random_ids.extend(["taken", "reserved", "abc"])
+
+        assert manager_backend.reserve_resume_id() == "abc"
+        assert table.items["abc"]["resume_state"] == "pending"
+        assert random_ids == []
+
+    def test_expired_reservation_is_reserved_again(self, manager_backend, table, random_ids):
+        random_ids.append("expired")
+
+        assert manager_backend.reserve_resume_id() == "expired"
+        assert table.items["expired"]["expires_at"] > datetime.now().timestamp()
+
+    def test_attempts_are_limited(self, manager_backend, table, random_ids, monkeypatch):
+        monkeypatch.setitem(manager_backend.config, "resume_id_reservation_max_attempts", 2)
+        random_ids.extend(["taken", "reserved", "abc"])
+
+        with pytest.raises(RuntimeError):
+            manager_backend.reserve_resume_id()
+        assert "abc" not in table.items.keys()
+
+
+class TestListResumesPage:
+    @pytest.fixture
+    def table(self, manager_backend, monkeypatch):
+        table = FakeResumesTable(
+            [
+                {"id": "abc", "resume_state": "normal", "date_created": "2026-01-03 - 10:00", "view_count": 3},
+                {"id": "abd", "resume_state": "normal", "date_created": "2026-01-01 - 10:00", "view_count": 1},
+                {"id": "abe", "resume_state": "normal", "date_created": "2026-01-02 - 10:00", "view_count": 2},
+                {"id": "abf", "resume_state": "deleted", "date_created": "2026-01-04 - 10:00", "view_count": 4},
+            ],
+            index_sort_keys={
+                manager_backend.config["dynamodb_status_index"]: "id",
+                manager_backend.config["dynamodb_status_date_created_index"]: "date_created",
+            },
+        )
+        monkeypatch.setattr(manager_backend, "resumes_table", table)
+        return table
+
+    @staticmethod
+    def list_all(manager_backend, **kwargs) -> list:
+        pages = [manager_backend.list_resumes_page(page_size=2, **kwargs)]
+        while pages[-1]["cursor"]:
+            pages.append(manager_backend.list_resumes_page(page_size=2, cursor=pages[-1]["cursor"], **kwargs))
+        return [[item["id"] for item in page["items"]] for page in pages]
+
+    def test_cursor_round_trip(self, manager_backend, table):
+        assert self.list_all(manager_backend) == [["abc", "abd"], ["abe"]]
+        assert self.list_all(manager_backend, sort_by="date_created", descending=True) == [["abc", "abe"], ["abd"]]
+        assert self.list_all(manager_backend, deleted=True) == [["abf"]]
+
+    def test_cursor_of_another_state_is_rejected(self, manager_backend, table):
+        cursor = manager_backend.list_resumes_page(page_size=2)["cursor"]
+
+        with pytest.raises(ValueError):
+            manager_backend.list_resumes_page(page_size=2, cursor=cursor, deleted=True)
+
+    def test_cursor_of_another_sort_index_is_rejected(self, manager_backend, table):
+        id_cursor = manager_backend.list_resumes_page(page_size=2)["cursor"]
+        date_created_cursor = manager_backend.list_resumes_page(page_size=2, sort_by="date_created")["cursor"]
+
+        with pytest.raises(ValueError):
+            manager_backend.list_resumes_page(page_size=2, cursor=id_cursor, sort_by="date_created")
+        with pytest.raises(ValueError):
+            manager_backend.list_resumes_page(page_size=2, cursor=date_created_cursor)
+        assert table.queries[-1]["ExclusiveStartKey"] is None
+
+    def test_malformed_cursor_is_rejected(self, manager_backend, table):
+        with pytest.raises(ValueError):
+            manager_backend.list_resumes_page(page_size=2, cursor="not a cursor")
+
+    def test_page_size_is_clamped(self, manager_backend, table):
+        _ = manager_backend.list_resumes_page(page_size="0")
+        _ = manager_backend.list_resumes_page(page_size=10**6)
+
+        assert [query["Limit"] for query in table.queries] == [
+            1,
+            int(manager_backend.config["list_resumes_max_page_size"]),
+        ]
+
+
+class TestParseInteger:
+    def test_integers_and_strings_of_digits(self, manager_backend):
+        assert manager_backend.parse_integer(5, name="page_size") == 5
+        assert manager_backend.parse_integer("5", name="page_size") == 5
+
+    @pytest.mark.parametrize("value", [True, False, "five", "5.0", 5.0, None])
+    def test_other_values_are_rejected(self, manager_backend, value):
+        with pytest.raises(ValueError, match="page_size must be an integer"):
+            manager_backend.parse_integer(value, name="page_size")
+
+
+class TestResumesListETag:
+    @pytest.fixture
+    def views_table(self, manager_backend, monkeypatch):
+        monkeypatch.setattr(manager_backend, "load_table_and_s3", lambda: None)
+        # Keeps both requests within the same ETag window
+        monkeypatch.setattr(manager_backend, "time", lambda: 1000.0)
+        monkeypatch.setattr(
+            manager_backend,
+            "resumes_table",
+            FakeResumesTable(
+                [{"id": "abc", "resume_state": "normal"}],
+                index_sort_keys={manager_backend.config["dynamodb_status_index"]: "id"},
+            ),
+        )
+        views_table = FakeResumesTable([])
+        monkeypatch.setattr(manager_backend, "views_table", views_table)
+        return views_table
+
+    @staticmethod
+    def list_resumes(manager_backend, etag: str = None) -> dict:
+        return manager_backend.handler(
+            {
+                "resource": "/list-all-resumes",
+                "body": dumps({"page_size": 10}),
+                "headers": {"If-None-Match": etag} if etag else {},
+            },
+            None,
+        )
+
+    def test_unchanged_listing_is_not_modified(self, manager_backend, views_table):
+        response = self.list_resumes(manager_backend)
+        assert response["statusCode"] == 200
+        assert [item["id"] for item in loads(response["body"])["items"]] == ["abc"]
+
+        not_modified = self.list_resumes(manager_backend, response["headers"]["ETag"])
+
+        assert not_modified["statusCode"] == 304
+        assert not_modified["body"] == ""
+        assert not_modified["headers"]["ETag"] == response["headers"]["ETag"]
+
+    def test_change_sequence_bump_changes_the_etag(self, manager_backend, views_table):
+        etag = self.list_resumes(manager_backend)["headers"]["ETag"]
+
+        manager_backend.bump_resume_change_sequence()
+        response = self.list_resumes(manager_backend, etag)
+
+        assert response["statusCode"] == 200
+        assert response["headers"]["ETag"] != etag
+
+
+class TestBatchResumes:
+    @pytest.fixture
+    def table(self, manager_backend, monkeypatch):
+        table = FakeResumesTable(
+            [
+                {"id": "abc", "resume_state": "normal", "company": "Company", "view_count": 1, "version": 1},
+                {"id": "abd", "resume_state": "normal", "company": "Company", "view_count": 2},
+                {"id": "abe", "resume_state": "deleted", "company": "Company", "delete_marker_id": "v3", "version": 3},
+                {"id": "abf", "resume_state": "pending", "expires_at": 2**32},
+            ]
+        )
+        monkeypatch.setattr(manager_backend, "resumes_table", table)
+        monkeypatch.setattr(manager_backend, "views_table", FakeResumesTable([]))
+        monkeypatch.setattr(manager_backend, "dynamodb_resource", FakeDynamoDBResource(table))
+        monkeypatch.setattr(manager_backend, "sleep", lambda seconds: None)
+        return table
+
+    @pytest.fixture
+    def bucket(self, manager_backend, table, monkeypatch):
+        bucket = FakeVersionedBucket(["resumes/abc.html", "resumes/abd.html", "resumes/abe.html"])
+        table.items["abe"]["delete_marker_id"] = bucket.add_version("resumes/abe.html", is_delete_marker=True)
+        monkeypatch.setattr(manager_backend, "s3", bucket)
+        return bucket
+
+    @staticmethod
+    def get_status_codes(results: dict) -> dict:
+        return {resume_id: result["statusCode"] for resume_id, result in results.items()}
+
+    def test_cancelled_transaction_maps_each_id(self, manager_backend, table):
+        updates = [
+            {
+                "id": resume_id,
+                "update": {
+                    "UpdateExpression": "SET company = :company ADD version :increment",
+                    "ConditionExpression": "resume_state = :resume_state"
+                    + manager_backend.get_version_condition(version=version)[0],
+                    "ExpressionAttributeValues": {
+                        ":company": "New company",
+                        ":increment": 1,
+                        ":resume_state": "normal",
+                        **manager_backend.get_version_condition(version=version)[1],
+                    },
+                },
+                "resume_states": ["normal"],
+            }
+            for resume_id, version in (("abc", 2), ("abd", 0), ("abe", None), ("missing", None))
+        ]
+
+        assert manager_backend.transact_update_items(updates=updates) == {
+            "abc": 409,
+            "abd": 200,
+            "abe": 404,
+            "missing": 404,
+        }
+        # Only the update whose condition did not fail is resubmitted
+        assert manager_backend.dynamodb_resource.meta.client.transactions == [
+            ["abc", "abd", "abe", "missing"],
+            ["abd"],
+        ]
+        assert table.items["abd"]["company"] == "New company"
+        assert table.items["abc"]["company"] == "Company"
+
+    def test_conflicts_are_retried(self, manager_backend, table):
+        client = manager_backend.dynamodb_resource.meta.client
+        client.conflicts = 2
+
+        assert (
+            manager_backend.batch_update_resumes(resumes=[{"id": "abc", "company": "New company"}])["abc"]["statusCode"]
+            == 200
+        )
+        assert len(client.transactions) == 3
+
+        client.conflicts = int(manager_backend.config["dynamodb_transact_write_max_retries"]) + 1
+        assert (
+            manager_backend.batch_update_resumes(resumes=[{"id": "abc", "company": "Newer company"}])["abc"][
+                "statusCode"
+            ]
+            == 500
+        )
+        assert table.items["abc"]["company"] == "New company"
+
+    def test_batch_update_returns_the_updated_attributes(self, manager_backend, table):
+        results = manager_backend.batch_update_resumes(
+            resumes=[
+                {"id": "abc", "company": "New company", "version": 1},
+                {"id": "abd", "job_title": "Engineer", "version": 1},
+                {"id": "abf", "company": "New company"},
+                {"id": "missing", "company": "New company"},
+                {"id": "abe"},
+            ]
+        )
+
+        assert self.get_status_codes(results) == {"abe": 400, "abc": 200, "abd": 409, "abf": 404, "missing": 404}
+        assert results["abc"]["attributes"]["company"] == "New company"
+        assert results["abc"]["attributes"]["version"] == 2
+        assert manager_backend.dynamodb_resource.consistent_reads == [True]
+
+    def test_delete_markers_are_removed_when_the_update_fails(self, manager_backend, table, bucket, monkeypatch):
+        create_s3_delete_markers = manager_backend.create_s3_delete_markers
+
+        def create_s3_delete_markers_and_delete_abd(*, bucket: str, keys: list) -> dict:
+            # abd is deleted by another request after it was read
+            delete_markers = create_s3_delete_markers(bucket=bucket, keys=keys)
+            table.items["abd"]["resume_state"] = "deleted"
+            return delete_markers
+
+        monkeypatch.setattr(manager_backend, "create_s3_delete_markers", create_s3_delete_markers_and_delete_abd)
+
+        results = manager_backend.batch_delete_resumes(resume_ids=["abc", "abd", "abe"], versions={"abc": 1})
+
+        assert self.get_status_codes(results) == {"abc": 200, "abd": 404, "abe": 404}
+        assert results["abc"]["attributes"]["version"] == 2
+        assert bucket.is_deleted("resumes/abc.html")
+        assert not bucket.is_deleted("resumes/abd.html")
+        assert len(bucket.versions["resumes/abd.html"]) == 1
+        assert table.items["abc"]["delete_marker_id"] == bucket.versions["resumes/abc.html"][-1]["VersionId"]
+
+    def test_delete_version_mismatch_creates_no_delete_marker(self, manager_backend, table, bucket):
+        results = manager_backend.batch_delete_resumes(resume_ids=["abc", "abd"], versions={"abc": 2, "abd": 0})
+
+        assert self.get_status_codes(results) == {"abc": 409, "abd": 200}
+        assert not bucket.is_deleted("resumes/abc.html")
+        assert table.items["abd"]["version"] == 1
+
+    def test_undelete_is_reverted_when_the_delete_marker_cannot_be_removed(self, manager_backend, table, bucket):
+        delete_marker_id = bucket.add_version("resumes/abc.html", is_delete_marker=True)
+        table.items["abc"].update({"resume_state": "deleted", "delete_marker_id": delete_marker_id})
+        bucket.failing_keys = ["resumes/abe.html"]
+
+        results = manager_backend.batch_undelete_resumes(resume_ids=["abc", "abd", "abe"])
+
+        assert self.get_status_codes(results) == {"abc": 200, "abd": 404, "abe": 500}
+        assert not bucket.is_deleted("resumes/abc.html")
+        assert table.items["abc"]["resume_state"] == "normal"
+        assert "delete_marker_id" not in table.items["abc"].keys()
+        assert bucket.is_deleted("resumes/abe.html")
+        assert table.items["abe"]["resume_state"] == "deleted"
+        assert table.items["abe"]["delete_marker_id"] == bucket.versions["resumes/abe.html"][-1]["VersionId"]
+
+    def test_permanently_delete(self, manager_backend, table, bucket, monkeypatch):
+        deleted_ids = []
+        monkeypatch.setattr(
+            manager_backend, "batch_delete_items_from_table", lambda *, resume_ids: deleted_ids.extend(resume_ids)
+        )
+
+        results = manager_backend.batch_permanently_delete_resumes(resume_ids=["abe", "missing"])
+
+        assert self.get_status_codes(results) == {"abe": 200, "missing": 404}
+        assert bucket.versions["resumes/abe.html"] == []
+        assert deleted_ids == ["abe"]
+
+
+class TestSingleResumeWrites:
+    @pytest.fixture
+    def table(self, manager_backend, monkeypatch):
+        attributes = {
+            "company": "Company",
+            "job_title": "Job title",
+            "job_posting": "https://example.com/job",
+            "date_created": "2026-01-01 - 10:00",
+            "view_count": 1,
+        }
+        table = FakeResumesTable(
+            [
+                {"id": "abc", "resume_state": "normal", "resume_url": "url", "version": 1, **attributes},
+                {"id": "abd", "resume_state": "normal", "resume_url": "url", **attributes},
+                {"id": "abf", "resume_state": "pending", "expires_at": 2**32},
+            ]
+        )
+        monkeypatch.setattr(manager_backend, "resumes_table", table)
+        monkeypatch.setattr(manager_backend, "views_table", FakeResumesTable([]))
+        monkeypatch.setattr(manager_backend, "dynamodb_resource", FakeDynamoDBResource(table))
+        return table
+
+    @pytest.fixture
+    def bucket(self, manager_backend, monkeypatch):
+        bucket = FakeVersionedBucket(["resumes/abc.html", "resumes/abd.html"])
+        monkeypatch.setattr(manager_backend, "s3", bucket)
+        return bucket
+
+    def test_update_status_codes(self, manager_backend, table):
+        def update_resume(resume_id: str, version: int = None) -> int:
+            return manager_backend.update_resume(resume_id=resume_id, company="New company", version=version)[
+                "statusCode"
+            ]
+
+        assert update_resume("abc", version=2) == 409
+        assert update_resume("abf") == 404
+        assert update_resume("missing", version=1) == 404
+        assert update_resume("abc", version=1) == 200
+        assert table.items["abc"]["version"] == 2
+
+    def test_version_zero_matches_items_without_a_version(self, manager_backend, table):
+        response = manager_backend.update_resume(resume_id="abd", job_title="Engineer", version=0)
+
+        assert response["statusCode"] == 200
+        assert response["attributes"]["version"] == 1
+        assert manager_backend.update_resume(resume_id="abd", job_title="Engineer", version=0)["statusCode"] == 409
+
+    def test_condition_failure_status_code(self, manager_backend):
+        def get_status_code(item: dict, resume_states: list) -> int:
+            return manager_backend.get_condition_failure_status_code(
+                ConditionalCheckFailedException(item), resume_states=resume_states
+            )
+
+        assert get_status_code({"id": "abc", "resume_state": "normal", "version": 2}, ["normal"]) == 409
+        assert get_status_code({"id": "abc", "resume_state": "deleted"}, ["normal"]) == 404
+        assert get_status_code(None, ["normal"]) == 404
+        assert (
+            manager_backend.get_condition_failure_status_code(
+                {"Code": "ConditionalCheckFailed", "Item": serialize({"resume_state": "deleted"})},
+                resume_states=["deleted"],
+            )
+            == 409
+        )
+
+    def test_failed_delete_removes_its_delete_marker(self, manager_backend, table, bucket):
+        assert manager_backend.delete_resume(resume_id="abc", version=2)["statusCode"] == 409
+        assert manager_backend.delete_resume(resume_id="missing")["statusCode"] == 404
+
+        assert len(bucket.versions["resumes/abc.html"]) == 1
+        assert not bucket.is_deleted("resumes/abc.html")
+        assert bucket.versions["resumes/missing.html"] == []
+        assert table.items["abc"]["resume_state"] == "normal"
+
+    def test_delete_and_undelete(self, manager_backend, table, bucket):
+        response = manager_backend.delete_resume(resume_id="abc", version=1)
+        assert response["statusCode"] == 200
+        assert response["attributes"]["version"] == 2
+        assert bucket.is_deleted("resumes/abc.html")
+        assert table.items["abc"]["invalidate_cache"] == 1
+
+        assert manager_backend.undelete_resume(resume_id="abc", version=1)["statusCode"] == 409
+        response = manager_backend.undelete_resume(resume_id="abc", version=2)
+        assert response["statusCode"] == 200
+        assert response["attributes"]["version"] == 3
+        assert not bucket.is_deleted("resumes/abc.html")
+        assert "delete_marker_id" not in table.items["abc"].keys()
+        assert manager_backend.undelete_resume(resume_id="abc")["statusCode"] == 404
+
+    def test_hashed_html_is_only_hidden_in_content_hashed_mode(self, manager_backend, table, bucket, monkeypatch):
+        _ = bucket.add_version("resumes/abc/0123456789abcdef.html", is_delete_marker=False)
+
+        assert manager_backend.delete_resume(resume_id="abc")["statusCode"] == 200
+        assert not bucket.is_deleted("resumes/abc/0123456789abcdef.html")
+        assert manager_backend.undelete_resume(resume_id="abc")["statusCode"] == 200
+
+        monkeypatch.setitem(manager_backend.config, "publishing_mode", "content_hashed")
+        assert manager_backend.delete_resume(resume_id="abc")["statusCode"] == 200
+        assert bucket.is_deleted("resumes/abc/0123456789abcdef.html")
+        assert manager_backend.undelete_resume(resume_id="abc")["statusCode"] == 200
+        assert not bucket.is_deleted("resumes/abc/0123456789abcdef.html")
+
+    def test_undelete_is_reverted_when_the_delete_marker_cannot_be_removed(self, manager_backend, table, bucket):
+        _ = manager_backend.delete_resume(resume_id="abc")
+        delete_marker_id = table.items["abc"]["delete_marker_id"]
+        bucket.failing_keys = ["resumes/abc.html"]
+
+        with pytest.raises(RuntimeError):
+            manager_backend.undelete_resume(resume_id="abc")
+
+        assert table.items["abc"]["resume_state"] == "deleted"
+        assert table.items["abc"]["delete_marker_id"] == delete_marker_id
+        assert table.items["abc"]["version"] == 4
+        assert bucket.is_deleted("resumes/abc.html")
+
+
+class TestDanglingResumes:
+    @pytest.fixture
+    def table(self, manager_backend, monkeypatch):
+        attributes = {
+            "company": "Company",
+            "job_title": "Job title",
+            "job_posting": "https://example.com/job",
+            "resume_url": "url",
+            "date_created": "2026-01-01 - 10:00",
+            "view_count": 1,
+            "resume_state": "normal",
+        }
+        table = FakeResumesTable(
+            [
+                {"id": "abc", **attributes},
+                {"id": "abd", **attributes},
+                {"id": "abe", **attributes},
+                {"id": "abf", "resume_state": "pending", "expires_at": 2**32},
+                {"id": "abg", **attributes},
+            ]
+        )
+        table.items["abe"].pop("company")
+        monkeypatch.setattr(manager_backend, "resumes_table", table)
+        monkeypatch.setattr(manager_backend, "dynamodb_resource", FakeDynamoDBResource(table))
+        return table
+
+    @pytest.fixture
+    def bucket(self, manager_backend, monkeypatch):
+        bucket = FakeVersionedBucket(
+            ["resumes/abc.html", "resumes/abd.html", "resumes/abe.html", "resumes/orphan.html"]
+        )
+        for _ in range(2):
+            bucket.add_version("resumes/abd.html", is_delete_marker=True)
+            bucket.add_version("resumes/abf.html", is_delete_marker=True)
+        monkeypatch.setattr(manager_backend, "s3", bucket)
+        monkeypatch.setitem(manager_backend.config, "s3_bucket_documents_upload_location", "documents")
+        monkeypatch.setitem(manager_backend.config, "s3_bucket_documents_parsed_location", "parsed-documents")
+        return bucket
+
+    @staticmethod
+    def get_dangling_keys(dangling_resumes: dict) -> dict:
+        return {
+            "items": sorted(dangling_resumes["items"]),
+            "html_objects": sorted(
+                (version["Key"], version["is_delete_marker"]) for version in dangling_resumes["html_objects"]
+            ),
+        }
+
+    def test_full_scan(self, manager_backend, table, bucket, monkeypatch):
+        def list_all_s3_object_versions(**kwargs):
+            raise AssertionError("The html objects are streamed rather than listed at once")
+
+        monkeypatch.setattr(manager_backend, "list_all_s3_object_versions", list_all_s3_object_versions)
+
+        assert self.get_dangling_keys(manager_backend.get_dangling_resumes()) == {
+            "items": ["abd", "abe", "abg"],
+            "html_objects": [
+                ("resumes/abd.html", False),
+                ("resumes/abd.html", True),
+                ("resumes/abd.html", True),
+                ("resumes/abe.html", False),
+                ("resumes/orphan.html", False),
+            ],
+        }
+
+    def test_inconsistent_resumes(self, manager_backend, table, bucket, monkeypatch):
+        monkeypatch.setattr(manager_backend, "get_inconsistent_resume_ids", lambda: ("abc", "abd", "abe", "abf"))
+
+        assert self.get_dangling_keys(manager_backend.get_dangling_resumes(full_scan=False)) == {
+            "items": ["abd", "abe"],
+            "html_objects": [
+                ("resumes/abd.html", False),
+                ("resumes/abd.html", True),
+                ("resumes/abd.html", True),
+                ("resumes/abe.html", False),
+            ],
+        }
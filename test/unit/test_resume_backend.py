@@ -0,0 +1,415 @@
+import hmac
+import pytest
+
+from base64 import urlsafe_b64encode
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from json import dumps, loads
+from types import SimpleNamespace
+
+
+@pytest.fixture
+def resume_backend(load_lambda):
+    return load_lambda(
+        "backend/api/runtime/resume-backend",
+        dynamodb_table_region="us-east-1",
+        ssm_region="us-east-1",
+        dynamodb_resume_views_shards=1,
+        viewer_events_retention_days=30,
+        view_counting_mode="api",
+    )
+
+
+class TestViewerEventQueue:
+    def test_flush_writes_batches(self, resume_backend):
+        writer = resume_backend.InMemoryViewerEventWriter()
+        queue = resume_backend.ViewerEventQueue(writer=writer, batch_size=2)
+        for i in range(5):
+            queue.put({"event": str(i)})
+
+        assert queue.flush() == 5
+        assert [len(batch) for batch in writer.batches] == [2, 2, 1]
+        assert [item["event"] for item in writer.items] == [str(i) for i in range(5)]
+        assert len(queue) == 0
+
+    def test_unprocessed_items_are_retried(self, resume_backend):
+        writer = resume_backend.InMemoryViewerEventWriter(unprocessed_batches=2)
+        queue = resume_backend.ViewerEventQueue(writer=writer, batch_size=25)
+        for i in range(3):
+            queue.put({"event": str(i)})
+
+        assert queue.flush() == 3
+        assert len(writer.batches) == 3
+        assert sorted(item["event"] for item in writer.items) == ["0", "1", "2"]
+
+    def test_items_that_cannot_be_written_are_not_kept(self, resume_backend):
+        writer = resume_backend.InMemoryViewerEventWriter(unprocessed_batches=10)
+        queue = resume_backend.ViewerEventQueue(writer=writer, batch_size=25, max_retries=1)
+        queue.put({"event": "0"})
+        queue.put({"event": "1"})
+
+        assert queue.flush() == 1
+        assert len(queue) == 0
+
+    def test_wait_collects_writes_started_by_put(self, resume_backend):
+        writer = resume_backend.InMemoryViewerEventWriter()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            queue = resume_backend.ViewerEventQueue(writer=writer, batch_size=25, executor=executor)
+            for i in range(3):
+                queue.put({"event": str(i)})
+
+            assert queue.wait() == 3
+        assert sorted(item["event"] for item in writer.items) == ["0", "1", "2"]
+        assert len(queue) == 0
+
+
+class TestHandler:
+    @pytest.fixture
+    def writer(self, resume_backend, monkeypatch):
+        writer = resume_backend.InMemoryViewerEventWriter()
+        monkeypatch.setattr(
+            resume_backend,
+            "viewer_events",
+            resume_backend.ViewerEventQueue(writer=writer, executor=resume_backend.executor),
+        )
+        monkeypatch.setattr(resume_backend, "error_loading_tables", False)
+        monkeypatch.setattr(resume_backend, "viewer_dedup_window", 0)
+        monkeypatch.setattr(resume_backend.resume_cache, "check_version", lambda: None)
+        monkeypatch.setattr(resume_backend, "increase_resume_view_count", lambda *, resume_id: resume_id == "abc")
+        monkeypatch.setattr(resume_backend, "increase_total_view_count", lambda: 42)
+        return writer
+
+    @staticmethod
+    def get_event(resume_id: str) -> dict:
+        return {"body": dumps({"id": resume_id}), "headers": {"X-Forwarded-For": "192.0.2.1"}}
+
+    def test_view_event_is_written_before_returning(self, resume_backend, writer):
+        response = resume_backend.handler(self.get_event("abc"), None)
+
+        assert response["statusCode"] == "200"
+        assert loads(response["body"]) == {"views": "42"}
+        assert [item["resume_id"] for item in writer.items] == ["abc"]
+        assert writer.items[0]["bucket"].startswith(resume_backend.viewers_table_views_bucket_prefix)
+        assert len(resume_backend.viewer_events) == 0
+
+    def test_missing_resume_writes_no_event(self, resume_backend, writer):
+        response = resume_backend.handler(self.get_event("missing"), None)
+
+        assert response["statusCode"] == "404"
+        assert writer.items == []
+
+
+class TestNoIncrementToken:
+    @pytest.fixture
+    def keys(self, resume_backend, monkeypatch):
+        monkeypatch.setattr(resume_backend, "no_increment_token_keys", {"key1": "secret"})
+        monkeypatch.setattr(resume_backend, "no_increment_token_keys_loaded_at", resume_backend.monotonic())
+
+    @staticmethod
+    def sign(resume_id: str) -> str:
+        signature = hmac.new(b"secret", bytes(resume_id, "UTF-8"), sha256).digest()
+        return f"key1.{urlsafe_b64encode(signature).decode('UTF-8').rstrip('=')}"
+
+    def test_valid_token(self, resume_backend, keys):
+        assert resume_backend.check_if_no_increment_token_is_valid("abc", self.sign("abc")) is True
+
+    def test_token_of_another_resume(self, resume_backend, keys):
+        assert resume_backend.check_if_no_increment_token_is_valid("abc", self.sign("abd")) is False
+
+    def test_non_ascii_token_is_rejected(self, resume_backend, keys):
+        assert resume_backend.check_if_no_increment_token_is_valid("abc", "key1.\u00dfignature") is False
+
+    def test_unsigned_token(self, resume_backend, keys):
+        assert resume_backend.check_if_no_increment_token_is_valid("abc", "random") is None
+
+    def test_valid_token_of_missing_resume(self, resume_backend, keys, monkeypatch):
+        monkeypatch.setattr(resume_backend.resume_cache, "check_version", lambda: None)
+        monkeypatch.setattr(
+            resume_backend, "check_if_resume_exists", lambda resume_id, *, cached=None: resume_id == "abc"
+        )
+        monkeypatch.setattr(resume_backend, "get_cached_view_count", lambda: 42)
+        previews = []
+        monkeypatch.setattr(
+            resume_backend,
+            "add_item_to_viewers_table",
+            lambda *, clientIp, resume_id, preview=False: previews.append((resume_id, preview)),
+        )
+
+        assert resume_backend.record_view(resume_id="abc", no_increment_id=self.sign("abc"), client_ip="") == 42
+        assert resume_backend.record_view(resume_id="abd", no_increment_id=self.sign("abd"), client_ip="") is None
+        assert previews == [("abc", True)]
+
+
+class FakeCacheVersionTable:
+    def __init__(self, version: int):
+        self.version = version
+        self.reads = 0
+
+    def get_item(self, *, Key, AttributesToGet):
+        self.reads += 1
+        return {"Item": {"id": Key["id"], "cache_version": self.version}}
+
+
+class TestResumeExistenceCache:
+    @pytest.fixture
+    def clock(self, resume_backend, monkeypatch):
+        clock = SimpleNamespace(now=1000.0)
+        monkeypatch.setattr(resume_backend, "monotonic", lambda: clock.now)
+        return clock
+
+    @pytest.fixture
+    def cache(self, resume_backend, clock):
+        return resume_backend.ResumeExistenceCache(max_size=2, ttl=300, negative_ttl=60, version_check_interval=10)
+
+    def test_least_recently_used_entry_is_evicted(self, cache):
+        cache.set("abc", True)
+        cache.set("abd", True)
+        assert cache.get("abc") is True
+        cache.set("abe", False)
+
+        assert cache.get("abd") is None
+        assert cache.get("abc") is True
+        assert cache.get("abe") is False
+        assert (cache.hits, cache.misses) == (3, 1)
+
+    def test_negative_entries_expire_sooner(self, cache, clock):
+        cache.set("abc", True)
+        cache.set("missing", False)
+        clock.now += 60
+
+        assert cache.get("missing") is None
+        assert cache.get("abc") is True
+        clock.now += 240
+        assert cache.get("abc") is None
+
+    def test_version_change_clears_the_cache(self, resume_backend, cache, clock, monkeypatch):
+        views_table = FakeCacheVersionTable(1)
+        monkeypatch.setattr(resume_backend, "views_table", views_table)
+        cache.check_version()
+        cache.set("abc", True)
+
+        views_table.version = 2
+        cache.check_version()
+        assert cache.get("abc") is True
+        assert views_table.reads == 1
+
+        clock.now += 10
+        cache.check_version()
+        assert cache.get("abc") is None
+        assert views_table.reads == 2
+
+    def test_each_view_is_looked_up_once(self, resume_backend, clock, monkeypatch):
+        monkeypatch.setattr(resume_backend, "view_counting_mode", "access_logs")
+        monkeypatch.setattr(resume_backend, "views_table", FakeCacheVersionTable(1))
+        monkeypatch.setattr(
+            resume_backend, "resumes_table", SimpleNamespace(get_item=lambda **kwargs: {"Item": {"id": "abc"}})
+        )
+        monkeypatch.setattr(resume_backend, "add_item_to_viewers_table", lambda *, clientIp, resume_id: None)
+        monkeypatch.setattr(resume_backend, "get_view_count", lambda: 42)
+        cache = resume_backend.resume_cache
+        cache.clear()
+        hits, misses = cache.hits, cache.misses
+
+        for _ in range(2):
+            assert resume_backend.record_view(resume_id="abc", no_increment_id="", client_ip="192.0.2.1") == 42
+
+        assert (cache.hits - hits, cache.misses - misses) == (1, 1)
+
+
+class TransactionCanceledException(Exception):
+    def __init__(self, reasons: list):
+        super().__init__("Transaction cancelled")
+        self.response = {"CancellationReasons": reasons}
+
+
+class FakeTransactClient:
+    """
+    Executes the dedup transaction of record_view against in-memory dedup items and resumes. The first conflicts calls
+    are cancelled with a TransactionConflict.
+    """
+
+    exceptions = SimpleNamespace(TransactionCanceledException=TransactionCanceledException)
+
+    def __init__(self, *, resumes: dict, conflicts: int = 0):
+        self.resumes = resumes
+        self.dedup_items = {}
+        self.conflicts = conflicts
+        self.calls = 0
+
+    def transact_write_items(self, *, TransactItems):
+        self.calls += 1
+        put, update = TransactItems[0]["Put"], TransactItems[1]["Update"]
+        if self.conflicts > 0:
+            self.conflicts -= 1
+            raise TransactionCanceledException([{"Code": "TransactionConflict"}, {"Code": "None"}])
+        dedup_item = self.dedup_items.get(put["Item"]["bucket"])
+        reasons = [
+            {
+                "Code": (
+                    "ConditionalCheckFailed"
+                    if dedup_item is not None and dedup_item["expires_at"] > put["ExpressionAttributeValues"][":now"]
+                    else "None"
+                )
+            },
+            {"Code": "None" if update["Key"]["id"] in self.resumes.keys() else "ConditionalCheckFailed"},
+        ]
+        if any(reason["Code"] != "None" for reason in reasons):
+            raise TransactionCanceledException(reasons)
+        self.dedup_items[put["Item"]["bucket"]] = put["Item"]
+        self.resumes[update["Key"]["id"]] += update["ExpressionAttributeValues"][":newtotal"]
+
+
+class TestDedupTransaction:
+    @pytest.fixture
+    def client(self, resume_backend, monkeypatch):
+        client = FakeTransactClient(resumes={"abc": 0})
+        monkeypatch.setattr(resume_backend, "dynamodb", SimpleNamespace(meta=SimpleNamespace(client=client)))
+        monkeypatch.setattr(resume_backend, "sleep", lambda seconds: None)
+        monkeypatch.setattr(resume_backend, "viewer_dedup_filter", self.get_filter(resume_backend))
+        return client
+
+    @staticmethod
+    def get_filter(resume_backend):
+        return resume_backend.ViewerDedupFilter(window=resume_backend.viewer_dedup_window, bits=1024, hashes=3)
+
+    def test_first_view_is_counted(self, resume_backend, client):
+        assert resume_backend.increase_resume_view_count_once(resume_id="abc", client_ip="192.0.2.1") is True
+
+        assert client.resumes["abc"] == 1
+        assert len(client.dedup_items) == 1
+
+    def test_repeat_view_is_a_duplicate(self, resume_backend, client, monkeypatch):
+        _ = resume_backend.increase_resume_view_count_once(resume_id="abc", client_ip="192.0.2.1")
+
+        # Known from the filter of this container, without calling DynamoDB
+        assert resume_backend.increase_resume_view_count_once(resume_id="abc", client_ip="192.0.2.1") is False
+        assert client.calls == 1
+
+        # Known from the dedup item when the view reaches another container
+        monkeypatch.setattr(resume_backend, "viewer_dedup_filter", self.get_filter(resume_backend))
+        assert resume_backend.increase_resume_view_count_once(resume_id="abc", client_ip="192.0.2.1") is False
+        assert client.resumes["abc"] == 1
+
+    def test_missing_resume_leaves_no_dedup_item(self, resume_backend, client):
+        assert resume_backend.increase_resume_view_count_once(resume_id="missing", client_ip="192.0.2.1") is None
+
+        assert client.dedup_items == {}
+
+    def test_conflicts_are_retried(self, resume_backend, client):
+        client.conflicts = 2
+
+        assert resume_backend.increase_resume_view_count_once(resume_id="abc", client_ip="192.0.2.1") is True
+        assert client.calls == 3
+
+    def test_conflicts_raise_after_the_retries(self, resume_backend, client):
+        client.conflicts = int(resume_backend.config["dynamodb_transact_write_max_retries"]) + 1
+
+        with pytest.raises(TransactionCanceledException):
+            resume_backend.increase_resume_view_count_once(resume_id="abc", client_ip="192.0.2.1")
+
+    def test_record_view_does_not_read_the_resume(self, resume_backend, client, monkeypatch):
+        monkeypatch.setattr(resume_backend, "resumes_table", SimpleNamespace())
+        monkeypatch.setattr(resume_backend.resume_cache, "check_version", lambda: None)
+        monkeypatch.setattr(resume_backend, "add_item_to_viewers_table", lambda *, clientIp, resume_id: None)
+        monkeypatch.setattr(resume_backend, "increase_total_view_count", lambda: 42)
+        monkeypatch.setattr(resume_backend, "get_cached_view_count", lambda: 41)
+
+        assert resume_backend.record_view(resume_id="abc", no_increment_id="", client_ip="192.0.2.1") == 42
+        assert resume_backend.record_view(resume_id="abc", no_increment_id="", client_ip="192.0.2.1") == 41
+        assert resume_backend.record_view(resume_id="missing", no_increment_id="", client_ip="192.0.2.1") is None
+        assert resume_backend.resume_cache.get("missing") is False
+
+
+class FakeViewsTable:
+    def __init__(self, counts: dict):
+        self.counts = counts
+
+    def update_item(self, *, Key, UpdateExpression, ExpressionAttributeValues, ReturnValues):
+        self.counts[Key["id"]] = self.counts.get(Key["id"], 0) + ExpressionAttributeValues[":newtotal"]
+        return {"Attributes": {"view_count": self.counts[Key["id"]]}}
+
+
+class FakeDynamoDB:
+    """
+    Serves batch_get_item from the counts of a FakeViewsTable, leaving all but the first key unprocessed for the first
+    unprocessed_calls calls
+    """
+
+    def __init__(self, *, table_name: str, views_table: FakeViewsTable, unprocessed_calls: int = 0):
+        self.table_name = table_name
+        self.views_table = views_table
+        self.unprocessed_calls = unprocessed_calls
+        self.requested_keys = []
+
+    def batch_get_item(self, *, RequestItems):
+        keys = RequestItems[self.table_name]["Keys"]
+        self.requested_keys.append([key["id"] for key in keys])
+        unprocessed = []
+        if self.unprocessed_calls > 0:
+            self.unprocessed_calls -= 1
+            keys, unprocessed = keys[:1], keys[1:]
+        response = {
+            "Responses": {
+                self.table_name: [
+                    {"id": key["id"], "view_count": self.views_table.counts[key["id"]]}
+                    for key in keys
+                    if key["id"] in self.views_table.counts.keys()
+                ]
+            },
+            "UnprocessedKeys": {},
+        }
+        if unprocessed:
+            response["UnprocessedKeys"] = {self.table_name: {**RequestItems[self.table_name], "Keys": unprocessed}}
+        return response
+
+
+class TestViewCountShards:
+    @pytest.fixture
+    def views_table(self, resume_backend, monkeypatch):
+        views_table = FakeViewsTable({"all_resumes": 10, "all_resumes#1": 5})
+        monkeypatch.setattr(resume_backend, "views_table", views_table)
+        monkeypatch.setattr(resume_backend, "view_count_shards", 3)
+        return views_table
+
+    @pytest.fixture
+    def dynamodb(self, resume_backend, views_table, monkeypatch):
+        dynamodb = FakeDynamoDB(
+            table_name=resume_backend.config["dynamodb_resume_views_table"], views_table=views_table
+        )
+        monkeypatch.setattr(resume_backend, "dynamodb", dynamodb)
+        return dynamodb
+
+    def test_single_shard_is_the_original_item(self, resume_backend, monkeypatch):
+        monkeypatch.setattr(resume_backend, "view_count_shards", 1)
+        assert resume_backend.get_view_count_shard_ids() == ["all_resumes"]
+
+    def test_shard_ids(self, resume_backend, views_table):
+        assert resume_backend.get_view_count_shard_ids() == ["all_resumes", "all_resumes#1", "all_resumes#2"]
+
+    def test_shards_are_summed(self, resume_backend, dynamodb):
+        assert resume_backend.get_view_count_of_shards(resume_backend.get_view_count_shard_ids()) == 15
+        assert dynamodb.requested_keys == [["all_resumes", "all_resumes#1", "all_resumes#2"]]
+
+    def test_unprocessed_keys_are_requested_again(self, resume_backend, dynamodb):
+        dynamodb.unprocessed_calls = 2
+
+        assert resume_backend.get_view_count_of_shards(resume_backend.get_view_count_shard_ids()) == 15
+        assert dynamodb.requested_keys == [
+            ["all_resumes", "all_resumes#1", "all_resumes#2"],
+            ["all_resumes#1", "all_resumes#2"],
+            ["all_resumes#2"],
+        ]
+
+    def test_increment_returns_the_sum_of_all_shards(self, resume_backend, views_table, dynamodb):
+        for expected_view_count in range(16, 26):
+            assert resume_backend.increase_total_view_count() == expected_view_count
+
+        assert sum(views_table.counts.values()) == 25
+        assert resume_backend.last_view_count == 25
+        # Each increment reads only the shards it did not update
+        assert all(len(keys) == 2 for keys in dynamodb.requested_keys)
+
+    def test_get_view_count_of_sharded_counter(self, resume_backend, dynamodb):
+        assert resume_backend.get_view_count() == 15
+        assert resume_backend.get_cached_view_count() == 15
+        assert len(dynamodb.requested_keys) == 1
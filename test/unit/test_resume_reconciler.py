@@ -0,0 +1,206 @@
+import pytest
+
+from datetime import datetime, timedelta, timezone
+from re import findall
+
+
+class ConditionalCheckFailedException(Exception):
+    pass
+
+
+class FakeReconciliationTable:
+    """
+    Applies the reconciler's row updates and deletes to in-memory rows. With concurrent_change set, another change
+    increments a row's revision right after each of the reconciler's source updates.
+    """
+
+    def __init__(self, rows: list):
+        self.rows = {row["id"]: dict(row) for row in rows}
+        self.concurrent_change = False
+
+    def check_revision(self, row: dict, ConditionExpression: str, ExpressionAttributeValues: dict) -> None:
+        if (
+            ConditionExpression == "revision = :revision"
+            and row.get("revision") != ExpressionAttributeValues[":revision"]
+        ):
+            raise ConditionalCheckFailedException()
+
+    def update_item(self, *, Key, UpdateExpression, ExpressionAttributeValues, ConditionExpression=None, **kwargs):
+        row = self.rows.setdefault(Key["id"], dict(Key))
+        self.check_revision(row, ConditionExpression, ExpressionAttributeValues)
+        for action, clause in findall(r"(SET|REMOVE|ADD) (.*?)(?= SET | REMOVE | ADD |$)", UpdateExpression):
+            for part in clause.split(", "):
+                if action == "SET":
+                    attribute, _, value = part.partition(" = ")
+                    row[attribute] = ExpressionAttributeValues[value]
+                elif action == "ADD":
+                    attribute, value = part.split(" ")
+                    row[attribute] = row.get(attribute, 0) + ExpressionAttributeValues[value]
+                else:
+                    row.pop(part, None)
+
+        attributes = dict(row)
+        if kwargs.get("ReturnValues") == "ALL_NEW" and self.concurrent_change:
+            row["revision"] += 1
+        return {"Attributes": attributes}
+
+    def delete_item(self, *, Key, ConditionExpression, ExpressionAttributeValues):
+        self.check_revision(self.rows[Key["id"]], ConditionExpression, ExpressionAttributeValues)
+        del self.rows[Key["id"]]
+
+
+class FakeBucket:
+    """
+    Serves the list_object_versions paginator from the versions of each key, oldest first
+    """
+
+    def __init__(self, versions: dict):
+        self.versions = versions
+
+    def get_paginator(self, operation_name: str):
+        return self
+
+    def paginate(self, *, Bucket, Prefix):
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        versions = [
+            {"Key": key, "LastModified": start + timedelta(seconds=index), "is_delete_marker": is_delete_marker}
+            for key, key_versions in self.versions.items()
+            if key.startswith(Prefix)
+            for index, is_delete_marker in enumerate(key_versions)
+        ]
+        yield {
+            "Versions": [version for version in versions if not version["is_delete_marker"]],
+            "DeleteMarkers": [version for version in versions if version["is_delete_marker"]],
+        }
+
+
+@pytest.fixture
+def reconciler(load_lambda):
+    return load_lambda(
+        "backend/database/resume-reconciler",
+        dynamodb_table_region="us-east-1",
+        s3_region="us-east-1",
+        s3_bucket_webpage_resumes_location="resumes",
+        s3_bucket_documents_upload_location="documents",
+        s3_bucket_documents_parsed_location="parsed-documents",
+    )
+
+
+class TestIsRowInconsistent:
+    def test_reservations(self, reconciler):
+        now = int(datetime.now(timezone.utc).timestamp())
+
+        assert not reconciler.is_row_inconsistent({"item_state": "pending", "item_expires_at": now + 60})
+        assert reconciler.is_row_inconsistent({"item_state": "pending", "item_expires_at": now - 60})
+        # The converted html of an unexpired reservation is expected before the resume is added
+        assert not reconciler.is_row_inconsistent(
+            {"item_state": "pending", "item_expires_at": now + 60, "html_state": "present"}
+        )
+
+    def test_resumes(self, reconciler):
+        assert not reconciler.is_row_inconsistent({"item_state": "normal", "html_state": "present"})
+        assert reconciler.is_row_inconsistent({"item_state": "normal", "html_state": "stale"})
+        assert reconciler.is_row_inconsistent({"item_state": "normal"})
+        assert reconciler.is_row_inconsistent({"html_state": "present"})
+        assert reconciler.is_row_inconsistent(
+            {"item_state": "normal", "html_state": "present", "document_state": "present"}
+        )
+
+
+class TestObjectState:
+    @pytest.fixture
+    def bucket(self, reconciler, monkeypatch):
+        bucket = FakeBucket(
+            {
+                "resumes/abc.html": [False, True],
+                "resumes/abd.html": [False, True, True],
+                "resumes/abe.html": [True],
+                "parsed-documents/abd.docx": [False, True, True],
+                "documents/abe.docx": [True],
+            }
+        )
+        monkeypatch.setattr(reconciler, "s3", bucket)
+        return bucket
+
+    def test_html_states(self, reconciler, bucket):
+        def get_html_state(key: str) -> str:
+            return reconciler.get_object_state(bucket="test-s3_bucket_webpage", key=key, source="html_state")
+
+        assert get_html_state("resumes/abc.html") == "present"
+        assert get_html_state("resumes/abd.html") == "stale"
+        assert get_html_state("resumes/abe.html") == "stale"
+        assert get_html_state("resumes/missing.html") is None
+
+    def test_document_states(self, reconciler, bucket):
+        assert (
+            reconciler.get_object_state(
+                bucket="test-s3_bucket_documents", key="parsed-documents/abd.docx", source="parsed_document_state"
+            )
+            == "present"
+        )
+        assert (
+            reconciler.get_object_state(
+                bucket="test-s3_bucket_documents", key="documents/abe.docx", source="document_state"
+            )
+            == "present"
+        )
+
+
+class TestObjectSource:
+    def test_resume_sources(self, reconciler):
+        assert reconciler.get_object_source(bucket="test-s3_bucket_webpage", key="resumes/abc.html") == (
+            "abc",
+            "html_state",
+        )
+        assert reconciler.get_object_source(bucket="test-s3_bucket_documents", key="parsed-documents/abc.docx") == (
+            "abc",
+            "parsed_document_state",
+        )
+
+    def test_other_objects_are_ignored(self, reconciler):
+        # The content hashed html of a resume is kept under a prefix named after its ID
+        assert reconciler.get_object_source(bucket="test-s3_bucket_webpage", key="resumes/abc/0123456789.html") is None
+        assert reconciler.get_object_source(bucket="test-s3_bucket_webpage", key="resumes/.html") is None
+        assert reconciler.get_object_source(bucket="test-s3_bucket_documents", key="resumes/abc.html") is None
+        assert reconciler.get_object_source(bucket="test-s3_bucket_webpage", key="index.html") is None
+
+
+class TestUpdateRow:
+    @pytest.fixture
+    def table(self, reconciler, monkeypatch):
+        table = FakeReconciliationTable(
+            [{"id": "abc", "item_state": "normal", "html_state": "present", "revision": 1, "updated_at": 0}]
+        )
+        monkeypatch.setattr(reconciler, "reconciliation_table", table)
+        monkeypatch.setattr(reconciler, "ConditionalCheckFailedException", ConditionalCheckFailedException)
+        return table
+
+    def test_row_is_flagged_and_unflagged(self, reconciler, table):
+        reconciler.update_row("abc", {"html_state": "stale"})
+        assert table.rows["abc"]["inconsistent"] == "true"
+
+        reconciler.update_row("abc", {"html_state": "present"})
+        assert "inconsistent" not in table.rows["abc"].keys()
+        assert table.rows["abc"]["revision"] == 3
+
+    def test_row_without_sources_is_removed(self, reconciler, table):
+        reconciler.update_row("abc", {"item_state": None})
+        assert table.rows["abc"]["inconsistent"] == "true"
+
+        reconciler.update_row("abc", {"html_state": None})
+        assert "abc" not in table.rows.keys()
+
+    def test_flag_is_left_to_a_newer_change(self, reconciler, table):
+        table.concurrent_change = True
+
+        reconciler.update_row("abc", {"document_state": "present"})
+
+        assert table.rows["abc"]["document_state"] == "present"
+        assert "inconsistent" not in table.rows["abc"].keys()
+
+    def test_row_of_a_newer_change_is_not_removed(self, reconciler, table):
+        table.concurrent_change = True
+
+        reconciler.update_row("abc", {"item_state": None, "html_state": None})
+
+        assert "abc" in table.rows.keys()
@@ -0,0 +1,165 @@
+import pytest
+
+from types import SimpleNamespace
+
+
+class TransactionCanceledException(Exception):
+    def __init__(self, reasons: list):
+        super().__init__("Transaction cancelled")
+        self.response = {"CancellationReasons": reasons}
+
+
+class FakeStatsClient:
+    """
+    Applies TransactWriteItems to an in-memory stats table, supporting the conditional puts and ADD/SET updates the
+    aggregator uses. The first conflicts calls are cancelled with a TransactionConflict.
+    """
+
+    exceptions = SimpleNamespace(TransactionCanceledException=TransactionCanceledException)
+
+    def __init__(self):
+        self.items = {}
+        self.transactions = 0
+        self.max_transaction_items = 0
+        self.conflicts = 0
+
+    def transact_write_items(self, *, TransactItems):
+        self.transactions += 1
+        self.max_transaction_items = max(self.max_transaction_items, len(TransactItems))
+        if self.conflicts > 0:
+            self.conflicts -= 1
+            raise TransactionCanceledException([{"Code": "TransactionConflict"}] * len(TransactItems))
+
+        reasons = []
+        for transact_item in TransactItems:
+            if "Put" in transact_item.keys():
+                item = transact_item["Put"]["Item"]
+                exists = (item["resume_id"], item["period"]) in self.items.keys()
+                reasons.append({"Code": "ConditionalCheckFailed" if exists else "None"})
+            else:
+                reasons.append({"Code": "None"})
+        if any(reason["Code"] != "None" for reason in reasons):
+            raise TransactionCanceledException(reasons)
+
+        for transact_item in TransactItems:
+            if "Put" in transact_item.keys():
+                item = transact_item["Put"]["Item"]
+                self.items[(item["resume_id"], item["period"])] = dict(item)
+            else:
+                update = transact_item["Update"]
+                key = (update["Key"]["resume_id"], update["Key"]["period"])
+                item = self.items.setdefault(key, dict(update["Key"]))
+                values = update["ExpressionAttributeValues"]
+                item["view_count"] = item.get("view_count", 0) + values[":views"]
+                item["unique_viewers"] = item.get("unique_viewers", 0) + values[":unique_viewers"]
+                if ":expires_at" in values.keys():
+                    item["expires_at"] = values[":expires_at"]
+
+    def stats(self, resume_id: str, period: str) -> dict:
+        item = self.items.get((resume_id, period), {})
+        return {"view_count": item.get("view_count", 0), "unique_viewers": item.get("unique_viewers", 0)}
+
+
+@pytest.fixture
+def aggregator(load_lambda, monkeypatch):
+    aggregator = load_lambda(
+        "backend/database/resume-stats-aggregator",
+        dynamodb_table_region="us-east-1",
+        hourly_stats_retention_days=7,
+    )
+    client = FakeStatsClient()
+    monkeypatch.setattr(aggregator, "dynamodb_resource", SimpleNamespace(meta=SimpleNamespace(client=client)))
+    monkeypatch.setattr(aggregator, "stats_table", object())
+    monkeypatch.setattr(aggregator, "sleep", lambda seconds: None)
+    return aggregator
+
+
+def get_record(event_id: str, viewer: str, resume_id: str = "abc", time: str = "10:00:00.000000", preview=False):
+    new_image = {
+        "bucket": {"S": "views#2026-01-01"},
+        "event": {"S": f"{time}#{viewer}"},
+        "viewer": {"S": viewer},
+        "resume_id": {"S": resume_id},
+    }
+    if preview:
+        new_image["preview"] = {"BOOL": True}
+    return {"eventID": event_id, "eventName": "INSERT", "dynamodb": {"NewImage": new_image}}
+
+
+records = [
+    get_record("1", "viewer1"),
+    get_record("2", "viewer1"),
+    get_record("3", "viewer2"),
+    get_record("4", "viewer2", time="11:00:00.000000"),
+    get_record("5", "viewer3", resume_id="def"),
+]
+
+
+def assert_stats(client: FakeStatsClient) -> None:
+    assert client.stats("abc", "day#2026-01-01") == {"view_count": 4, "unique_viewers": 2}
+    assert client.stats("abc", "hour#2026-01-01T10") == {"view_count": 3, "unique_viewers": 2}
+    assert client.stats("abc", "hour#2026-01-01T11") == {"view_count": 1, "unique_viewers": 1}
+    assert client.stats("def", "day#2026-01-01") == {"view_count": 1, "unique_viewers": 1}
+
+
+class TestHandler:
+    def test_views_are_counted(self, aggregator):
+        client = aggregator.dynamodb_resource.meta.client
+        aggregator.handler({"Records": records}, None)
+
+        assert_stats(client)
+        assert "expires_at" in client.items[("abc", "hour#2026-01-01T10")].keys()
+        assert "expires_at" not in client.items[("abc", "day#2026-01-01")].keys()
+        assert ("abc", "event#1") in client.items.keys()
+        assert ("abc", "viewer#day#2026-01-01#viewer1") in client.items.keys()
+
+    def test_redelivered_batch_is_counted_once(self, aggregator):
+        client = aggregator.dynamodb_resource.meta.client
+        aggregator.handler({"Records": records}, None)
+        aggregator.handler({"Records": records}, None)
+
+        assert_stats(client)
+
+    def test_bisected_batch_is_counted_once(self, aggregator):
+        client = aggregator.dynamodb_resource.meta.client
+        aggregator.handler({"Records": records[:2]}, None)
+        aggregator.handler({"Records": records[:3]}, None)
+        aggregator.handler({"Records": records}, None)
+
+        assert_stats(client)
+
+    def test_viewers_of_earlier_batches_are_not_counted_again(self, aggregator):
+        client = aggregator.dynamodb_resource.meta.client
+        aggregator.handler({"Records": [get_record("1", "viewer1")]}, None)
+        aggregator.handler({"Records": [get_record("2", "viewer1"), get_record("3", "viewer2")]}, None)
+
+        assert client.stats("abc", "day#2026-01-01") == {"view_count": 3, "unique_viewers": 2}
+
+    def test_previews_are_not_counted(self, aggregator):
+        client = aggregator.dynamodb_resource.meta.client
+        aggregator.handler({"Records": [get_record("1", "viewer1", preview=True), get_record("2", "viewer2")]}, None)
+
+        assert client.stats("abc", "day#2026-01-01") == {"view_count": 1, "unique_viewers": 1}
+        assert ("abc", "event#1") not in client.items.keys()
+
+    def test_conflicts_are_retried(self, aggregator):
+        client = aggregator.dynamodb_resource.meta.client
+        client.conflicts = 2
+        aggregator.handler({"Records": records[:4]}, None)
+
+        assert client.stats("abc", "day#2026-01-01") == {"view_count": 4, "unique_viewers": 2}
+
+    def test_conflicts_beyond_the_retries_raise(self, aggregator):
+        client = aggregator.dynamodb_resource.meta.client
+        client.conflicts = 100
+
+        with pytest.raises(RuntimeError):
+            aggregator.handler({"Records": records[:1]}, None)
+        assert client.items == {}
+
+    def test_large_batches_are_split_into_transactions(self, aggregator):
+        client = aggregator.dynamodb_resource.meta.client
+        aggregator.handler({"Records": [get_record(str(i), f"viewer{i % 7}") for i in range(45)]}, None)
+
+        assert client.stats("abc", "day#2026-01-01") == {"view_count": 45, "unique_viewers": 7}
+        assert client.max_transaction_items <= 100
@@ -0,0 +1,144 @@
+import pytest
+
+from datetime import datetime, timedelta, timezone
+
+
+class FakeViewersTable:
+    """
+    Stores items by their bucket and event keys and returns queries in pages of page_size items
+    """
+
+    def __init__(self, *, page_size: int = 2):
+        self.items = {}
+        self.page_size = page_size
+        self.queries = 0
+
+    def put_item(self, *, Item):
+        self.items[(Item["bucket"], Item["event"])] = dict(Item)
+
+    def query(
+        self,
+        *,
+        KeyConditionExpression,
+        ProjectionExpression,
+        ExpressionAttributeNames,
+        ExpressionAttributeValues,
+        ExclusiveStartKey=None,
+    ):
+        self.queries += 1
+        keys = sorted(key for key in self.items.keys() if key[0] == ExpressionAttributeValues[":bucket"])
+        if ExclusiveStartKey:
+            keys = [key for key in keys if key > (ExclusiveStartKey["bucket"], ExclusiveStartKey["event"])]
+        page = keys[: self.page_size]
+        attributes = [attribute.strip() for attribute in ProjectionExpression.split(",")]
+        response = {
+            "Items": [
+                {attribute: self.items[key][attribute] for attribute in attributes if attribute in self.items[key]}
+                for key in page
+            ]
+        }
+        if len(keys) > self.page_size:
+            response["LastEvaluatedKey"] = {"bucket": page[-1][0], "event": page[-1][1]}
+        return response
+
+
+@pytest.fixture
+def rollup(load_lambda, monkeypatch):
+    rollup = load_lambda("backend/database/resume-viewers-rollup", dynamodb_table_region="us-east-1")
+    viewers_table = FakeViewersTable()
+    monkeypatch.setattr(rollup, "viewers_table", viewers_table)
+    return rollup
+
+
+def put_views(viewers_table: FakeViewersTable, day: str, views: list) -> None:
+    for i, (viewer, resume_id) in enumerate(views):
+        viewers_table.put_item(
+            Item={
+                "bucket": f"views#{day}",
+                "event": f"00:00:{i:02d}.000000#{viewer}",
+                "viewer": viewer,
+                "resume_id": resume_id,
+                "expires_at": 0,
+            }
+        )
+
+
+class TestRollupDay:
+    views = [("viewer1", "abc"), ("viewer1", "abc"), ("viewer2", "abc"), ("viewer2", "def"), ("viewer3", "def")]
+
+    def test_daily_rollup_item(self, rollup):
+        put_views(rollup.viewers_table, "2026-01-01", self.views)
+        put_views(rollup.viewers_table, "2026-01-02", [("viewer4", "abc")])
+
+        assert rollup.rollup_day("2026-01-01") == {"view_count": 5, "unique_viewers": 3}
+
+        item = rollup.viewers_table.items[("rollup#daily", "2026-01-01")]
+        assert set(item.keys()) == {"bucket", "event", "view_count", "unique_viewers", "resumes", "rolled_up_at"}
+        assert item["view_count"] == 5
+        assert item["unique_viewers"] == 3
+        assert item["resumes"] == {
+            "abc": {"view_count": 3, "unique_viewers": 2},
+            "def": {"view_count": 2, "unique_viewers": 2},
+        }
+        assert datetime.fromisoformat(item["rolled_up_at"]).tzinfo is not None
+        # The five rows are read in pages of two
+        assert rollup.viewers_table.queries == 3
+
+    def test_rolling_up_a_day_again_overwrites_its_aggregate(self, rollup):
+        put_views(rollup.viewers_table, "2026-01-01", self.views)
+
+        first = rollup.rollup_day("2026-01-01")
+        first_item = dict(rollup.viewers_table.items[("rollup#daily", "2026-01-01")])
+        second = rollup.rollup_day("2026-01-01")
+        second_item = rollup.viewers_table.items[("rollup#daily", "2026-01-01")]
+
+        assert first == second
+        assert [key for key in rollup.viewers_table.items.keys() if key[0] == "rollup#daily"] == [
+            ("rollup#daily", "2026-01-01")
+        ]
+        for attribute in ["view_count", "unique_viewers", "resumes"]:
+            assert first_item[attribute] == second_item[attribute]
+
+    def test_previews_are_not_counted(self, rollup):
+        put_views(rollup.viewers_table, "2026-01-01", [("viewer1", "abc"), ("viewer2", "abc")])
+        rollup.viewers_table.items[("views#2026-01-01", "00:00:00.000000#viewer1")]["preview"] = True
+
+        assert rollup.rollup_day("2026-01-01") == {"view_count": 1, "unique_viewers": 1}
+
+    def test_day_without_views(self, rollup):
+        assert rollup.rollup_day("2026-01-01") == {"view_count": 0, "unique_viewers": 0}
+        assert rollup.viewers_table.items[("rollup#daily", "2026-01-01")]["resumes"] == {}
+
+
+class TestHandler:
+    @pytest.fixture
+    def resource(self, rollup, monkeypatch):
+        viewers_table = rollup.viewers_table
+
+        class FakeResource:
+            def Table(self, name):
+                return viewers_table
+
+        monkeypatch.setattr(rollup.boto3, "resource", lambda *args, **kwargs: FakeResource())
+
+    def test_previous_days_are_rolled_up(self, rollup, resource):
+        today = datetime.now(timezone.utc).date()
+        yesterday = (today - timedelta(days=1)).isoformat()
+        put_views(rollup.viewers_table, yesterday, [("viewer1", "abc")])
+        put_views(rollup.viewers_table, today.isoformat(), [("viewer2", "abc")])
+
+        response = rollup.handler({}, None)
+
+        assert list(response["rollups"].keys()) == [
+            (today - timedelta(days=days_ago)).isoformat() for days_ago in range(3, 0, -1)
+        ]
+        assert response["rollups"][yesterday] == {"view_count": 1, "unique_viewers": 1}
+        assert ("rollup#daily", today.isoformat()) not in rollup.viewers_table.items.keys()
+
+    def test_requested_days_are_rolled_up_again(self, rollup, resource):
+        put_views(rollup.viewers_table, "2026-01-01", [("viewer1", "abc"), ("viewer2", "abc")])
+
+        first = rollup.handler({"days": ["2026-01-01"]}, None)
+        second = rollup.handler({"days": ["2026-01-01"]}, None)
+
+        assert first == second == {"rollups": {"2026-01-01": {"view_count": 2, "unique_viewers": 2}}}